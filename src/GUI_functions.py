@@ -13,25 +13,54 @@
 # - Tkinter widgets and filedialog for user interaction
 # - Helper modules : utils.py, database_management.py, global_vars.py
 
+import codecs
 import sqlite3
 import os
+import queue
+import re
+import shutil
+import time
+import tkinter as tk
 import global_vars
 from utils import (
     make_pretty_table, highlight_keywords, colorize_keywords,
-    insert_linebreaks_before_keywords, update_recent_sql_files, display_result
+    insert_linebreaks_before_keywords, update_recent_sql_files, display_result,
+    iter_sql_statements, apply_text_diff
 )
-from tkinter import filedialog, messagebox
+from results import (
+    fetch_rows, spill_rows, QueryResult, is_cacheable, cache_select, list_cached_results,
+    quote_identifier
+)
+from result_grid import open_result_grid
+from diagnostics import PhaseTimer
+from query_process import query_process_for, settings as process_settings
+from workload import WorkloadRecorder
+from search_index import (
+    list_search_indexes, is_index_table, create_search_index, drop_search_index, suggest_match
+)
+from database_management import (
+    take_snapshot, reset_to_snapshot, list_snapshots, list_attached, default_alias,
+    attach_database, detach_database, tab_is_busy, apply_student_limits
+)
+from db_diff import compare_with_reference
+from db_info import show_database_info
+from maintenance import run_maintenance
+from tkinter import filedialog, messagebox, simpledialog, ttk
+from tkinter.scrolledtext import ScrolledText
 
 
 def run_sql(sql_textbox, output_textbox):
     """
     Execute the selected SQL code (if any) or the entire buffer using
-    the current SQLite connection (mono-connection model).
+    the connection of the active workspace tab.
 
     Behaviour :
         - SELECT statements : fetch and pretty-print results.
         - Other statements  : commit automatically and show rows affected.
         - Each statement is executed in sequence.
+        - With workspace tabs, the statements run on the tab's worker
+          thread and results are streamed back to the output area, so
+          the GUI (and the other tabs) stay responsive.
 
     Args:
         sql_textbox : tkinter.Text
@@ -47,6 +76,11 @@ def run_sql(sql_textbox, output_textbox):
         display_result(output_textbox, "No database connected. Use Database → Open…")
         return None
 
+    tab = global_vars.current_tab
+    if tab is not None and tab.busy:
+        display_result(output_textbox, "A query is already running in this tab.")
+        return None
+
     # Retrieve either the selection or the whole content
     if sql_textbox.tag_ranges("sel"):
         sql_code = sql_textbox.get("sel.first", "sel.last").strip()
@@ -65,49 +99,640 @@ def run_sql(sql_textbox, output_textbox):
         display_result(output_textbox, "(No complete SQL statement found.)")
         return None
 
+    run_statements(output_textbox, statements)
+
+    # Pretty-print SQL after execution for visual consistency
+    if do_pretty_after:
+        pretty_print_sql(sql_textbox)
+
+    return None
+
+
+def run_current_statement(sql_textbox, output_textbox):
+    """
+    Execute only the statement under the cursor (Ctrl+Enter).
+
+    The statement is found with the tab's statement index
+    (statement_index.StatementIndex), which is kept up to date while the
+    editor is modified, so this costs the same on any size of worksheet.
+    The executed statement is briefly highlighted.
+
+    Args:
+        sql_textbox : tkinter.Text
+            The SQL editor widget.
+        output_textbox : tkinter.Text
+            The output area for displaying results.
+
+    Returns:
+        None
+    """
+    tab = global_vars.current_tab
+    if tab is None or tab.statement_index is None:
+        return run_sql(sql_textbox, output_textbox)
+
+    if global_vars.current_connection is None:
+        display_result(output_textbox, "No database connected. Use Database → Open…")
+        return None
+    if tab.busy:
+        display_result(output_textbox, "A query is already running in this tab.")
+        return None
+
+    span = tab.statement_index.statement_at("insert")
+    if span is None:
+        display_result(output_textbox, "(No statement under the cursor.)")
+        return None
+
+    start, end = span
+    statement = sql_textbox.get(start, end).strip()
+    sql_textbox.tag_remove("current_statement", "1.0", "end")
+    sql_textbox.tag_add("current_statement", start, end)
+    sql_textbox.tag_configure("current_statement", background="#FFF3B0")
+    sql_textbox.after(800, lambda: sql_textbox.tag_remove("current_statement", "1.0", "end"))
+
+    run_statements(output_textbox, split_sql_statements(statement))
+    return None
+
+
+def run_statements(output_textbox, statements, cache_results=None):
+    """
+    Run a list of statements on the active connection (on the tab's
+    worker when there is one) and display their results.
+    With isolated execution on, the tab's query process runs them instead
+    (see query_process.py).
+
+    Args:
+        output_textbox : tkinter.Text
+            The output area for displaying results.
+        statements : list[str]
+            Complete SQL statements.
+        cache_results : bool or None
+            Keep SELECT results in TEMP tables (None means
+            global_vars.cache_results).
+
+    Returns:
+        None
+    """
+    conn = global_vars.current_connection
+    tab = global_vars.current_tab
+    if cache_results is None:
+        cache_results = global_vars.cache_results
+
+    # The tab is idle: bring its connection up to date with student mode
+    # (set_student_mode skips the connections of busy tabs)
+    if conn is not None:
+        apply_student_limits(conn)
+    limits = global_vars.STUDENT_LIMITS if global_vars.student_mode else None
+    progress = QueryProgress(len(statements), limits)
+    if tab is None:
+        execute_statements(conn, statements, lambda text: show_result(output_textbox, text),
+                           progress=progress, cache_results=cache_results)
+    else:
+        tab.progress = progress
+        tab.results = []
+        process = query_process_for(tab)
+        if process is not None:
+            future = run_in_tab(tab, output_textbox, process.execute, statements,
+                                process_settings(conn), progress=progress, results=tab.results)
+        else:
+            future = run_in_tab(tab, output_textbox, execute_statements, conn, statements,
+                                progress=progress, results=tab.results,
+                                cache_results=cache_results)
+        watch_progress(tab, future)
+        if global_vars.grid_view:
+            when_done(output_textbox, future, lambda: show_last_result_grid(output_textbox, tab, quiet=True))
+    return None
+
+
+def execute_statements(conn, statements, emit, progress=None, results=None,
+                       cache_results=False):
+    """
+    Execute statements one by one and hand each result text to 'emit'.
+
+    This function does not touch any Tk widget, so it can run on a
+    worker thread. When a QueryProgress is given, it is installed as the
+    connection's progress handler: it counts VM steps, enforces the
+    student mode budgets and lets the user cancel the running statement
+    (the connection stays usable).
+
+    Args:
+        conn : sqlite3.Connection
+            Connection to run the statements on.
+        statements : list[str]
+            Complete SQL statements.
+        emit : callable
+            Called with each piece of output text.
+        progress : QueryProgress, optional
+            Shared progress / cancellation state.
+        results : list, optional
+            Receives a results.QueryResult for each SELECT (result grid).
+        cache_results : bool, default=False
+            Materialize each SELECT in a TEMP table (see results.cache_select)
+            so it can be sorted and filtered later without re-running it.
+
+    Returns:
+        None
+    """
+    if progress is not None:
+        conn.set_progress_handler(progress.handler, global_vars.PROGRESS_HANDLER_STEPS)
+
     cur = conn.cursor()
-    for idx, stmt in enumerate(statements, 1):
-        try:
-            before = conn.total_changes
-            cur.execute(stmt)
-            is_select = (cur.description is not None)
-
-            if is_select:
-                rows = cur.fetchall()
-                headers = [d[0] for d in cur.description]
-                result = make_pretty_table(headers, rows)
-            else:
-                affected = max(conn.total_changes - before, 0)
+    recorder = WorkloadRecorder(conn) if global_vars.record_workload else None
+    try:
+        for idx, stmt in enumerate(statements, 1):
+            if progress is not None:
+                if progress.cancel_requested:
+                    emit(f"Cancelled – statements {idx} to {len(statements)} were not run.")
+                    break
+                progress.start_statement(idx)
+
+            if recorder is not None:
+                recorder.start()
+            try:
+                before = conn.total_changes
+                cached = None
+                if cache_results and is_cacheable(stmt):
+                    cached = cache_select(cur, stmt, progress)
+                else:
+                    cur.execute(stmt)
+                is_select = (cur.description is not None)
+
+                if is_select:
+                    headers = [d[0] for d in cur.description]
+                    rows, leftover, complete = fetch_rows(cur, stmt, progress)
+                    if recorder is not None and complete and not cached:
+                        recorder.stop()
+                    result = make_pretty_table(headers, rows)
+                    spilled = None
+                    if not complete:
+                        # Show the first rows now, then stream the rest to disk
+                        emit(result)
+                        emit(f"Showing the first {len(rows):,} rows – "
+                             "counting and saving the full result…")
+                        spilled = spill_rows(cur, headers, rows, leftover, stmt, progress)
+                        if recorder is not None and not cached:
+                            recorder.stop()
+                        result = (
+                            f"{spilled.row_count:,} rows in total "
+                            f"(the first {len(rows):,} are shown above).\n"
+                            f"Full result saved to {spilled.path}\n"
+                            "Use the Results menu below the output to page through it or export it."
+                        )
+                    if cached:
+                        result = (result.rstrip("\n") + f"\n(Result cached as temp.{cached} – "
+                                  "Results → Sort / Filter / Group to explore it "
+                                  "without running the query again.)")
+                    tip = suggest_match(conn, stmt)
+                    if tip:
+                        result = result.rstrip("\n") + "\n\n" + tip
+                    if results is not None:
+                        results.append(QueryResult(headers, rows, stmt, spilled))
+                    row_count = spilled.row_count if spilled else len(rows)
+                else:
+                    affected = max(conn.total_changes - before, 0)
+                    if conn.in_transaction:
+                        try:
+                            conn.commit()
+                        except Exception:
+                            try:
+                                conn.rollback()
+                            except Exception:
+                                pass
+                            raise
+                    if recorder is not None:
+                        recorder.stop()
+                    result = f"OK – {affected} row(s) affected."
+                    row_count = affected
+
+                if recorder is not None:
+                    recorder.record(stmt, rows=row_count)
+                emit(result)
+                emit("")
+
+            except Exception as e:
                 if conn.in_transaction:
                     try:
-                        conn.commit()
+                        conn.rollback()
                     except Exception:
-                        try:
-                            conn.rollback()
-                        except Exception:
-                            pass
-                        raise
-                result = f"OK – {affected} row(s) affected."
+                        pass
+                if recorder is not None:
+                    recorder.stop()
+                    recorder.record(stmt, error=str(e) or type(e).__name__)
+                if progress is not None and progress.cancel_requested:
+                    emit(f"Statement {idx} cancelled after {progress.elapsed():.1f} s.")
+                elif progress is not None and progress.is_budget_violation(e):
+                    emit(f"Statement {idx} stopped by student mode: {progress.violation}.")
+                else:
+                    emit(f"Error in statement {idx}: {str(e) or type(e).__name__}")
+    finally:
+        if progress is not None:
+            conn.set_progress_handler(None, 0)
+            progress.finished = True
+
+    return None
+
+
+class QueryProgress:
+    """
+    Live state of a run_sql() call, shared between the worker thread
+    (which updates it from the SQLite progress handler) and the GUI
+    (which displays it and may request cancellation).
+
+    With 'limits' (student mode), a statement exceeding its time or
+    VM-step budget is aborted and 'violation' explains why.
+    """
+
+    def __init__(self, total, limits=None):
+        self.total = total
+        self.limits = limits
+        self.index = 0
+        self.steps = 0
+        self.statement_steps = 0
+        self.rows = 0
+        self.started = time.monotonic()
+        self.statement_started = self.started
+        self.cancel_requested = False
+        self.violation = None
+        self.finished = False
+
+    def start_statement(self, index):
+        """Record the start of statement number 'index' (1-based)."""
+        self.index = index
+        self.statement_steps = 0
+        self.rows = 0
+        self.violation = None
+        self.statement_started = time.monotonic()
+
+    def limit(self, key):
+        """Return one student mode limit, or None when there is none."""
+        return self.limits.get(key) if self.limits else None
+
+    def handler(self):
+        """SQLite progress handler: a non-zero return value aborts the statement."""
+        self.steps += global_vars.PROGRESS_HANDLER_STEPS
+        self.statement_steps += global_vars.PROGRESS_HANDLER_STEPS
+        if self.cancel_requested:
+            return 1
+        if self.limits:
+            if self.statement_steps > self.limits["max_vm_steps"]:
+                self.violation = f"more than {self.limits['max_vm_steps']:,} VM steps"
+                return 1
+            if self.elapsed() > self.limits["max_seconds"]:
+                self.violation = f"running for more than {self.limits['max_seconds']} s"
+                return 1
+        return 0
+
+    def is_budget_violation(self, error):
+        """
+        Return True if the statement was stopped by a budget, translating
+        the errors raised by SQLite's own limits into a clear 'violation'.
+        """
+        if self.violation:
+            return True
+        if not self.limits:
+            return False
+
+        message = str(error)
+        if isinstance(error, MemoryError) or "out of memory" in message:
+            mb = self.limits["heap_limit_bytes"] // 1024 ** 2
+            self.violation = f"the SQLite memory limit of {mb} MB was reached"
+        elif "string or blob too big" in message:
+            mb = self.limits["max_value_bytes"] / 1024 ** 2
+            self.violation = f"a value is larger than {mb:g} MB"
+        elif "statement too long" in message:
+            kb = self.limits["max_sql_bytes"] // 1024
+            self.violation = f"the statement is longer than {kb:,} KB"
+        return self.violation is not None
+
+    def cancel(self):
+        """Ask the running statement to stop at its next progress callback."""
+        self.cancel_requested = True
+
+    def elapsed(self):
+        """Seconds since the current statement started."""
+        return time.monotonic() - self.statement_started
+
+    def describe(self):
+        """One-line status text."""
+        if self.finished:
+            total = time.monotonic() - self.started
+            return f"Done – {self.total} statement(s) in {total:.2f} s"
+        text = (f"Running statement {self.index}/{self.total} – "
+                f"{self.elapsed():.1f} s – {self.steps:,} VM steps")
+        if self.rows:
+            text += f" – {self.rows:,} rows"
+        if self.cancel_requested:
+            text += " – cancelling…"
+        return text
+
+
+def watch_progress(tab, future):
+    """Show the progress of the tab's running query in its status line."""
+    progress = tab.progress
+
+    def refresh():
+        if tab.status_label is None or progress is not tab.progress:
+            return
+        try:
+            tab.status_label.config(text=progress.describe())
+        except Exception:
+            return
+        if not future.done():
+            tab.status_label.after(global_vars.STATUS_INTERVAL_MS, refresh)
+
+    refresh()
+    return None
+
 
-            display_result(output_textbox, result)
-            display_result(output_textbox, "")
+def when_done(widget, future, callback):
+    """Call 'callback' on the GUI thread once 'future' is done."""
+    def check():
+        if future.done():
+            callback()
+        else:
+            widget.after(global_vars.POLL_INTERVAL_MS, check)
+    widget.after(global_vars.POLL_INTERVAL_MS, check)
+    return None
+
+
+def show_last_result_grid(output_textbox, tab=None, quiet=False):
+    """Open the last SELECT result of a tab in the result grid."""
+    tab = tab or global_vars.current_tab
+    results = getattr(tab, "results", None)
+    if not results or (tab.busy and not quiet):
+        if not quiet:
+            display_result(output_textbox, "No result to show in the grid yet.")
+        return None
+    open_result_grid(output_textbox.winfo_toplevel(), results[-1])
+    return None
+
+
+def cancel_query(output_textbox=None):
+    """Cancel the query running in the active tab (cooperatively)."""
+    tab = global_vars.current_tab
+    if tab is None or not tab.busy or tab.progress is None or tab.progress.finished:
+        if output_textbox:
+            display_result(output_textbox, "No query is running in this tab.")
+        return None
+    tab.progress.cancel()
+    return None
+
+
+# Statements that open or close a transaction themselves
+# (ROLLBACK TO <savepoint> stays inside the transaction)
+TRANSACTION_CONTROL = re.compile(
+    r"^(?:\s+|--[^\n]*\n|/\*.*?\*/)*"
+    r"(BEGIN|COMMIT|END|ROLLBACK(?!\s+(?:TRANSACTION\s+)?TO\b))\b",
+    re.IGNORECASE | re.DOTALL
+)
+
+# Statements that must run outside our batch transactions: PRAGMA
+# foreign_keys is a no-op inside one, VACUUM fails there
+OUTSIDE_TRANSACTION = re.compile(
+    r"^(?:\s+|--[^\n]*\n|/\*.*?\*/)*(PRAGMA|VACUUM|ATTACH|DETACH)\b",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def run_sql_file(output_textbox, filepath=None):
+    """
+    Execute an SQL file straight from disk, without loading it in the editor.
+
+    The file is read incrementally and executed statement by statement
+    on the worker of the active tab, so even very large dumps run with
+    bounded memory. A progress window shows bytes and statements done.
+
+    Args:
+        output_textbox : tkinter.Text
+            The output area for the final report.
+        filepath : str, optional
+            File to run (a dialog is shown if omitted).
+
+    Returns:
+        None
+    """
+    conn = global_vars.current_connection
+    if conn is None:
+        display_result(output_textbox, "No database connected. Use Database → Open…")
+        return None
+
+    tab = global_vars.current_tab
+    if tab is not None and tab.busy:
+        display_result(output_textbox, "A query is already running in this tab.")
+        return None
+
+    if not filepath:
+        filepath = filedialog.askopenfilename(
+            title="Run SQL File",
+            filetypes=[("SQL Files", "*.sql"), ("All Files", "*.*")]
+        )
+    if not filepath:
+        return None
+
+    total = max(os.path.getsize(filepath), 1)
+    progress = ProgressWindow(
+        output_textbox, "Running SQL file", os.path.basename(filepath), maximum=total
+    )
+    status = {"bytes": 0, "statements": 0}
+
+    def report(nbytes, nstatements):
+        # Called from the worker thread: only plain data is touched here
+        status["bytes"] = nbytes
+        status["statements"] = nstatements
+
+    args = (conn, filepath, report, lambda: progress.cancelled)
+    if tab is None:
+        execute_sql_file(*args, lambda text: show_result(output_textbox, text))
+        progress.close()
+        return None
+
+    future = run_in_tab(tab, output_textbox, execute_sql_file, *args)
+
+    def refresh():
+        progress.update(
+            status["bytes"],
+            f"{status['bytes'] // 1024:,} / {total // 1024:,} KB – "
+            f"{status['statements']:,} statement(s)"
+        )
+        if future.done():
+            progress.close()
+        else:
+            output_textbox.after(100, refresh)
+
+    refresh()
+    return None
+
+
+def execute_sql_file(conn, filepath, report, cancelled, emit):
+    """
+    Execute every statement of an SQL file in batched transactions.
+
+    Statements are grouped SQL_FILE_BATCH_SIZE at a time in one
+    transaction. When the script manages its own transactions
+    (BEGIN … COMMIT, as in .dump files), those are respected.
+    PRAGMA, VACUUM, ATTACH and DETACH run outside our batches (the
+    pending batch is committed first); foreign_keys is restored at the end.
+    Execution stops at the first error; the current batch is rolled back.
+    Does not touch any Tk widget (runs on a worker thread).
+
+    Args:
+        conn : sqlite3.Connection
+        filepath : str
+        report : callable
+            report(bytes_read, statements_done), called regularly.
+        cancelled : callable
+            Returns True when the user asked to stop.
+        emit : callable
+            Receives the output text.
+
+    Returns:
+        None
+    """
+    batch_size = global_vars.SQL_FILE_BATCH_SIZE
+    done = 0
+    pending = 0            # statements in our own open transaction
+    own_transaction = False
+    name = os.path.basename(filepath)
+    cur = conn.cursor()
+    # .dump files start with PRAGMA foreign_keys=OFF
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+
+    try:
+        with open(filepath, "rb") as f:
+            for statement, position in iter_sql_statements(f):
+                if cancelled():
+                    if conn.in_transaction:
+                        conn.rollback()
+                    emit(f"{name}: cancelled after {done:,} statement(s) "
+                         "(the last batch was rolled back).")
+                    return None
+
+                control = TRANSACTION_CONTROL.match(statement)
+                if control:
+                    if control.group(1).upper() == "BEGIN":
+                        # The script opens its own transaction: close our batch first
+                        if own_transaction and conn.in_transaction:
+                            conn.commit()
+                        cur.execute(statement)
+                    elif conn.in_transaction:
+                        # COMMIT / ROLLBACK apply to whatever is open, our batch included
+                        cur.execute(statement)
+                    own_transaction = False
+                    pending = 0
+                elif OUTSIDE_TRANSACTION.match(statement):
+                    if own_transaction and conn.in_transaction:
+                        conn.commit()
+                    own_transaction = False
+                    pending = 0
+                    cur.execute(statement)
+                else:
+                    if not conn.in_transaction:
+                        cur.execute("BEGIN")
+                        own_transaction = True
+                    cur.execute(statement)
+                    pending += 1
+                    if own_transaction and pending >= batch_size:
+                        conn.commit()
+                        own_transaction = False
+                        pending = 0
+
+                done += 1
+                if done % 100 == 0:
+                    report(position, done)
+
+        if conn.in_transaction:
+            conn.commit()
+        report(os.path.getsize(filepath), done)
+
+    except Exception as e:
+        if conn.in_transaction:
             try:
-                output_textbox.see("end")
+                conn.rollback()
             except Exception:
                 pass
+        emit(f"{name}: error in statement {done + 1}: {e}\n"
+             f"{done:,} statement(s) executed; the last batch was rolled back.")
+        return None
+    finally:
+        restore_foreign_keys(conn, foreign_keys)
 
-        except Exception as e:
-            if conn.in_transaction:
-                try:
-                    conn.rollback()
-                except Exception:
-                    pass
-            display_result(output_textbox, f"Error in statement {idx}: {e}")
+    emit(f"{name}: OK – {done:,} statement(s) executed.")
+    return None
 
-    # Pretty-print SQL after execution for visual consistency
-    if do_pretty_after:
-        pretty_print_sql(sql_textbox)
 
+def restore_foreign_keys(conn, enabled):
+    """Set PRAGMA foreign_keys back after a script changed it (outside a transaction only)."""
+    try:
+        if (not conn.in_transaction
+                and conn.execute("PRAGMA foreign_keys").fetchone()[0] != enabled):
+            conn.execute(f"PRAGMA foreign_keys = {int(enabled)}")
+    except Exception:
+        pass
+    return None
+
+
+def show_result(output_textbox, text):
+    """Display one piece of output and keep the end of the output visible."""
+    display_result(output_textbox, text)
+    try:
+        output_textbox.see("end")
+    except Exception:
+        pass
+    return None
+
+
+def run_in_tab(tab, output_textbox, func, *args, **kwargs):
+    """
+    Run func(*args, emit=..., **kwargs) on the worker thread of a workspace tab.
+
+    Text passed to 'emit' is queued by the worker and displayed by the
+    GUI thread, which polls the queue with after() (Tk is not thread-safe).
+
+    Args:
+        tab : workspace.QueryTab
+            The tab owning the connection.
+        output_textbox : tkinter.Text
+            Where to display the output.
+        func : callable
+            Worker function; receives *args, an 'emit' callable and **kwargs.
+
+    Returns:
+        concurrent.futures.Future
+    """
+    messages = queue.Queue()
+    tab.busy = True
+    refresh_tab_title(tab)
+    future = tab.executor.submit(func, *args, emit=messages.put, **kwargs)
+
+    def poll():
+        while True:
+            try:
+                text = messages.get_nowait()
+            except queue.Empty:
+                break
+            show_result(output_textbox, text)
+
+        if not future.done():
+            output_textbox.after(global_vars.POLL_INTERVAL_MS, poll)
+            return
+
+        # Drain whatever arrived between the last get and completion
+        while not messages.empty():
+            show_result(output_textbox, messages.get_nowait())
+        if future.exception() is not None:
+            show_result(output_textbox, f"Error: {future.exception()}")
+        tab.busy = False
+        refresh_tab_title(tab)
+
+    output_textbox.after(global_vars.POLL_INTERVAL_MS, poll)
+    return future
+
+
+def refresh_tab_title(tab):
+    """Update the notebook label of a tab (database name, busy marker)."""
+    try:
+        tab.frame.master.tab(tab.frame, text=tab.title())
+    except Exception:
+        pass
     return None
 
 
@@ -164,56 +789,129 @@ def get_tables(output_textbox):
         display_result(output_textbox, "No database connected.")
         return None
 
+    if global_vars.current_tab is not None and global_vars.current_tab.busy:
+        display_result(output_textbox, "A query is still running in this tab.")
+        return None
+
     try:
         cur = conn.cursor()
         cur.execute(
             "SELECT name FROM sqlite_master "
             "WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;"
         )
-        tables = [row[0] for row in cur.fetchall()]
+        indexes = list_search_indexes(conn)
+        tables = [row[0] for row in cur.fetchall() if not is_index_table(row[0], indexes)]
 
-        if not tables:
+        if not tables and not list_attached(conn):
             display_result(output_textbox, "No tables found in the current database.")
             return None
 
         output_textbox.config(state="normal")
         output_textbox.insert("end", "Tables in current database:\n\n", "tbl")
+        insert_table_list(output_textbox, cur, "main", tables)
+
+        # Databases attached with Database > Attach Database...
+        for alias, file in list_attached(conn):
+            cur.execute(
+                f"SELECT name FROM {quote_identifier(alias)}.sqlite_master "
+                "WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;"
+            )
+            output_textbox.insert("end", f"\nTables in {alias} ({os.path.basename(file)}):\n\n", "tbl")
+            insert_table_list(output_textbox, cur, alias, [row[0] for row in cur.fetchall()],
+                              prefix=f"{alias}.")
+
+        if indexes:
+            output_textbox.insert("end", "\nSearch indexes (use MATCH):\n", "tbl")
+            for fts, table, column in indexes:
+                output_textbox.insert("end", f"- {fts} on {table}.{column}\n")
 
-        for table in tables:
-            safe = table.replace("'", "''")
+        output_textbox.insert("end", "\n")
+        output_textbox.config(state="disabled")
 
-            # Column definitions and PK
-            cur.execute(f"PRAGMA table_info('{safe}');")
-            table_info = cur.fetchall()  # (cid, name, type, notnull, dflt, pk)
-            pk_cols = {row[1] for row in table_info if row[5] != 0}
+    except Exception as e:
+        display_result(output_textbox, f"Error retrieving tables:\n{e}")
 
-            # Foreign keys
-            cur.execute(f"PRAGMA foreign_key_list('{safe}');")
-            fk_info = cur.fetchall()      # (id, seq, table, from, to, on_update, on_delete, match)
-            fk_cols = {row[3] for row in fk_info}
+    return None
 
-            output_textbox.insert("end", f"- {table} (", "tbl")
-            for i, row in enumerate(table_info):
-                col = row[1]
 
-                if col in pk_cols:
-                    output_textbox.insert("end", col, "pk")
-                else:
-                    output_textbox.insert("end", col)
+def insert_table_list(output_textbox, cur, schema, tables, prefix=""):
+    """
+    Write one line per table: its columns, primary keys in red (tag 'pk')
+    and foreign keys marked with '#' (see get_tables).
 
-                if col in fk_cols:
-                    output_textbox.insert("end", "#")
+    Args:
+        output_textbox : tkinter.Text
+        cur : sqlite3.Cursor
+        schema : str
+            "main" or the alias of an attached database.
+        tables : list[str]
+        prefix : str
+            Written before each table name (e.g. "alias.").
+
+    Returns: None
+    """
+    q_schema = quote_identifier(schema)
+    for table in tables:
+        safe = table.replace("'", "''")
+
+        # Column definitions and PK
+        cur.execute(f"PRAGMA {q_schema}.table_info('{safe}');")
+        table_info = cur.fetchall()  # (cid, name, type, notnull, dflt, pk)
+        pk_cols = {row[1] for row in table_info if row[5] != 0}
+
+        # Foreign keys
+        cur.execute(f"PRAGMA {q_schema}.foreign_key_list('{safe}');")
+        fk_info = cur.fetchall()      # (id, seq, table, from, to, on_update, on_delete, match)
+        fk_cols = {row[3] for row in fk_info}
+
+        output_textbox.insert("end", f"- {prefix}{table} (", "tbl")
+        for i, row in enumerate(table_info):
+            col = row[1]
+
+            if col in pk_cols:
+                output_textbox.insert("end", col, "pk")
+            else:
+                output_textbox.insert("end", col)
 
-                if i < len(table_info) - 1:
-                    output_textbox.insert("end", ", ", "comma")
-            output_textbox.insert("end", ")\n")
+            if col in fk_cols:
+                output_textbox.insert("end", "#")
 
-        output_textbox.insert("end", "\n")
-        output_textbox.config(state="disabled")
+            if i < len(table_info) - 1:
+                output_textbox.insert("end", ", ", "comma")
+        output_textbox.insert("end", ")\n")
+    return None
 
-    except Exception as e:
-        display_result(output_textbox, f"Error retrieving tables:\n{e}")
 
+def database_info(output_textbox):
+    """
+    Show page, free-space, row-count and size statistics of the current
+    database (see db_info.py). The scan runs on the tab's worker, can be
+    stopped with the Stop button and is reused until the database changes.
+
+    Args:
+        output_textbox : tkinter.Text
+
+    Returns:
+        None
+    """
+    conn = global_vars.current_connection
+    tab = global_vars.current_tab
+    if conn is None:
+        display_result(output_textbox, "No database connected.")
+        return None
+    if tab is not None and tab.busy:
+        display_result(output_textbox, "A query is still running in this tab.")
+        return None
+
+    progress = QueryProgress(1)
+    if tab is None:
+        show_database_info(conn, lambda text: display_result(output_textbox, text),
+                           progress=progress)
+        return None
+    tab.progress = progress
+    future = run_in_tab(tab, output_textbox, show_database_info, conn,
+                        progress=progress, tab=tab)
+    watch_progress(tab, future)
     return None
 
 
@@ -257,7 +955,12 @@ def save_sql_code(sql_textbox, menu=None, force_save_as=False):
 
 
 def open_sql_code(sql_textbox, filepath=None, menu=None):
-    """Open an SQL file and load its content into the editor."""
+    """
+    Open an SQL file and load its content into the editor.
+
+    Files larger than global_vars.LARGE_SQL_FILE_BYTES are loaded in chunks
+    (see load_sql_file_in_chunks) so the GUI never freezes.
+    """
     if not filepath:
         filepath = filedialog.askopenfilename(
             title="Open SQL File",
@@ -269,6 +972,10 @@ def open_sql_code(sql_textbox, filepath=None, menu=None):
     global_vars.current_sql_file = filepath
 
     try:
+        if os.path.getsize(filepath) > global_vars.LARGE_SQL_FILE_BYTES:
+            load_sql_file_in_chunks(sql_textbox, filepath, menu=menu)
+            return None
+
         with open(filepath, "r", encoding="utf-8") as f:
             content = f.read()
         sql_textbox.delete("1.0", "end")
@@ -284,6 +991,195 @@ def open_sql_code(sql_textbox, filepath=None, menu=None):
     return None
 
 
+def load_sql_file_in_chunks(sql_textbox, filepath, menu=None):
+    """
+    Load a large SQL file into the editor a chunk at a time.
+
+    Each after() tick reads global_vars.LOAD_CHUNK_BYTES bytes and appends
+    them to the editor, while a small window shows a progress bar and a
+    Cancel button. Formatting and colouring are skipped, and undo is off
+    during the load (one undo record per chunk would be useless).
+
+    Args:
+        sql_textbox : tkinter.Text
+            The SQL editor widget.
+        filepath : str
+            File to load.
+        menu : tkinter.Menu, optional
+            SQL File menu to refresh once the file is loaded.
+
+    Returns:
+        None
+    """
+    total = max(os.path.getsize(filepath), 1)
+    f = open(filepath, "rb")
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    progress = ProgressWindow(
+        sql_textbox, "Opening SQL file", os.path.basename(filepath), maximum=total
+    )
+
+    sql_textbox.delete("1.0", "end")
+    sql_textbox.config(undo=False)
+
+    def finish(completed):
+        f.close()
+        progress.close()
+        sql_textbox.config(undo=True)
+        sql_textbox.edit_reset()
+        if completed:
+            update_recent_sql_files(filepath)
+            if menu:
+                refresh_sql_file_menu(menu, sql_textbox)
+        else:
+            sql_textbox.insert("end", "\n-- (loading cancelled)\n")
+
+    def step():
+        if progress.cancelled:
+            finish(False)
+            return
+        try:
+            data = f.read(global_vars.LOAD_CHUNK_BYTES)
+            sql_textbox.insert("end", decoder.decode(data, final=not data))
+        except Exception as e:
+            finish(False)
+            messagebox.showerror("Error", f"Failed to open file:\n{e}")
+            return
+
+        if not data:
+            finish(True)
+            return
+
+        done = f.tell()
+        progress.update(done, f"{done // 1024:,} / {total // 1024:,} KB")
+        sql_textbox.after(1, step)
+
+    sql_textbox.after(1, step)
+    return None
+
+
+class ProgressWindow:
+    """
+    Small non-modal window with a label, a progress bar and a Cancel button.
+
+    The long-running task checks 'cancelled' between two steps.
+    """
+
+    def __init__(self, parent, title, text, maximum=100):
+        self.cancelled = False
+        self.top = tk.Toplevel(parent)
+        self.top.title(title)
+        self.top.configure(bg=global_vars.bg_frame)
+        self.top.transient(parent.winfo_toplevel())
+        self.top.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        tk.Label(self.top, text=text, bg=global_vars.bg_frame,
+                 fg=global_vars.text_colour).pack(padx=10, pady=(10, 2), anchor="w")
+        self.bar = ttk.Progressbar(self.top, length=320, maximum=maximum)
+        self.bar.pack(padx=10, pady=2)
+        self.status = tk.Label(self.top, text="", bg=global_vars.bg_frame,
+                               fg=global_vars.text_colour)
+        self.status.pack(padx=10, pady=2, anchor="w")
+        tk.Button(self.top, text="Cancel", bg=global_vars.bg_button,
+                  fg=global_vars.text_colour, command=self.cancel).pack(pady=(2, 10))
+
+    def update(self, value, status=""):
+        """Move the bar and update the status line."""
+        self.bar["value"] = value
+        self.status.config(text=status)
+
+    def cancel(self):
+        """Ask the running task to stop at its next step."""
+        self.cancelled = True
+
+    def close(self):
+        """Destroy the window."""
+        try:
+            self.top.destroy()
+        except Exception:
+            pass
+
+
+def preview_sql_file(parent, filepath=None):
+    """
+    Show an SQL file read-only, one page at a time, straight from disk.
+
+    Only the page on screen is kept in memory, so even very large dumps
+    can be browsed instantly. Pages end on a line boundary.
+
+    Args:
+        parent : tkinter widget
+            Parent of the preview window.
+        filepath : str, optional
+            File to preview (a dialog is shown if omitted).
+
+    Returns:
+        None
+    """
+    if not filepath:
+        filepath = filedialog.askopenfilename(
+            title="Preview SQL File",
+            filetypes=[("SQL Files", "*.sql"), ("All Files", "*.*")]
+        )
+    if not filepath:
+        return None
+
+    total = os.path.getsize(filepath)
+    page_starts = [0]          # byte offset of each page seen so far
+    state = {"page": 0}
+
+    top = tk.Toplevel(parent)
+    top.title(f"Preview – {os.path.basename(filepath)}")
+    top.configure(bg=global_vars.bg_frame)
+
+    text = ScrolledText(top, width=100, height=35, background=global_vars.bg_textbox,
+                        font=("Courier", global_vars.font_size_sql))
+    text.pack(fill="both", expand=True)
+    bar = tk.Frame(top, bg=global_vars.bg_frame)
+    bar.pack(fill="x")
+    position = tk.Label(bar, bg=global_vars.bg_frame, fg=global_vars.text_colour)
+
+    def read_page(start):
+        with open(filepath, "rb") as f:
+            f.seek(start)
+            data = f.read(global_vars.PREVIEW_PAGE_BYTES)
+            # Extend to the end of the current line (at most one more page,
+            # a file without newlines must not be read whole)
+            if data and not data.endswith(b"\n"):
+                data += f.readline(global_vars.PREVIEW_PAGE_BYTES)
+        return data
+
+    def show(page):
+        start = page_starts[page]
+        data = read_page(start)
+        end = start + len(data)
+        if page + 1 == len(page_starts) and end < total:
+            page_starts.append(end)
+        state["page"] = page
+
+        text.config(state="normal")
+        text.delete("1.0", "end")
+        text.insert("1.0", data.decode("utf-8", errors="replace"))
+        text.config(state="disabled")
+        position.config(text=f"Page {page + 1} – bytes {start:,}–{end:,} of {total:,}")
+
+    def previous_page():
+        if state["page"] > 0:
+            show(state["page"] - 1)
+
+    def next_page():
+        if state["page"] + 1 < len(page_starts):
+            show(state["page"] + 1)
+
+    for label, command in (("◀ Previous", previous_page), ("Next ▶", next_page)):
+        tk.Button(bar, text=label, bg=global_vars.bg_button, fg=global_vars.text_colour,
+                  command=command).pack(side="left", padx=5, pady=3)
+    position.pack(side="left", padx=10)
+
+    show(0)
+    return None
+
+
 def change_font_size(selection, target_font, font_type):
     """Adjust the font size in either the SQL or output text box."""
     size = int(selection)
@@ -301,16 +1197,21 @@ def refresh_sql_file_menu(menu, textbox):
     """Rebuild the SQL File menu with updated recent entries."""
     menu.delete(0, 'end')
     menu.add_command(label="Open SQL...", command=lambda: open_sql_code(textbox, menu=menu))
+    menu.add_command(label="Preview SQL File...", command=lambda: preview_sql_file(textbox))
+    menu.add_command(
+        label="Run SQL File...",
+        command=lambda: run_sql_file(global_vars.output_textbox)
+    )
     menu.add_command(
     label="Save",
     accelerator="Ctrl+S",
-    command=lambda: save_sql_code(sql_textbox, sql_file_menu, force_save_as=False)
+    command=lambda: save_sql_code(textbox, menu, force_save_as=False)
     )
 
     menu.add_command(
         label="Save As...",
         accelerator="Ctrl+Shift+S",
-        command=lambda: save_sql_code(sql_textbox, sql_file_menu, force_save_as=True)
+        command=lambda: save_sql_code(textbox, menu, force_save_as=True)
     )
 
     menu.add_separator()
@@ -333,10 +1234,17 @@ def pretty_print_sql(sql_textbox):
         - Restore cursor and scroll position.
 
     The aim is to make SQL code visually consistent and easier to read.
+    Only the lines changed by the formatting are rewritten in the editor
+    (utils.apply_text_diff), so cursor, selection and undo history of the
+    untouched lines are preserved.
+    Buffers above global_vars.FORMAT_MAX_CHARS are left untouched.
+    When formatting profiling is on (Tools menu), the duration of each
+    phase is written to global_vars.FORMAT_PROFILE_LOG.
     """
-    import re
+    timer = PhaseTimer("pretty_print_sql", global_vars.profile_formatting)
+    if buffer_length(sql_textbox) > global_vars.FORMAT_MAX_CHARS:
+        return None
 
-    insert_idx = sql_textbox.index("insert")
     try:
         sel_start = sql_textbox.index("sel.first")
         sel_end = sql_textbox.index("sel.last")
@@ -351,27 +1259,32 @@ def pretty_print_sql(sql_textbox):
         x_frac = 0.0
 
     raw_query = sql_textbox.get("1.0", "end-1c")
+    timer.mark("read")
 
     formatted_query = insert_linebreaks_before_keywords(raw_query)
+    timer.mark("linebreaks")
 
     pattern = r'(;[^\n]*(?:\n--[^\n]*)*)(?=\n(?!\n))'
     formatted_query = re.sub(pattern, r'\1\n', formatted_query)
+    timer.mark("blank_lines")
 
     formatted_query = highlight_keywords(formatted_query)
+    timer.mark("keywords")
 
     try:
         sql_textbox.edit_separator()
     except Exception:
         pass
 
-    sql_textbox.delete("1.0", "end")
-    sql_textbox.insert("1.0", formatted_query)
+    changed_lines = apply_text_diff(sql_textbox, raw_query, formatted_query)
+    timer.mark("diff")
     colorize_keywords(sql_textbox)
+    timer.mark("colorize")
 
-    sql_textbox.mark_set("insert", insert_idx)
-    if had_sel:
-        sql_textbox.tag_remove("sel", "1.0", "end")
-        sql_textbox.tag_add("sel", sel_start, sel_end)
+    if changed_lines and had_sel:
+        # The selection follows its text unless a selected line was rewritten
+        if not sql_textbox.tag_ranges("sel"):
+            sql_textbox.tag_add("sel", sel_start, sel_end)
     sql_textbox.yview_moveto(top_frac)
     try:
         sql_textbox.xview_moveto(x_frac)
@@ -384,10 +1297,25 @@ def pretty_print_sql(sql_textbox):
         sql_textbox.edit_separator()
     except Exception:
         pass
+    timer.mark("restore_view")
 
+    timer.finish(
+        chars_in=len(raw_query),
+        chars_out=len(formatted_query),
+        changed_lines=changed_lines,
+        lines=formatted_query.count("\n") + 1,
+    )
     return None
 
 
+def buffer_length(text_widget):
+    """Number of characters in a Text widget, without copying its content."""
+    n = text_widget.count("1.0", "end-1c", "chars")
+    if isinstance(n, tuple):
+        n = n[0]
+    return n or 0
+
+
 def refresh_db_file_menu(menu, output_textbox, window=None, *, select_database):
     """
     Rebuild the 'Recent Databases' section of the Database menu.
@@ -405,7 +1333,7 @@ def refresh_db_file_menu(menu, output_textbox, window=None, *, select_database):
     Returns:
         None
     """
-    menu.delete(3, 'end')
+    menu.delete(_recent_db_section_start(menu), 'end')
     for i, filepath in enumerate(global_vars.recent_db_files, 1):
         short = os.path.basename(filepath)
         menu.add_command(
@@ -417,26 +1345,464 @@ def refresh_db_file_menu(menu, output_textbox, window=None, *, select_database):
     return None
 
 
+def prompt_take_snapshot(output_textbox):
+    """Ask for a snapshot name, then snapshot the current database."""
+    if global_vars.current_connection is None:
+        display_result(output_textbox, "No database connected.")
+        return None
+    if tab_is_busy(output_textbox):
+        return None
+
+    name = simpledialog.askstring("Take Snapshot", "Snapshot name:", initialvalue="start")
+    if not name:
+        return None
+
+    keep = False
+    if not global_vars.sandbox_active:
+        keep = messagebox.askyesno(
+            "Take Snapshot", "Also keep a copy next to the database file?"
+        )
+    take_snapshot(name, output_textbox, keep_on_disk=keep)
+    return None
+
+
+def prompt_compare_database(output_textbox):
+    """
+    Ask for a reference database and compare the current database with it
+    (schema and rows, see db_diff.py) on the tab's worker. The Cancel
+    button stops the comparison.
+
+    Args:
+        output_textbox : tkinter.Text
+
+    Returns:
+        None
+    """
+    conn = global_vars.current_connection
+    tab = global_vars.current_tab
+    if conn is None:
+        display_result(output_textbox, "No database connected.")
+        return None
+    if tab is not None and tab.busy:
+        display_result(output_textbox, "Wait for the running query to finish first.")
+        return None
+
+    reference = filedialog.askopenfilename(
+        title="Compare with Reference Database",
+        filetypes=[("SQLite Database", "*.db *.sqlite *.sqlite3"), ("All Files", "*.*")]
+    )
+    if not reference:
+        return None
+
+    progress = QueryProgress(1)
+    if tab is None:
+        compare_with_reference(conn, reference, lambda text: display_result(output_textbox, text),
+                               progress=progress)
+        return None
+    tab.progress = progress
+    future = run_in_tab(tab, output_textbox, compare_with_reference, conn, reference,
+                        progress=progress)
+    watch_progress(tab, future)
+    return None
+
+
+def run_maintenance_action(action, output_textbox):
+    """
+    Run a maintenance action (see maintenance.ACTIONS) on the current
+    database, on the tab's worker, with progress in the status line.
+
+    Args:
+        action : str
+            Key of maintenance.ACTIONS.
+        output_textbox : tkinter.Text
+
+    Returns:
+        None
+    """
+    conn = global_vars.current_connection
+    tab = global_vars.current_tab
+    if conn is None:
+        display_result(output_textbox, "No database connected.")
+        return None
+    if tab is not None and tab.busy:
+        display_result(output_textbox, "Wait for the running query to finish first.")
+        return None
+
+    target = None
+    if action == "VACUUM INTO":
+        target = filedialog.asksaveasfilename(
+            title="Write a Compacted Copy",
+            defaultextension=".db",
+            filetypes=[("SQLite Database", "*.db"), ("All Files", "*.*")]
+        )
+        if not target:
+            return None
+        if os.path.abspath(target) == os.path.abspath(global_vars.current_database or ""):
+            display_result(output_textbox, "Choose another file than the current database.")
+            return None
+        # An existing target is replaced only once the copy succeeded
+        # (the dialog already confirmed overwriting), see maintenance.vacuum_into
+
+    progress = QueryProgress(1)
+    if tab is None:
+        run_maintenance(conn, action, target,
+                        emit=lambda text: display_result(output_textbox, text), progress=progress)
+        return None
+    tab.progress = progress
+    future = run_in_tab(tab, output_textbox, run_maintenance, conn, action, target,
+                        progress=progress)
+    watch_progress(tab, future)
+    return None
+
+
+def refresh_snapshot_menu(menu, output_textbox):
+    """Rebuild the 'Reset to Snapshot' submenu from the available snapshots."""
+    menu.delete(0, 'end')
+    names = list_snapshots()
+    if not names:
+        menu.add_command(label="(no snapshot)", state="disabled")
+        return None
+
+    for name in names:
+        menu.add_command(
+            label=name,
+            command=lambda n=name: reset_to_snapshot(n, output_textbox)
+        )
+    return None
+
+
+def prompt_attach_database(output_textbox):
+    """Ask for a database file and an alias, then attach it to the active connection."""
+    if global_vars.current_connection is None:
+        display_result(output_textbox, "No database connected.")
+        return None
+    if tab_is_busy(output_textbox):
+        return None
+
+    path = filedialog.askopenfilename(
+        title="Attach Database",
+        filetypes=[("SQLite Database", "*.db *.sqlite *.sqlite3"), ("All Files", "*.*")]
+    )
+    if not path:
+        return None
+    alias = simpledialog.askstring("Attach Database", "Alias (schema name in queries):",
+                                   initialvalue=default_alias(path))
+    if not alias:
+        return None
+    attach_database(path, alias, output_textbox)
+    return None
+
+
+def refresh_detach_menu(menu, output_textbox):
+    """Rebuild the 'Detach Database' submenu from the attached databases."""
+    menu.delete(0, 'end')
+    tab = global_vars.current_tab
+    if tab is not None and tab.busy:
+        # The worker is using the connection: do not query it from here
+        menu.add_command(label="(a query is running)", state="disabled")
+        return None
+
+    conn = global_vars.current_connection
+    attached = list_attached(conn) if conn is not None else []
+    if not attached:
+        menu.add_command(label="(no attached database)", state="disabled")
+        return None
+
+    for alias, file in attached:
+        menu.add_command(
+            label=f"{alias} ({os.path.basename(file)})",
+            command=lambda a=alias: detach_database(a, output_textbox)
+        )
+    return None
+
+
+def refresh_results_menu(menu, parent, grid_var=None, cache_var=None):
+    """Rebuild the Results menu: grid view, result cache, then the full results saved to disk."""
+    menu.delete(0, 'end')
+    menu.add_command(
+        label="Show Last Result in Grid",
+        command=lambda: show_last_result_grid(global_vars.output_textbox)
+    )
+    if grid_var is not None:
+        menu.add_checkbutton(
+            label="Always Show Results in Grid",
+            variable=grid_var,
+            command=lambda: setattr(global_vars, "grid_view", grid_var.get())
+        )
+    if cache_var is not None:
+        menu.add_checkbutton(
+            label="Cache Results in TEMP Tables",
+            variable=cache_var,
+            command=lambda: setattr(global_vars, "cache_results", cache_var.get())
+        )
+    menu.add_command(
+        label="Sort / Filter / Group...",
+        command=lambda: explore_cached_result(parent, global_vars.output_textbox)
+    )
+    menu.add_separator()
+
+    if not global_vars.spilled_results:
+        menu.add_command(label="(no saved result)", state="disabled")
+        return None
+
+    for result in reversed(global_vars.spilled_results):
+        submenu = tk.Menu(menu, tearoff=0)
+        submenu.add_command(
+            label="View...",
+            command=lambda r=result: preview_sql_file(parent, r.path)
+        )
+        submenu.add_command(
+            label="Export as CSV...",
+            command=lambda r=result: export_spilled_result(r)
+        )
+        menu.add_cascade(label=result.label(), menu=submenu)
+    return None
+
+
+def explore_cached_result(parent, output_textbox):
+    """
+    Sort, filter or group a cached result (TEMP table) of the active tab.
+
+    The chosen options are turned into a query on the TEMP table, which
+    runs like any other statement but without caching its own result.
+
+    Args:
+        parent : tkinter widget
+        output_textbox : tkinter.Text
+
+    Returns:
+        None
+    """
+    conn = global_vars.current_connection
+    tab = global_vars.current_tab
+    if conn is None or (tab is not None and tab.busy):
+        display_result(output_textbox, "Wait for the running query to finish first.")
+        return None
+
+    tables = list_cached_results(conn)
+    if not tables:
+        display_result(output_textbox, "No cached result yet – tick Results → Cache Results "
+                                       "in TEMP Tables, then run a SELECT.")
+        return None
+
+    top = tk.Toplevel(parent)
+    top.title("Sort / Filter / Group Result")
+    top.configure(bg=global_vars.bg_frame)
+
+    table_var = tk.StringVar(value=tables[-1])
+    where_var = tk.StringVar()
+    sort_var = tk.StringVar()
+    desc_var = tk.BooleanVar(value=False)
+    group_var = tk.StringVar()
+
+    def label(text, row):
+        tk.Label(top, text=text, bg=global_vars.bg_frame,
+                 fg=global_vars.text_colour).grid(row=row, column=0, sticky="w", padx=5, pady=3)
+
+    label("Result :", 0)
+    table_box = ttk.Combobox(top, textvariable=table_var, values=tables, state="readonly", width=30)
+    table_box.grid(row=0, column=1, sticky="w", padx=5)
+    label("Only rows where :", 1)
+    tk.Entry(top, textvariable=where_var, width=40).grid(row=1, column=1, columnspan=2, sticky="w", padx=5)
+    label("Sort by :", 2)
+    sort_box = ttk.Combobox(top, textvariable=sort_var, state="readonly", width=30)
+    sort_box.grid(row=2, column=1, sticky="w", padx=5)
+    tk.Checkbutton(top, text="descending", variable=desc_var,
+                   bg=global_vars.bg_frame).grid(row=2, column=2, sticky="w")
+    label("Group by :", 3)
+    group_box = ttk.Combobox(top, textvariable=group_var, state="readonly", width=30)
+    group_box.grid(row=3, column=1, sticky="w", padx=5)
+
+    def load_columns(event=None):
+        table = quote_identifier(table_var.get())
+        columns = [row[1] for row in conn.execute(f"PRAGMA temp.table_info({table})")]
+        sort_box["values"] = [""] + columns + ["count"]
+        group_box["values"] = [""] + columns
+        sort_var.set("")
+        group_var.set("")
+
+    def apply():
+        table = "temp." + quote_identifier(table_var.get())
+        where = f"\nWHERE {where_var.get().strip()}" if where_var.get().strip() else ""
+        direction = " DESC" if desc_var.get() else ""
+
+        if group_var.get():
+            group = quote_identifier(group_var.get())
+            sort = quote_identifier(sort_var.get()) if sort_var.get() else "count"
+            if sort_var.get() not in ("", "count", group_var.get()):
+                sort = group
+            sql = (f"SELECT {group}, COUNT(*) AS count\nFROM {table}{where}\n"
+                   f"GROUP BY {group}\nORDER BY {sort}{direction};")
+        else:
+            order = ""
+            if sort_var.get() and sort_var.get() != "count":
+                order = f"\nORDER BY {quote_identifier(sort_var.get())}{direction}"
+            sql = f"SELECT *\nFROM {table}{where}{order};"
+
+        display_result(output_textbox, sql)
+        run_statements(output_textbox, [sql], cache_results=False)
+
+    table_box.bind("<<ComboboxSelected>>", load_columns)
+    tk.Button(top, text="Apply", width=10, bg=global_vars.bg_button,
+              fg=global_vars.text_colour, command=apply).grid(row=4, column=1, sticky="w", padx=5, pady=8)
+    load_columns()
+    return None
+
+
+def prompt_search_index(parent, output_textbox):
+    """
+    Dialog to create or remove the full-text search index of a table
+    column (see search_index.py). The index is built on the tab's worker.
+
+    Args:
+        parent : tkinter widget
+        output_textbox : tkinter.Text
+
+    Returns:
+        None
+    """
+    conn = global_vars.current_connection
+    tab = global_vars.current_tab
+    if conn is None:
+        display_result(output_textbox, "No database connected.")
+        return None
+    if tab is not None and tab.busy:
+        display_result(output_textbox, "Wait for the running query to finish first.")
+        return None
+
+    indexes = list_search_indexes(conn)
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM main.sqlite_master WHERE type = 'table' "
+        "AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL TABLE%' ORDER BY name"
+    ) if not is_index_table(row[0], indexes)]
+    if not tables:
+        display_result(output_textbox, "No tables found in the current database.")
+        return None
+
+    top = tk.Toplevel(parent)
+    top.title("Search Index")
+    top.configure(bg=global_vars.bg_frame)
+
+    table_var = tk.StringVar(value=tables[0])
+    column_var = tk.StringVar()
+    state_var = tk.StringVar()
+
+    for row, text in enumerate(("Table :", "Text column :")):
+        tk.Label(top, text=text, bg=global_vars.bg_frame,
+                 fg=global_vars.text_colour).grid(row=row, column=0, sticky="w", padx=5, pady=3)
+    table_box = ttk.Combobox(top, textvariable=table_var, values=tables, state="readonly", width=30)
+    table_box.grid(row=0, column=1, sticky="w", padx=5)
+    column_box = ttk.Combobox(top, textvariable=column_var, state="readonly", width=30)
+    column_box.grid(row=1, column=1, sticky="w", padx=5)
+    tk.Label(top, textvariable=state_var, bg=global_vars.bg_frame,
+             fg=global_vars.text_colour).grid(row=2, column=0, columnspan=3, sticky="w", padx=5)
+
+    def indexed():
+        return any(t == table_var.get() and c == column_var.get() for _f, t, c in indexes)
+
+    def show_state(event=None):
+        state_var.set("This column already has a search index." if indexed()
+                      else "No search index on this column yet.")
+
+    def load_columns(event=None):
+        info = conn.execute(f"PRAGMA main.table_info({quote_identifier(table_var.get())})").fetchall()
+        # Text columns first (declared type TEXT / CHAR / CLOB, or no type)
+        text = [r[1] for r in info if re.search("CHAR|CLOB|TEXT", r[2], re.I) or not r[2]]
+        other = [r[1] for r in info if r[1] not in text]
+        column_box["values"] = text + other
+        column_var.set((text + other)[0] if info else "")
+        show_state()
+
+    def run(action):
+        table, column = table_var.get(), column_var.get()
+        if not column:
+            return
+        top.destroy()
+        if tab is None:
+            action(conn, table, column, emit=lambda text: display_result(output_textbox, text))
+        else:
+            run_in_tab(tab, output_textbox, action, conn, table, column)
+
+    table_box.bind("<<ComboboxSelected>>", load_columns)
+    column_box.bind("<<ComboboxSelected>>", show_state)
+    buttons = tk.Frame(top, bg=global_vars.bg_frame)
+    buttons.grid(row=3, column=1, sticky="w", padx=5, pady=8)
+    tk.Button(buttons, text="Create", width=10, bg=global_vars.bg_button, fg=global_vars.text_colour,
+              command=lambda: run(create_search_index)).pack(side="left")
+    tk.Button(buttons, text="Remove", width=10, bg=global_vars.bg_button, fg=global_vars.text_colour,
+              command=lambda: run(drop_search_index)).pack(side="left", padx=5)
+    load_columns()
+    return None
+
+
+def export_spilled_result(result):
+    """Copy a saved result (CSV) to a file chosen by the user."""
+    filepath = filedialog.asksaveasfilename(
+        title="Export Result",
+        defaultextension=".csv",
+        filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")]
+    )
+    if not filepath:
+        return None
+    try:
+        shutil.copyfile(result.path, filepath)
+    except Exception as e:
+        messagebox.showerror("Error", f"Failed to export result:\n{e}")
+    return None
+
+
+def set_result_row_cap(selection):
+    """Change the number of rows shown for SELECTs without LIMIT."""
+    global_vars.result_row_cap = int(selection.replace(",", ""))
+    return None
+
+
+def _recent_db_section_start(menu):
+    """
+    Return the index of the first 'Recent Databases' entry, i.e. the entry
+    right after the last separator of the Database menu.
+    """
+    last = menu.index('end')
+    if last is None:
+        return 0
+    for i in range(last, -1, -1):
+        if menu.type(i) == "separator":
+            return i + 1
+    return 0
+
+
 # =========================
 # GUI CALLBACK WRAPPERS
 # =========================
 
 def choose_recent_db(filepath, menu, output_textbox, window, select_database):
     """Open a recent database and refresh the menu list."""
+    if tab_is_busy(output_textbox):
+        return None
     select_database(filepath, output_textbox=output_textbox, window=window, db_menu=None)
     refresh_db_file_menu(menu, output_textbox, window, select_database=select_database)
+    if global_vars.current_tab is not None:
+        refresh_tab_title(global_vars.current_tab)
     return None
 
 
 def open_and_refresh(menu, output_textbox, window, select_database, open_db_func):
     """Open a database via dialogue, then refresh the 'Recent' section."""
+    if tab_is_busy(output_textbox):
+        return None
     open_db_func(output_textbox, window, db_menu=None)
     refresh_db_file_menu(menu, output_textbox, window, select_database=select_database)
+    if global_vars.current_tab is not None:
+        refresh_tab_title(global_vars.current_tab)
     return None
 
 
 def create_and_refresh(menu, output_textbox, window, select_database, create_db_func):
     """Create a new database and refresh the 'Recent' section."""
+    if tab_is_busy(output_textbox):
+        return None
     create_db_func(output_textbox, window, db_menu=None)
     refresh_db_file_menu(menu, output_textbox, window, select_database=select_database)
+    if global_vars.current_tab is not None:
+        refresh_tab_title(global_vars.current_tab)
     return None
@@ -3,13 +3,39 @@
 # Author : Théo Giani — 2025
 
 import os
+import re
 import sqlite3
+import tempfile
+from pathlib import Path
 from tkinter import filedialog, simpledialog
 import global_vars
 from utils import save_recent_files, display_result
+from sql_functions import register_functions
+from maintenance import optimize_before_close
 # from GUI_functions import refresh_db_file_menu
 
 
+def tab_is_busy(output_textbox=None):
+    """
+    Return True (and tell the user) while the active tab's worker runs a
+    query: its connection must not be used, committed or replaced from the
+    GUI thread meanwhile.
+
+    Args:
+        output_textbox : tkinter.Text, optional
+            Output area for the message.
+
+    Returns:
+        bool
+    """
+    tab = global_vars.current_tab
+    if tab is None or not tab.busy:
+        return False
+    if output_textbox:
+        display_result(output_textbox, "Wait for the running query to finish first (or press Stop).")
+    return True
+
+
 def menu_open_database(output_textbox, window=None, db_menu=None):
     """
     Open an existing SQLite database file and set it as the current one.
@@ -94,11 +120,15 @@ def create_new_database(output_textbox, window=None, db_menu=None):
     return None
 
 
-def choose_database(value, *, output_textbox=None, window=None, db_menu=None):
+def choose_database(value, *, output_textbox=None, window=None, db_menu=None, sandbox=None):
     """
     Close any existing connection and open a new one to the selected database.
     Updates both the UI and the recent databases list.
 
+    In sandbox mode the file is copied into an in-memory database with the
+    SQLite backup API: queries run in RAM and the original file is never
+    modified unless the user explicitly saves the sandbox back.
+
     Args:
         value : str
             Full path to the database file.
@@ -108,9 +138,15 @@ def choose_database(value, *, output_textbox=None, window=None, db_menu=None):
             The main window (to update the title).
         db_menu : tkinter.Menu, optional
             Not used directly; the GUI handles refreshing.
+        sandbox : bool or None, optional
+            Open the database as an in-memory copy.
+            None means "use global_vars.sandbox_enabled".
 
     Returns: None
     """
+    if tab_is_busy(output_textbox):
+        return None
+
     if not os.path.exists(value):
         if output_textbox:
             display_result(output_textbox, f"File not found: {value}")
@@ -119,24 +155,38 @@ def choose_database(value, *, output_textbox=None, window=None, db_menu=None):
             save_recent_files("recent_db_files.txt", global_vars.recent_db_files)
         return None
 
+    if sandbox is None:
+        sandbox = global_vars.sandbox_enabled
+
     # Close the current connection before opening another
     close_active_connection(commit_changes=True)
 
-    conn = sqlite3.connect(value)
     try:
-        conn.execute("PRAGMA foreign_keys = ON")
-    except Exception:
-        pass
+        conn = open_sandbox_connection(value) if sandbox else connect(value)
+    except Exception as e:
+        if output_textbox:
+            display_result(output_textbox, f"Error opening database: {e}")
+        return None
+
+    configure_connection(conn)
 
     global_vars.current_connection = conn
     global_vars.current_database = value
+    global_vars.sandbox_active = bool(sandbox)
 
     if output_textbox:
         name = os.path.basename(value)
-        display_result(output_textbox, f"Database selected: {name}")
+        if sandbox:
+            display_result(
+                output_textbox,
+                f"Database selected: {name} (sandbox – changes stay in memory "
+                "until you save them back)"
+            )
+        else:
+            display_result(output_textbox, f"Database selected: {name}")
 
     if window:
-        window.title(f"SQL Desk – {value}")
+        update_window_title(window)
 
     add_recent_db_file(value)
     return None
@@ -171,13 +221,277 @@ def close_active_connection(commit_changes=True):
                     conn.rollback()
                 except Exception:
                     pass
+
+        # Keep the planner statistics fresh (a sandbox is thrown away anyway).
+        # After the transaction is resolved, so a rollback does not undo it.
+        if global_vars.optimize_on_close and not global_vars.sandbox_active:
+            optimize_before_close(conn)
     finally:
         try:
             conn.close()
         except Exception:
             pass
         global_vars.current_connection = None
+        global_vars.sandbox_active = False
+
+    return None
+
+
+def update_window_title(window):
+    """
+    Show the current database (and whether it is a sandbox) in the title bar.
+
+    Args:
+        window : tkinter.Tk
+            The main window.
+
+    Returns: None
+    """
+    title = f"SQL Desk – {global_vars.current_database}"
+    if global_vars.sandbox_active:
+        title += " [sandbox]"
+    window.title(title)
+    return None
+
+
+def connect(database, **kwargs):
+    """
+    Open an SQLite connection the way SQL Desk uses it.
+
+    Connections are created on the GUI thread but queries run on the
+    worker thread of their workspace tab, hence check_same_thread=False.
+    A tab never uses its connection from two threads at the same time.
+
+    Args:
+        database : str
+            Path, URI or ":memory:".
+        **kwargs :
+            Extra arguments for sqlite3.connect().
+
+    Returns:
+        sqlite3.Connection
+    """
+    return sqlite3.connect(database, check_same_thread=False, **kwargs)
+
+
+def configure_connection(conn):
+    """
+    Apply SQL Desk's settings to a freshly opened connection:
+    foreign keys on, the function pack (median, stddev, REGEXP…, see
+    sql_functions.py), and the student mode limits if enabled.
+
+    Args:
+        conn : sqlite3.Connection
+
+    Returns: None
+    """
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+    except Exception:
+        pass
+    register_functions(conn)
+    apply_student_limits(conn)
+    return None
+
+
+# =========================
+# STUDENT MODE LIMITS
+# =========================
+
+# SQLite limits controlled by student mode, with their STUDENT_LIMITS key
+_STUDENT_SQLITE_LIMITS = (
+    ("SQLITE_LIMIT_LENGTH", "max_value_bytes"),
+    ("SQLITE_LIMIT_SQL_LENGTH", "max_sql_bytes"),
+)
+_default_limits = {}
+
+
+def apply_student_limits(conn):
+    """
+    Set (student mode on) or restore (student mode off) the SQLite limits
+    of a connection.
+
+    The time, VM-step and row budgets are enforced per statement by
+    run_sql() through the progress handler; here we only set what
+    SQLite enforces itself: maximum value / statement length
+    (Connection.setlimit, Python 3.11+) and the heap limit.
+
+    PRAGMA hard_heap_limit is process-wide and can only be lowered,
+    so it stays in force until SQL Desk is restarted.
+
+    Args:
+        conn : sqlite3.Connection
+
+    Returns: None
+    """
+    limits = global_vars.STUDENT_LIMITS
+
+    if hasattr(conn, "setlimit"):
+        for name, key in _STUDENT_SQLITE_LIMITS:
+            category = getattr(sqlite3, name)
+            if category not in _default_limits:
+                _default_limits[category] = conn.getlimit(category)
+            if global_vars.student_mode:
+                conn.setlimit(category, limits[key])
+            else:
+                conn.setlimit(category, _default_limits[category])
+
+    if global_vars.student_mode:
+        try:
+            conn.execute(f"PRAGMA hard_heap_limit = {int(limits['heap_limit_bytes'])}")
+        except Exception:
+            pass
+    return None
+
+
+def set_student_mode(enabled, output_textbox=None):
+    """
+    Switch student mode on or off for every open connection (all tabs).
+
+    The connection of a tab running a query is left alone (its worker is
+    using it): run_statements() applies the limits before its next run.
+
+    Args:
+        enabled : bool
+        output_textbox : tkinter.Text, optional
+            Output area for messages.
+
+    Returns: None
+    """
+    global_vars.student_mode = bool(enabled)
+
+    connections = {}
+    if global_vars.current_tab is None:
+        connections[id(global_vars.current_connection)] = global_vars.current_connection
+    for tab in global_vars.tabs:
+        conn = (global_vars.current_connection if tab is global_vars.current_tab
+                else tab.current_connection)
+        if not tab.busy:
+            connections[id(conn)] = conn
+    for conn in connections.values():
+        if conn is not None:
+            apply_student_limits(conn)
+
+    if output_textbox:
+        limits = global_vars.STUDENT_LIMITS
+        if enabled:
+            display_result(
+                output_textbox,
+                "Student mode ON – each statement is limited to "
+                f"{limits['max_seconds']} s, {limits['max_vm_steps']:,} VM steps "
+                f"and {limits['max_rows']:,} rows; SQLite memory is capped at "
+                f"{limits['heap_limit_bytes'] // 1024 ** 2} MB."
+            )
+        else:
+            display_result(
+                output_textbox,
+                "Student mode OFF (the SQLite memory cap stays until SQL Desk is restarted)."
+            )
+    return None
+
+
+# =========================
+# SANDBOX (IN-MEMORY) MODE
+# =========================
+
+def open_sandbox_connection(path):
+    """
+    Copy a database file into a new in-memory connection.
+
+    The source file is opened read-only and copied page by page with
+    Connection.backup(), so the original is never locked for writing.
+
+    Args:
+        path : str
+            Path to the database file.
+
+    Returns:
+        sqlite3.Connection : The in-memory copy.
+    """
+    source = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    # URI filenames on, so attach_database() can attach files read-only
+    memory = connect("file::memory:", uri=True)
+    try:
+        source.backup(memory)
+    except Exception:
+        memory.close()
+        raise
+    finally:
+        source.close()
+    return memory
+
+
+def save_sandbox(output_textbox=None):
+    """
+    Write the in-memory sandbox back over the original database file.
+
+    Args:
+        output_textbox : tkinter.Text, optional
+            Output area for messages.
+
+    Returns: None
+    """
+    conn = global_vars.current_connection
+    if conn is None or not global_vars.sandbox_active:
+        if output_textbox:
+            display_result(output_textbox, "No sandbox is active.")
+        return None
+    if tab_is_busy(output_textbox):
+        return None
+
+    try:
+        if conn.in_transaction:
+            conn.commit()
+        target = sqlite3.connect(global_vars.current_database)
+        try:
+            conn.backup(target)
+        finally:
+            target.close()
+    except Exception as e:
+        if output_textbox:
+            display_result(output_textbox, f"Error saving sandbox: {e}")
+        return None
+
+    if output_textbox:
+        name = os.path.basename(global_vars.current_database)
+        display_result(output_textbox, f"Sandbox saved back to {name}.")
+    return None
+
+
+def discard_sandbox(output_textbox=None):
+    """
+    Throw away every change made in the sandbox and reload the file from disk.
+
+    Args:
+        output_textbox : tkinter.Text, optional
+            Output area for messages.
+
+    Returns: None
+    """
+    if global_vars.current_connection is None or not global_vars.sandbox_active:
+        if output_textbox:
+            display_result(output_textbox, "No sandbox is active.")
+        return None
+    if tab_is_busy(output_textbox):
+        return None
+
+    try:
+        fresh = open_sandbox_connection(global_vars.current_database)
+        configure_connection(fresh)
+    except Exception as e:
+        if output_textbox:
+            display_result(output_textbox, f"Error reloading database: {e}")
+        return None
 
+    try:
+        global_vars.current_connection.close()
+    except Exception:
+        pass
+    global_vars.current_connection = fresh
+
+    if output_textbox:
+        name = os.path.basename(global_vars.current_database)
+        display_result(output_textbox, f"Sandbox changes discarded – {name} reloaded from disk.")
     return None
 
 
@@ -203,3 +517,308 @@ def add_recent_db_file(filename: str):
 
     save_recent_files("recent_db_files.txt", global_vars.recent_db_files)
     return None
+
+
+# =========================
+# SNAPSHOTS
+# =========================
+
+def _serialize(conn):
+    """Return the whole 'main' database of a connection as bytes."""
+    if hasattr(conn, "serialize"):              # Python 3.11+
+        return conn.serialize()
+
+    # Older Pythons: back up into a temporary file and read its image
+    fd, tmp_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        target = sqlite3.connect(tmp_path)
+        try:
+            conn.backup(target)
+        finally:
+            target.close()
+        with open(tmp_path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(tmp_path)
+
+
+def _restore(conn, data):
+    """Replace the content of a connection's 'main' database with a snapshot."""
+    if conn.in_transaction:
+        conn.rollback()
+
+    if hasattr(conn, "deserialize") and global_vars.sandbox_active:
+        # In-memory database: swap the pages in place
+        conn.deserialize(data)
+        return None
+
+    # File database: deserialize() would detach it from the file,
+    # so copy the snapshot back page by page instead.
+    tmp_path = None
+    if hasattr(conn, "deserialize"):
+        source = sqlite3.connect(":memory:")
+        source.deserialize(data)
+    else:
+        fd, tmp_path = tempfile.mkstemp(suffix=".db")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        source = sqlite3.connect(tmp_path)
+
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+        if tmp_path:
+            os.remove(tmp_path)
+    return None
+
+
+def snapshot_file_path(database, name):
+    """
+    Path of the on-disk copy of a snapshot, stored next to the database.
+    Keyed by the full file name: Library.db and Library.sqlite do not share
+    their snapshots.
+    """
+    return f"{database}.{name}{global_vars.SNAPSHOT_SUFFIX}"
+
+
+def list_snapshots(database=None):
+    """
+    List the snapshot names available for a database,
+    both in memory and saved next to the file.
+
+    Args:
+        database : str, optional
+            Database path (defaults to the current database).
+
+    Returns:
+        list[str] : Sorted snapshot names.
+    """
+    database = database or global_vars.current_database
+    if not database:
+        return []
+
+    names = set(global_vars.snapshots.get(database, {}))
+
+    folder = os.path.dirname(os.path.abspath(database))
+    prefix = os.path.basename(database) + "."
+    try:
+        for filename in os.listdir(folder):
+            if filename.startswith(prefix) and filename.endswith(global_vars.SNAPSHOT_SUFFIX):
+                name = filename[len(prefix):-len(global_vars.SNAPSHOT_SUFFIX)]
+                # Snapshot names have no '.': anything else belongs to another
+                # database (e.g. Library.db.v2.db.<name>.snapshot)
+                if re.fullmatch(r"[\w-]+", name):
+                    names.add(name)
+    except OSError:
+        pass
+
+    return sorted(names)
+
+
+def take_snapshot(name, output_textbox=None, keep_on_disk=False):
+    """
+    Store the current state of the active database under a name.
+
+    Args:
+        name : str
+            Snapshot name (letters, digits, '-' and '_').
+        output_textbox : tkinter.Text, optional
+            Output area for messages.
+        keep_on_disk : bool, default=False
+            Also write the snapshot next to the database file.
+
+    Returns: None
+    """
+    conn = global_vars.current_connection
+    if conn is None:
+        if output_textbox:
+            display_result(output_textbox, "No database connected.")
+        return None
+    if tab_is_busy(output_textbox):
+        return None
+
+    name = re.sub(r"[^\w-]+", "_", name.strip())
+    if not name:
+        return None
+
+    try:
+        if conn.in_transaction:
+            conn.commit()
+        data = _serialize(conn)
+        global_vars.snapshots.setdefault(global_vars.current_database, {})[name] = data
+        global_vars.last_snapshot[global_vars.current_database] = name
+        if keep_on_disk:
+            with open(snapshot_file_path(global_vars.current_database, name), "wb") as f:
+                f.write(data)
+    except Exception as e:
+        if output_textbox:
+            display_result(output_textbox, f"Error taking snapshot: {e}")
+        return None
+
+    if output_textbox:
+        size_kb = len(data) / 1024
+        display_result(output_textbox, f"Snapshot '{name}' taken ({size_kb:.0f} KB).")
+    return None
+
+
+def reset_to_snapshot(name, output_textbox=None):
+    """
+    Restore the active database to a named snapshot without reconnecting.
+
+    Args:
+        name : str or None
+            Snapshot name (None means the last snapshot taken of the
+            active database).
+        output_textbox : tkinter.Text, optional
+            Output area for messages.
+
+    Returns: None
+    """
+    name = name or global_vars.last_snapshot.get(global_vars.current_database)
+    if not name:
+        if output_textbox:
+            display_result(output_textbox, "No snapshot taken yet.")
+        return None
+
+    conn = global_vars.current_connection
+    if conn is None:
+        if output_textbox:
+            display_result(output_textbox, "No database connected.")
+        return None
+    if tab_is_busy(output_textbox):
+        return None
+
+    database = global_vars.current_database
+    data = global_vars.snapshots.get(database, {}).get(name)
+
+    try:
+        if data is None:
+            with open(snapshot_file_path(database, name), "rb") as f:
+                data = f.read()
+            global_vars.snapshots.setdefault(database, {})[name] = data
+        _restore(conn, data)
+    except Exception as e:
+        if output_textbox:
+            display_result(output_textbox, f"Error restoring snapshot '{name}': {e}")
+        return None
+
+    if output_textbox:
+        display_result(output_textbox, f"Database reset to snapshot '{name}'.")
+    return None
+
+
+# =========================
+# ATTACHED DATABASES
+# =========================
+
+def list_attached(conn):
+    """
+    Databases attached to a connection.
+
+    Returns:
+        list[tuple[str, str]] : (alias, file)
+    """
+    return [(name, file) for _seq, name, file in conn.execute("PRAGMA database_list")
+            if name not in ("main", "temp")]
+
+
+def default_alias(path):
+    """Alias proposed for a database file: its name as an SQL identifier."""
+    alias = re.sub(r"\W+", "_", Path(path).stem).strip("_").lower() or "db"
+    return alias if not alias[0].isdigit() else "db_" + alias
+
+
+def attach_database(path, alias, output_textbox=None):
+    """
+    Attach another database file to the active connection, so queries can
+    use alias.table (and join it with the main database).
+
+    Refused while a transaction is open. In a sandbox the file is attached
+    read-only, so the sandbox cannot write to it.
+
+    Args:
+        path : str
+            Database file.
+        alias : str
+            Schema name (letters, digits and '_').
+        output_textbox : tkinter.Text, optional
+            Output area for messages.
+
+    Returns: None
+    """
+    conn = global_vars.current_connection
+    if conn is None:
+        if output_textbox:
+            display_result(output_textbox, "No database connected.")
+        return None
+    if tab_is_busy(output_textbox):
+        return None
+
+    if conn.in_transaction:
+        # A transaction left open by the user is never committed or rolled back here
+        if output_textbox:
+            display_result(output_textbox, "Attach: commit or roll back the open transaction first.")
+        return None
+
+    alias = alias.strip()
+    if not re.fullmatch(r"[A-Za-z_]\w*", alias) or alias.lower() in ("main", "temp"):
+        if output_textbox:
+            display_result(output_textbox, f"'{alias}' cannot be used as an alias "
+                                           "(letters, digits and '_', not main or temp).")
+        return None
+
+    # In a sandbox, writes to alias.table would bypass it: attach read-only
+    target = Path(path).resolve().as_uri() + "?mode=ro" if global_vars.sandbox_active else path
+    try:
+        conn.execute(f'ATTACH DATABASE ? AS "{alias}"', (target,))
+        tables = conn.execute(
+            f"SELECT count(*) FROM \"{alias}\".sqlite_master WHERE type = 'table'").fetchone()[0]
+    except Exception as e:
+        if output_textbox:
+            display_result(output_textbox, f"Could not attach {path}: {e}")
+        return None
+
+    if output_textbox:
+        display_result(output_textbox,
+                       f"{os.path.basename(path)} attached as {alias} ({tables} tables).\n"
+                       f"Use {alias}.table_name in your queries, e.g.\n"
+                       f"SELECT * FROM main.some_table JOIN {alias}.other_table USING (id);")
+    return None
+
+
+def detach_database(alias, output_textbox=None):
+    """Detach a database attached with attach_database()."""
+    conn = global_vars.current_connection
+    if conn is None or tab_is_busy(output_textbox):
+        return None
+    if conn.in_transaction:
+        if output_textbox:
+            display_result(output_textbox, "Detach: commit or roll back the open transaction first.")
+        return None
+    try:
+        conn.execute(f'DETACH DATABASE "{alias}"')
+    except Exception as e:
+        if output_textbox:
+            display_result(output_textbox, f"Could not detach {alias}: {e}")
+        return None
+    if output_textbox:
+        display_result(output_textbox, f"{alias} detached.")
+    return None
+
+
+def sync_attached(conn, attached):
+    """
+    Make the attached databases of 'conn' match 'attached' (alias, file)
+    pairs, e.g. in the query process, whose connection mirrors the GUI one.
+    """
+    wanted = dict(attached)
+    for alias, file in list_attached(conn):
+        if wanted.get(alias) != file:
+            conn.execute(f'DETACH DATABASE "{alias}"')
+    current = dict(list_attached(conn))
+    for alias, file in wanted.items():
+        if alias not in current:
+            conn.execute(f'ATTACH DATABASE ? AS "{alias}"', (file,))
+    return None
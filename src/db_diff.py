@@ -0,0 +1,282 @@
+# db_diff.py
+#
+# Compare two databases, e.g. a pupil's database after an INSERT / UPDATE /
+# DELETE exercise with the teacher's reference.
+#
+# The reference is ATTACHed to the connection of the other database, so
+# all the work is done by SQLite and no table is loaded into Python:
+#
+#   1. Schema: the entries of both sqlite_master tables are compared.
+#   2. Content, for each table with a primary key: the key range is cut
+#      into chunks of CHUNK_ROWS rows (boundaries taken from the reference),
+#      and each chunk is hashed on both sides with an order-independent
+#      aggregate over an index range scan.
+#   3. Only the chunks whose hashes differ are compared row by row with
+#      EXCEPT, which gives the exact added, removed and changed rows.
+#
+# Tables without a primary key are compared as a whole with EXCEPT
+# (rows added / removed; duplicates are not counted).
+#
+# Usage:
+#   python db_diff.py reference.db pupil.db
+
+import hashlib
+import sqlite3
+import sys
+from pathlib import Path
+import global_vars
+from results import quote_identifier
+
+
+CHUNK_ROWS = 10_000
+REPORT_ROWS = 10            # example rows shown per table and kind
+REFERENCE = "reference"     # schema name of the attached reference
+
+
+class _ChunkHash:
+    """
+    Order-independent hash of the rows of a chunk (sum of row digests).
+
+    Each row is digested with BLAKE2b over a type-tagged encoding: Python's
+    hash() collides on values (hash(-1) == hash(-2)) and 1 must not match '1'.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+
+    def step(self, *values):
+        encoded = repr(tuple((type(v).__name__, v) for v in values)).encode()
+        digest = hashlib.blake2b(encoded, digest_size=8).digest()
+        self.count += 1
+        self.total = (self.total + int.from_bytes(digest, "little")) & 0xFFFFFFFFFFFFFFFF
+
+    def finalize(self):
+        return f"{self.count}:{self.total}"
+
+
+class DiffReport:
+    """Differences found between the reference and the compared database."""
+
+    def __init__(self):
+        self.schema = []        # text lines
+        self.tables = {}        # table -> dict(added, removed, changed, examples, rows, chunks)
+
+    def matches(self):
+        return not self.schema and not any(
+            t["added"] or t["removed"] or t["changed"] for t in self.tables.values())
+
+    def text(self):
+        """The report as plain text."""
+        lines = []
+        if self.schema:
+            lines.append("Schema differences:")
+            lines.extend(f"  {line}" for line in self.schema)
+            lines.append("")
+        for table, t in self.tables.items():
+            summary = (f"{table}: {t['added']:,} added, {t['removed']:,} removed, "
+                       f"{t['changed']:,} changed")
+            if t["chunks"]:
+                summary += (f"  ({t['rows']:,} rows in {t['chunks']:,} chunk(s), "
+                            f"{t['differing']:,} differed)")
+            lines.append(summary)
+            lines.extend(f"    {example}" for example in t["examples"])
+        lines.append("")
+        lines.append("The databases match." if self.matches()
+                     else "The databases differ.")
+        return "\n".join(lines)
+
+
+def _objects(conn, schema):
+    rows = conn.execute(
+        f"SELECT type, name, sql FROM {schema}.sqlite_master "
+        "WHERE name NOT LIKE 'sqlite_%' AND sql IS NOT NULL"
+    ).fetchall()
+    return {(kind, name): " ".join(sql.split()) for kind, name, sql in rows}
+
+
+def _columns(conn, schema, table):
+    """(column names, primary key columns in key order)."""
+    info = conn.execute(f"PRAGMA {schema}.table_info({quote_identifier(table)})").fetchall()
+    columns = [row[1] for row in info]
+    key = [row[1] for row in sorted(info, key=lambda r: r[5]) if row[5]]
+    return columns, key
+
+
+def compare_schema(conn, report):
+    """Compare the sqlite_master entries of main and the reference."""
+    mine, reference = _objects(conn, "main"), _objects(conn, REFERENCE)
+    for kind, name in sorted(reference.keys() - mine.keys()):
+        report.schema.append(f"- {kind} {name} is missing")
+    for kind, name in sorted(mine.keys() - reference.keys()):
+        report.schema.append(f"+ {kind} {name} is not in the reference")
+    for kind, name in sorted(mine.keys() & reference.keys()):
+        if mine[(kind, name)] != reference[(kind, name)]:
+            report.schema.append(f"~ {kind} {name} is defined differently")
+    return sorted(name for kind, name in mine.keys() & reference.keys() if kind == "table")
+
+
+def _describe(columns, row):
+    return ", ".join(f"{c}={v!r}" for c, v in zip(columns, row))
+
+
+def compare_table(conn, table, report, cancelled=None):
+    """Compare the content of one table present in both databases."""
+    columns, key = _columns(conn, "main", table)
+    ref_columns, ref_key = _columns(conn, REFERENCE, table)
+    common = [c for c in ref_columns if c in columns]
+    stats = report.tables[table] = {"added": 0, "removed": 0, "changed": 0, "examples": [],
+                                    "rows": 0, "chunks": 0, "differing": 0}
+    if not common:
+        return None
+
+    q_table = quote_identifier(table)
+    select = ", ".join(quote_identifier(c) for c in common)
+
+    if not key or key != ref_key or not set(key) <= set(common):
+        # No usable key: whole-table set difference
+        for sign, first, second, name in (("+", "main", REFERENCE, "added"),
+                                          ("-", REFERENCE, "main", "removed")):
+            rows = conn.execute(f"SELECT {select} FROM {first}.{q_table} "
+                                f"EXCEPT SELECT {select} FROM {second}.{q_table}").fetchall()
+            stats[name] = len(rows)
+            stats["examples"].extend(f"{sign} {_describe(common, r)}" for r in rows[:REPORT_ROWS])
+        return None
+
+    keys = ", ".join(quote_identifier(c) for c in key)
+    key_tuple = f"({keys})"
+    placeholders = "(" + ", ".join("?" * len(key)) + ")"
+
+    # Chunk boundaries: every CHUNK_ROWS-th key of the reference
+    boundaries = conn.execute(
+        f"SELECT {keys} FROM (SELECT {keys}, row_number() OVER (ORDER BY {keys}) AS n "
+        f"FROM {REFERENCE}.{q_table}) WHERE n % ? = 1 ORDER BY {keys}",
+        (CHUNK_ROWS,)
+    ).fetchall()[1:]
+
+    def chunk_where(i):
+        conditions, params = [], []
+        if i > 0:
+            conditions.append(f"{key_tuple} >= {placeholders}")
+            params.extend(boundaries[i - 1])
+        if i < len(boundaries):
+            conditions.append(f"{key_tuple} < {placeholders}")
+            params.extend(boundaries[i])
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    added, removed = [], []
+    for i in range(len(boundaries) + 1):
+        if cancelled is not None and cancelled():
+            return None
+        where, params = chunk_where(i)
+        hashes = [conn.execute(f"SELECT _sql_desk_chunk_hash({select}) FROM {schema}.{q_table}{where}",
+                               params).fetchone()[0] for schema in ("main", REFERENCE)]
+        stats["chunks"] += 1
+        stats["rows"] += int(hashes[1].split(":")[0])
+        if hashes[0] == hashes[1]:
+            continue
+
+        stats["differing"] += 1
+        added.extend(conn.execute(
+            f"SELECT {select} FROM main.{q_table}{where} "
+            f"EXCEPT SELECT {select} FROM {REFERENCE}.{q_table}{where}", params * 2).fetchall())
+        removed.extend(conn.execute(
+            f"SELECT {select} FROM {REFERENCE}.{q_table}{where} "
+            f"EXCEPT SELECT {select} FROM main.{q_table}{where}", params * 2).fetchall())
+
+    # Same key on both sides = changed row
+    positions = [common.index(c) for c in key]
+    old_rows = {tuple(r[p] for p in positions): r for r in removed}
+    changed, new_rows = [], []
+    for row in added:
+        k = tuple(row[p] for p in positions)
+        if k in old_rows:
+            changed.append((old_rows.pop(k), row))
+        else:
+            new_rows.append(row)
+    added = new_rows
+
+    stats["added"], stats["removed"], stats["changed"] = len(added), len(old_rows), len(changed)
+    examples = stats["examples"]
+    examples.extend(f"+ {_describe(common, r)}" for r in added[:REPORT_ROWS])
+    examples.extend(f"- {_describe(common, r)}" for r in list(old_rows.values())[:REPORT_ROWS])
+    for old, new in changed[:REPORT_ROWS]:
+        where = ", ".join(f"{c}={old[p]!r}" for c, p in zip(key, positions))
+        edits = ", ".join(f"{c}: {a!r} -> {b!r}" for c, a, b in zip(common, old, new) if a != b)
+        examples.append(f"~ {where}: {edits}")
+    return None
+
+
+def diff_connection(conn, reference_path, cancelled=None):
+    """
+    Compare the database of 'conn' (main) with a reference database file.
+
+    Args:
+        conn : sqlite3.Connection
+        reference_path : str
+        cancelled : callable, optional
+            Returns True to stop early.
+
+    Returns:
+        DiffReport
+    """
+    if conn.in_transaction:
+        raise sqlite3.OperationalError("commit or roll back the open transaction first")
+    report = DiffReport()
+    conn.create_aggregate("_sql_desk_chunk_hash", -1, _ChunkHash)
+    conn.execute(f"ATTACH DATABASE ? AS {REFERENCE}", (reference_path,))
+    try:
+        for table in compare_schema(conn, report):
+            if cancelled is not None and cancelled():
+                break
+            compare_table(conn, table, report, cancelled)
+    finally:
+        conn.execute(f"DETACH DATABASE {REFERENCE}")
+    return report
+
+
+def compare_with_reference(conn, reference_path, emit, progress=None):
+    """
+    Worker entry point (see run_in_tab): compare and emit the report.
+
+    Args:
+        conn : sqlite3.Connection
+        reference_path : str
+        emit : callable
+        progress : QueryProgress, optional
+            Its cancel() stops the comparison, even inside a long query.
+
+    Returns: None
+    """
+    cancelled = None
+    if progress is not None:
+        progress.start_statement(1)
+        conn.set_progress_handler(progress.handler, global_vars.PROGRESS_HANDLER_STEPS)
+        cancelled = lambda: progress.cancel_requested
+    try:
+        report = diff_connection(conn, reference_path, cancelled)
+    except Exception as e:
+        if progress is not None and progress.cancel_requested:
+            emit("Comparison cancelled.")
+        else:
+            emit(f"Could not compare with {reference_path}: {e}")
+        return None
+    finally:
+        if progress is not None:
+            conn.set_progress_handler(None, 0)
+            progress.finished = True
+    if progress is not None and progress.cancel_requested:
+        emit("Comparison cancelled.")
+        return None
+    emit(f"Comparison with {reference_path}:\n\n" + report.text())
+    return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python db_diff.py reference.db other.db")
+        sys.exit(2)
+    connection = sqlite3.connect(Path(sys.argv[2]).resolve().as_uri() + "?mode=ro", uri=True)
+    result = diff_connection(connection, sys.argv[1])
+    print(result.text())
+    sys.exit(0 if result.matches() else 1)
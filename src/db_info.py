@@ -0,0 +1,158 @@
+# db_info.py
+#
+# "Database Info" view: where the space of a database goes.
+#
+# Shows the page size, page count, free pages and, for every table and
+# index, its row count and size (from the dbstat virtual table when the
+# SQLite library has it). Counting rows reads whole tables, so the work
+# runs on the tab's worker and can be cancelled with the Stop button.
+#
+# The text is cached per tab until the database changes: another
+# connection's commit changes PRAGMA data_version, our own writes change
+# total_changes, our own DDL changes PRAGMA schema_version.
+
+import time
+import global_vars
+from results import quote_identifier
+from utils import make_pretty_table
+
+
+def change_key(conn):
+    """Value that changes whenever the content of the main database may have."""
+    return (
+        conn.execute("PRAGMA main.database_list").fetchone()[2],
+        conn.execute("PRAGMA main.data_version").fetchone()[0],
+        conn.execute("PRAGMA main.schema_version").fetchone()[0],
+        conn.total_changes,
+    )
+
+
+def dbstat_available(conn):
+    """True if the SQLite library was compiled with the dbstat virtual table."""
+    try:
+        conn.execute("SELECT 1 FROM dbstat('main', 1) LIMIT 1").fetchall()
+        return True
+    except Exception:
+        return False
+
+
+def collect_info(conn, cancelled=None):
+    """
+    Gather the statistics of the main database.
+
+    Args:
+        conn : sqlite3.Connection
+        cancelled : callable, optional
+            Returns True to stop before the next table.
+
+    Returns:
+        dict or None : None when cancelled.
+    """
+    pragma = lambda name: conn.execute(f"PRAGMA main.{name}").fetchone()[0]
+    info = {
+        "database": conn.execute("PRAGMA main.database_list").fetchone()[2] or ":memory:",
+        "page_size": pragma("page_size"),
+        "page_count": pragma("page_count"),
+        "freelist_count": pragma("freelist_count"),
+        "journal_mode": pragma("journal_mode"),
+        "auto_vacuum": ("none", "full", "incremental")[pragma("auto_vacuum")],
+        "objects": [],
+    }
+
+    sizes = {}
+    if dbstat_available(conn):
+        # aggregate = 1: one row per table / index, pages are not listed
+        sizes = dict(conn.execute("SELECT name, pgsize FROM dbstat('main', 1)").fetchall())
+    info["has_sizes"] = bool(sizes)
+
+    objects = conn.execute(
+        "SELECT type, name, tbl_name FROM main.sqlite_master "
+        "WHERE type IN ('table', 'index') ORDER BY tbl_name, type DESC, name"
+    ).fetchall()
+    for kind, name, table in objects:
+        if cancelled is not None and cancelled():
+            return None
+        rows = None
+        if kind == "table":
+            try:
+                rows = conn.execute(f"SELECT count(*) FROM main.{quote_identifier(name)}").fetchone()[0]
+            except Exception:
+                if cancelled is not None and cancelled():
+                    return None
+        info["objects"].append((name, kind, table, rows, sizes.get(name)))
+    return info
+
+
+def format_info(info):
+    """Text of the Database Info view."""
+    page_size = info["page_size"]
+    total = page_size * info["page_count"]
+    free = page_size * info["freelist_count"]
+    lines = [
+        f"Database info: {info['database']}",
+        f"Page size {page_size:,} B, {info['page_count']:,} pages ({total // 1024:,} KB), "
+        f"{info['freelist_count']:,} free pages ({free // 1024:,} KB)",
+        f"Journal mode {info['journal_mode']}, auto_vacuum {info['auto_vacuum']}",
+    ]
+
+    body = []
+    for name, kind, table, rows, size in sorted(
+            info["objects"], key=lambda o: -(o[4] or 0)):
+        body.append((
+            name, kind, table if kind == "index" else "",
+            f"{rows:,}" if rows is not None else "",
+            f"{size // 1024:,}" if size is not None else "n/a",
+            f"{100 * size / total:.1f}" if size is not None and total else "",
+        ))
+    lines.append(make_pretty_table(["name", "type", "on table", "rows", "KB", "% of file"], body))
+    if not info["has_sizes"]:
+        lines.append("(Sizes need the dbstat table, which this SQLite library does not have.)")
+    return "\n".join(lines)
+
+
+def show_database_info(conn, emit, progress=None, tab=None):
+    """
+    Worker entry point (see run_in_tab): emit the Database Info text,
+    from the tab's cache when the database has not changed.
+
+    Args:
+        conn : sqlite3.Connection
+        emit : callable
+        progress : QueryProgress, optional
+            Its cancel() stops the scan.
+        tab : workspace.QueryTab, optional
+            Holds the cache (tab.database_info).
+
+    Returns: None
+    """
+    started = time.perf_counter()
+    cancelled = None
+    if progress is not None:
+        progress.start_statement(1)
+        conn.set_progress_handler(progress.handler, global_vars.PROGRESS_HANDLER_STEPS)
+        cancelled = lambda: progress.cancel_requested
+    try:
+        key = change_key(conn)
+        if tab is not None and tab.database_info is not None and tab.database_info[0] == key:
+            emit(tab.database_info[1] + "\n(unchanged since the last scan)")
+            return None
+
+        info = collect_info(conn, cancelled)
+        if info is None:
+            emit("Database info cancelled.")
+            return None
+        text = format_info(info)
+        if tab is not None:
+            tab.database_info = (key, text)
+    except Exception as e:
+        if progress is not None and progress.cancel_requested:
+            emit("Database info cancelled.")
+        else:
+            emit(f"Could not read the database info: {e}")
+        return None
+    finally:
+        if progress is not None:
+            conn.set_progress_handler(None, 0)
+            progress.finished = True
+    emit(f"{text}\n(computed in {time.perf_counter() - started:.2f} s)")
+    return None
@@ -0,0 +1,217 @@
+# diagnostics.py
+#
+# Lightweight performance diagnostics for SQL Desk.
+#
+# - PhaseTimer : per-phase timing of a hot function (e.g. pretty_print_sql),
+#                written as one JSON line per call to a rolling log file.
+# - UIWatchdog : detects Tk main loop stalls and records what the main
+#                thread was doing while the GUI was frozen.
+#
+# Everything is off by default and can be switched on at runtime from the
+# Tools menu; when off, the cost is a single boolean test per phase.
+
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+import global_vars
+
+
+class PhaseTimer:
+    """
+    Measure the duration of the successive phases of one call.
+
+    Usage:
+        timer = PhaseTimer("pretty_print_sql", global_vars.profile_formatting)
+        ... phase 1 ...
+        timer.mark("linebreaks")
+        ... phase 2 ...
+        timer.mark("keywords")
+        timer.finish(chars=len(text))
+
+    Args:
+        call : str
+            Name recorded in the log.
+        enabled : bool
+            When False, mark() and finish() do nothing.
+    """
+
+    def __init__(self, call, enabled=True):
+        self.call = call
+        self.enabled = enabled
+        self.phases = {}
+        if enabled:
+            self.started = self.last = time.perf_counter()
+
+    def mark(self, phase):
+        """Record the time elapsed since the previous mark under 'phase'."""
+        if not self.enabled:
+            return None
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self.last) * 1000, 3)
+        self.last = now
+        return None
+
+    def finish(self, **fields):
+        """Write the record (phases + extra fields) to the profile log."""
+        if not self.enabled:
+            return None
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "call": self.call,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "phases_ms": self.phases,
+        }
+        record.update(fields)
+        append_jsonl(global_vars.FORMAT_PROFILE_LOG, record)
+        return record
+
+
+def append_jsonl(path, record, max_bytes=None):
+    """
+    Append one JSON record to a rolling log file.
+
+    When the file grows beyond max_bytes it is renamed to '<path>.1'
+    (replacing the previous one) and a new file is started.
+
+    Args:
+        path : str
+        record : dict
+        max_bytes : int, optional
+            Defaults to global_vars.DIAGNOSTICS_LOG_MAX_BYTES.
+
+    Returns: None
+    """
+    if max_bytes is None:
+        max_bytes = global_vars.DIAGNOSTICS_LOG_MAX_BYTES
+    try:
+        if os.path.exists(path) and os.path.getsize(path) > max_bytes:
+            os.replace(path, path + ".1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+    except Exception as e:
+        print(f"Error writing diagnostics log {path}: {e}")
+    return None
+
+
+class UIWatchdog:
+    """
+    Report stalls of the Tk event loop.
+
+    A heartbeat is scheduled with after() every WATCHDOG_HEARTBEAT_MS.
+    A daemon thread watches it: when no heartbeat has run for longer
+    than WATCHDOG_STALL_MS, it samples the Python stack of the main
+    thread (sys._current_frames), once per threshold period. When the
+    heartbeat finally runs, the stall (duration + stack samples + the
+    SQL Desk function that blocked) is appended to WATCHDOG_LOG.
+
+    Args:
+        widget : tkinter widget
+            Any widget of the main window (used for after()).
+    """
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.interval = global_vars.WATCHDOG_HEARTBEAT_MS / 1000
+        self.threshold = global_vars.WATCHDOG_STALL_MS / 1000
+        self.main_id = threading.main_thread().ident
+        self.samples = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.after_id = None
+        self.thread = None
+        self.last_beat = time.perf_counter()
+
+    def start(self):
+        """Start the heartbeat and the monitor thread."""
+        self.stop_event.clear()
+        self.last_beat = time.perf_counter()
+        self.after_id = self.widget.after(global_vars.WATCHDOG_HEARTBEAT_MS, self._beat)
+        self.thread = threading.Thread(target=self._monitor, name="sql-desk-watchdog", daemon=True)
+        self.thread.start()
+        return None
+
+    def stop(self):
+        """Stop watching."""
+        self.stop_event.set()
+        if self.after_id is not None:
+            try:
+                self.widget.after_cancel(self.after_id)
+            except Exception:
+                pass
+            self.after_id = None
+        return None
+
+    def _beat(self):
+        """Heartbeat (GUI thread): measure how late it is and log stalls."""
+        now = time.perf_counter()
+        late = now - self.last_beat - self.interval
+        with self.lock:
+            samples, self.samples = self.samples, []
+            self.last_beat = now
+
+        if late > self.threshold:
+            self._log_stall(late, samples)
+
+        if not self.stop_event.is_set():
+            self.after_id = self.widget.after(global_vars.WATCHDOG_HEARTBEAT_MS, self._beat)
+
+    def _monitor(self):
+        """Monitor thread: sample the main thread's stack during a stall."""
+        while not self.stop_event.wait(self.threshold / 4):
+            with self.lock:
+                overdue = time.perf_counter() - self.last_beat - self.interval
+                due = self.threshold * (len(self.samples) + 1)
+                if overdue > due and len(self.samples) < 5:
+                    frame = sys._current_frames().get(self.main_id)
+                    if frame is not None:
+                        self.samples.append({
+                            "after_ms": round(overdue * 1000),
+                            "stack": traceback.format_stack(frame),
+                        })
+
+    def _log_stall(self, late, samples):
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "stall_ms": round(late * 1000),
+            "callback": blocking_function(samples[0]["stack"]) if samples else None,
+            "samples": samples,
+        }
+        append_jsonl(global_vars.WATCHDOG_LOG, record)
+        return None
+
+
+def blocking_function(stack):
+    """
+    Name the SQL Desk function that was blocking the event loop:
+    the outermost frame of a stack that belongs to the application
+    (i.e. the Tk callback), as 'module.function (line)'.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    for entry in stack:
+        # entry: '  File "<path>", line <n>, in <function>\n    <code>\n'
+        first = entry.strip().splitlines()[0]
+        try:
+            path = first.split('"')[1]
+            line = first.split("line ")[1].split(",")[0]
+            function = first.rsplit(" in ", 1)[1]
+        except IndexError:
+            continue
+        if os.path.dirname(os.path.abspath(path)) == here and function != "<module>":
+            module = os.path.splitext(os.path.basename(path))[0]
+            return f"{module}.{function} ({line})"
+    return None
+
+
+def set_watchdog(enabled, widget):
+    """Start or stop the UI watchdog (Tools menu)."""
+    if enabled and global_vars.watchdog is None:
+        global_vars.watchdog = UIWatchdog(widget)
+        global_vars.watchdog.start()
+    elif not enabled and global_vars.watchdog is not None:
+        global_vars.watchdog.stop()
+        global_vars.watchdog = None
+    return None
@@ -21,6 +21,27 @@ accent_colour = '#5c6bc0'
 current_database = ''
 current_connection = None
 
+# Student mode: per-statement resource limits (see database_management.py
+# and GUI_functions.QueryProgress)
+student_mode = False
+STUDENT_LIMITS = {
+    "max_seconds": 10,                  # wall time per statement
+    "max_vm_steps": 500_000_000,        # SQLite VM instructions per statement
+    "max_rows": 100_000,                # rows fetched per SELECT
+    "heap_limit_bytes": 512 * 1024 ** 2,  # PRAGMA hard_heap_limit (whole process)
+    "max_value_bytes": 10 * 1024 ** 2,  # longest string / blob (SQLITE_LIMIT_LENGTH)
+    "max_sql_bytes": 1024 ** 2,         # longest statement (SQLITE_LIMIT_SQL_LENGTH)
+}
+
+# Sandbox mode: the database is an in-memory copy of current_database
+sandbox_enabled = False     # user preference (Database menu checkbox)
+sandbox_active = False      # True while the current connection is a sandbox
+
+# Named database snapshots: {database path: {snapshot name: bytes}}
+snapshots = {}
+last_snapshot = {}          # {database path: name of the last snapshot taken}
+SNAPSHOT_SUFFIX = ".snapshot"
+
 # Current SQL file path
 current_sql_file = None
 
@@ -36,3 +57,61 @@ RECENT_DB_FILE_PATH = "recent_db_files.txt"
 # Optional references (e.g. to GUI widgets)
 output_textbox = None
 databases = []
+
+# Workspace tabs (see workspace.py); the current_* values above always
+# describe the active tab
+tabs = []
+current_tab = None
+
+# Large SQL files
+LARGE_SQL_FILE_BYTES = 2_000_000    # above this, files are loaded in chunks
+LOAD_CHUNK_BYTES = 256 * 1024       # bytes inserted per after() tick
+FORMAT_MAX_CHARS = 500_000          # no Pretty Print / colouring above this
+PREVIEW_PAGE_BYTES = 64 * 1024      # page size of the read-only preview
+SQL_FILE_BATCH_SIZE = 1000          # statements per transaction in "Run SQL File"
+
+# Query results (see results.py)
+result_row_cap = 1000                # rows shown for a SELECT without LIMIT
+RESULT_ROW_CAP_CHOICES = (100, 1000, 10_000, 100_000)
+RESULT_MEMORY_BYTES = 200 * 1024 ** 2   # ceiling for one result kept in Python
+MAX_SPILLED_RESULTS = 5              # full results kept on disk
+spilled_results = []
+grid_view = False                    # also open each result in the result grid
+cache_results = False                # keep SELECT results in TEMP tables (Results menu)
+CACHED_RESULTS = 3                   # TEMP tables kept per connection
+exact_table_widths = False           # scan every row for the text table widths
+TABLE_WIDTH_SAMPLE = 1000            # rows sampled for the widths otherwise
+TABLE_MAX_COLUMN_WIDTH = 80          # longer values are cut with '…'
+
+# Separate query process (see query_process.py), Database menu
+isolated_execution = False
+WORKER_MEMORY_BYTES = 1024 ** 3      # address space limit of the query process
+WORKER_CPU_SECONDS = 60              # CPU time limit per run
+RESULT_BATCH_ROWS = 1000             # rows per message sent back by the query process
+
+# Maintenance (see maintenance.py), Database menu
+optimize_on_close = True             # PRAGMA optimize in close_active_connection
+OPTIMIZE_ANALYSIS_LIMIT = 400        # rows sampled per index by that ANALYZE
+
+# Diagnostics (see diagnostics.py), switchable from the Tools menu
+profile_formatting = False
+FORMAT_PROFILE_LOG = "format_profile.jsonl"
+DIAGNOSTICS_LOG_MAX_BYTES = 1024 ** 2    # rolled over to '<log>.1' beyond this
+
+record_workload = False              # see workload.py
+WORKLOAD_LOG = "workload.jsonl"
+WORKLOAD_LOG_MAX_BYTES = 50 * 1024 ** 2
+
+watchdog = None                      # diagnostics.UIWatchdog when enabled
+WATCHDOG_LOG = "ui_stalls.jsonl"
+WATCHDOG_HEARTBEAT_MS = 100
+WATCHDOG_STALL_MS = 500              # main loop blocked longer than this = stall
+
+# How often the GUI polls a tab's worker for new output (milliseconds)
+POLL_INTERVAL_MS = 50
+
+# Live query progress: SQLite calls the progress handler every
+# PROGRESS_HANDLER_STEPS VM instructions; the status line is refreshed
+# every STATUS_INTERVAL_MS milliseconds.
+PROGRESS_HANDLER_STEPS = 1000
+STATUS_INTERVAL_MS = 250
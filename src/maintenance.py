@@ -0,0 +1,190 @@
+# maintenance.py
+#
+# Database maintenance for SQL Desk (Database > Maintenance):
+#
+#   - ANALYZE / PRAGMA optimize : refresh the statistics of the query planner
+#   - VACUUM                    : rebuild the file without free pages
+#   - VACUUM INTO               : write a compacted copy, the database is untouched
+#   - incremental_vacuum        : give free pages back to the file system
+#                                 (databases with auto_vacuum = INCREMENTAL)
+#   - quick_check               : look for corruption (faster than integrity_check)
+#
+# Each action runs on the tab's worker with the usual QueryProgress (live
+# status line, Stop button) and reports the size of the database before
+# and after.
+
+import os
+import time
+import global_vars
+
+
+def database_size(conn):
+    """
+    Size of the main database.
+
+    Returns:
+        dict : pages, free pages, page size and bytes.
+    """
+    pragma = lambda name: conn.execute(f"PRAGMA main.{name}").fetchone()[0]
+    size = {
+        "pages": pragma("page_count"),
+        "free": pragma("freelist_count"),
+        "page_size": pragma("page_size"),
+    }
+    size["bytes"] = size["pages"] * size["page_size"]
+    return size
+
+
+def describe_size(size):
+    """One-line text of a database_size() result."""
+    return (f"{size['bytes'] // 1024:,} KB ({size['pages']:,} pages, "
+            f"{size['free']:,} free)")
+
+
+def analyze(conn):
+    """Gather planner statistics for every table and index."""
+    conn.execute("ANALYZE")
+    return None
+
+
+def optimize(conn, analysis_limit=None):
+    """PRAGMA optimize, optionally with a bounded ANALYZE (analysis_limit rows)."""
+    if analysis_limit:
+        conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+    conn.execute("PRAGMA optimize")
+    return None
+
+
+def vacuum(conn):
+    """Rebuild the database file, dropping its free pages."""
+    conn.execute("VACUUM")
+    return None
+
+
+def vacuum_into(conn, path):
+    """
+    Write a compacted copy of the database to 'path'.
+
+    VACUUM INTO refuses an existing file, so the copy is written under a
+    temporary name and replaces 'path' only when it succeeded: a failed
+    or cancelled vacuum leaves an existing file untouched.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    try:
+        conn.execute("VACUUM INTO ?", (temp_path,))
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return f"Compacted copy written to {path} ({os.path.getsize(path) // 1024:,} KB)."
+
+
+def incremental_vacuum(conn):
+    """Release the free pages (needs auto_vacuum = INCREMENTAL)."""
+    if conn.execute("PRAGMA main.auto_vacuum").fetchone()[0] != 2:
+        return ("This database does not use incremental auto_vacuum: use VACUUM, "
+                "or Enable Incremental Vacuum once.")
+    # The pragma frees pages as its rows are stepped
+    conn.execute("PRAGMA main.incremental_vacuum").fetchall()
+    return None
+
+
+def enable_incremental_vacuum(conn):
+    """Switch to auto_vacuum = INCREMENTAL (takes effect with a VACUUM)."""
+    conn.execute("PRAGMA main.auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return "auto_vacuum is now INCREMENTAL: Incremental Vacuum releases free pages."
+
+
+def quick_check(conn):
+    """PRAGMA quick_check, as a text report."""
+    problems = [row[0] for row in conn.execute("PRAGMA main.quick_check")]
+    if problems == ["ok"]:
+        return "quick_check: no problem found."
+    return "quick_check found problems:\n" + "\n".join(problems)
+
+
+# label: (function, needs no open transaction)
+ACTIONS = {
+    "ANALYZE": (analyze, False),
+    "PRAGMA optimize": (optimize, False),
+    "VACUUM": (vacuum, True),
+    "VACUUM INTO": (vacuum_into, True),
+    "incremental_vacuum": (incremental_vacuum, False),
+    "Enable incremental vacuum": (enable_incremental_vacuum, True),
+    "quick_check": (quick_check, False),
+}
+
+
+def run_maintenance(conn, action, target=None, emit=print, progress=None):
+    """
+    Worker entry point (see run_in_tab): run one maintenance action and
+    report the time and the size of the database before and after.
+
+    Args:
+        conn : sqlite3.Connection
+        action : str
+            Key of ACTIONS.
+        target : str, optional
+            Path of the copy written by VACUUM INTO.
+        emit : callable
+        progress : QueryProgress, optional
+            Status line and cancellation.
+
+    Returns: None
+    """
+    func, outside_transaction = ACTIONS[action]
+    # A transaction the user left open is neither committed nor rolled back here
+    own_transaction = not conn.in_transaction
+    if outside_transaction and not own_transaction:
+        emit(f"{action}: commit or roll back the open transaction first.")
+        return None
+
+    if progress is not None:
+        progress.start_statement(1)
+        conn.set_progress_handler(progress.handler, global_vars.PROGRESS_HANDLER_STEPS)
+    started = time.perf_counter()
+    try:
+        before = database_size(conn)
+        message = func(conn, target) if target else func(conn)
+        if own_transaction and conn.in_transaction:
+            conn.commit()
+        after = database_size(conn)
+    except Exception as e:
+        if own_transaction and conn.in_transaction:
+            conn.rollback()
+        if progress is not None and progress.cancel_requested:
+            emit(f"{action} cancelled.")
+        else:
+            emit(f"{action} failed: {e}")
+        return None
+    finally:
+        if progress is not None:
+            conn.set_progress_handler(None, 0)
+            progress.finished = True
+
+    lines = [f"{action} done in {time.perf_counter() - started:.2f} s."]
+    if message:
+        lines.append(message)
+    lines.append(f"Size before: {describe_size(before)}")
+    lines.append(f"Size after:  {describe_size(after)}")
+    emit("\n".join(lines))
+    return None
+
+
+def optimize_before_close(conn):
+    """
+    PRAGMA optimize for close_active_connection (when
+    global_vars.optimize_on_close is on): cheap, bounded by
+    OPTIMIZE_ANALYSIS_LIMIT, and it never prevents the connection from closing.
+    """
+    try:
+        optimize(conn, global_vars.OPTIMIZE_ANALYSIS_LIMIT)
+    except Exception:
+        pass
+    return None
@@ -0,0 +1,399 @@
+# query_process.py
+#
+# Optional out-of-process query execution for SQL Desk.
+#
+# With "Run Queries in a Separate Process" on, the statements of a tab are
+# executed by a child Python process holding its own SQLite connection.
+# The child runs under resource.setrlimit() limits (address space and CPU
+# time), so a pathological query can exhaust *its* memory or CPU budget
+# but never the GUI's. Output text, progress and results come back over a
+# pipe as they are produced; if the child dies, it is restarted and
+# reconnected for the next run.
+#
+# The child is this file run as a script (not multiprocessing, which would
+# re-import sql_desk.py and open a second window). Messages are pickled
+# tuples exchanged with multiprocessing.connection.Connection objects
+# wrapped around the child's stdin / stdout.
+#
+# Only for database files: sandbox and in-memory databases cannot be
+# reopened by another process. Unix only (needs the 'resource' module).
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+import global_vars
+
+try:
+    import resource
+except ImportError:         # Windows
+    resource = None
+
+
+def available():
+    """True if this platform supports the separate query process."""
+    return resource is not None
+
+
+def settings(conn):
+    """
+    global_vars settings the child needs for each run, plus the databases
+    attached to the tab's GUI connection 'conn' ("attached", mirrored by
+    the child).
+
+    Call it on the GUI thread when the run is scheduled: the worker must
+    not read global_vars.current_connection (another tab may be active by
+    then) nor query a connection the GUI thread may use.
+    """
+    from database_management import list_attached
+    return {
+        "student_mode": global_vars.student_mode,
+        "result_row_cap": global_vars.result_row_cap,
+        "exact_table_widths": global_vars.exact_table_widths,
+        "WORKER_CPU_SECONDS": global_vars.WORKER_CPU_SECONDS,
+        "record_workload": global_vars.record_workload,
+        "attached": list_attached(conn) if conn is not None else [],
+    }
+
+
+class QueryProcess:
+    """
+    GUI side of a query process (one per workspace tab).
+
+    Args:
+        database : str
+            Path of the database file the child connects to.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.proc = None
+        self.inbox = None       # messages from the child
+        self.outbox = None      # messages to the child
+
+    # --- Life cycle -------------------------------------------------------
+
+    def start(self):
+        """Start the child and connect it to the database."""
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        self.outbox = Connection(os.dup(self.proc.stdin.fileno()), readable=False)
+        self.inbox = Connection(os.dup(self.proc.stdout.fileno()), writable=False)
+        self.proc.stdin.close()
+        self.proc.stdout.close()
+
+        self.outbox.send(("open", self.database, global_vars.WORKER_MEMORY_BYTES))
+        reply = self.inbox.recv()
+        if reply[0] == "error":
+            self.stop()
+            raise RuntimeError(reply[1])
+        return None
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def stop(self):
+        """Ask the child to exit (kill it if it does not)."""
+        if self.proc is None:
+            return None
+        try:
+            self.outbox.send(("exit",))
+            self.proc.wait(timeout=2)
+        except Exception:
+            self.proc.kill()
+            self.proc.wait()
+        for conn in (self.inbox, self.outbox):
+            try:
+                conn.close()
+            except OSError:
+                pass
+        self.proc = self.inbox = self.outbox = None
+        return None
+
+    def exit_reason(self):
+        """Human-readable reason why the child stopped."""
+        code = self.proc.poll() if self.proc is not None else None
+        if code is None:
+            return "the connection to it was lost"
+        if code == -signal.SIGXCPU:
+            return f"CPU time limit of {global_vars.WORKER_CPU_SECONDS} s reached"
+        if code == -signal.SIGKILL:
+            return "killed, probably out of memory"
+        if code < 0:
+            return f"killed by signal {-code}"
+        return f"exit code {code}"
+
+    # --- Running ----------------------------------------------------------
+
+    def execute(self, statements, options, emit, progress=None, results=None, cache_results=False):
+        """
+        Run statements in the child; same contract as
+        GUI_functions.execute_statements() (runs on the tab's worker thread),
+        with 'options' the settings() taken when the run was scheduled.
+
+        SELECT results are not cached in TEMP tables: they would live in
+        the child's connection, out of reach of the Results menu.
+        Each result arrives as soon as its statement is done: a "result"
+        message without rows, then "rows" messages of RESULT_BATCH_ROWS rows.
+        """
+        from results import remember
+
+        result = None
+
+        try:
+            if not self.alive():
+                self.stop()
+                self.start()
+            self.outbox.send(("run", statements, options))
+
+            cancel_sent = False
+            while True:
+                if progress is not None and progress.cancel_requested and not cancel_sent:
+                    self.outbox.send(("cancel",))
+                    cancel_sent = True
+                if not self.inbox.poll(global_vars.POLL_INTERVAL_MS / 1000):
+                    if not self.alive():
+                        raise EOFError
+                    continue
+
+                message = self.inbox.recv()
+                kind = message[0]
+                if kind == "text":
+                    emit(message[1])
+                elif kind == "progress" and progress is not None:
+                    index, steps, rows, violation = message[1:]
+                    if index != progress.index:
+                        progress.start_statement(index)
+                    progress.steps, progress.rows, progress.violation = steps, rows, violation
+                elif kind == "result":
+                    result = message[1]
+                    if result.spilled is not None:
+                        remember(result.spilled)
+                    if results is not None:
+                        results.append(result)
+                elif kind == "rows" and result is not None:
+                    result.rows.extend(message[1])
+                elif kind == "done":
+                    break
+
+        except (EOFError, OSError):
+            # The child died: tell the user, restart it for the next run
+            if self.proc is not None:
+                self.proc.wait()
+            reason = self.exit_reason()
+            self.stop()
+            emit(f"The query process stopped ({reason}).\n"
+                 "Statements committed before that point are kept.")
+            try:
+                self.start()
+                emit("A new query process has been started and reconnected.")
+            except Exception as e:
+                emit(f"Could not restart the query process: {e}")
+        finally:
+            if progress is not None:
+                progress.finished = True
+        return None
+
+
+def query_process_for(tab):
+    """
+    Return the query process to use for a tab, or None to run in-process.
+
+    The process is created on first use and replaced when the tab's
+    database changes.
+    """
+    database = global_vars.current_database
+    if (not global_vars.isolated_execution or tab is None or not available()
+            or global_vars.sandbox_active or not database or not os.path.isfile(database)):
+        return None
+
+    process = tab.query_process
+    if process is not None and process.database != os.path.abspath(database):
+        process.stop()
+        process = None
+    if process is None:
+        process = tab.query_process = QueryProcess(os.path.abspath(database))
+    return process
+
+
+def stop_query_process(tab):
+    """Stop the query process of a tab, if any."""
+    if tab.query_process is not None:
+        tab.query_process.stop()
+        tab.query_process = None
+    return None
+
+
+def set_isolated_execution(enabled, output_textbox=None):
+    """
+    Switch the separate query process on or off (Database menu).
+
+    Args:
+        enabled : bool
+        output_textbox : tkinter.Text, optional
+            Output area for messages.
+
+    Returns: None
+    """
+    from utils import display_result
+
+    if enabled and not available():
+        global_vars.isolated_execution = False
+        if output_textbox:
+            display_result(output_textbox, "Separate query process is not available on this system.")
+        return None
+
+    global_vars.isolated_execution = bool(enabled)
+    if not enabled:
+        for tab in global_vars.tabs:
+            if not tab.busy:
+                stop_query_process(tab)
+
+    if output_textbox:
+        if enabled:
+            mb = global_vars.WORKER_MEMORY_BYTES // 1024 ** 2
+            display_result(
+                output_textbox,
+                "Queries now run in a separate process limited to "
+                f"{mb:,} MB of memory and {global_vars.WORKER_CPU_SECONDS} s of CPU per run.\n"
+                "(Database files only; sandbox databases still run inside SQL Desk.)"
+            )
+        else:
+            display_result(output_textbox, "Queries run inside SQL Desk again.")
+    return None
+
+
+# =========================
+# CHILD PROCESS
+# =========================
+
+def serve():
+    """Main loop of the child process."""
+    from database_management import (
+        connect, configure_connection, apply_student_limits, sync_attached
+    )
+    from GUI_functions import execute_statements, QueryProgress
+
+    inbox = Connection(0, writable=False)
+    outbox = Connection(os.dup(1), readable=False)
+    os.dup2(2, 1)               # stray prints must not corrupt the pipe
+    sys.stdout = sys.stderr
+
+    class RemoteProgress(QueryProgress):
+        """QueryProgress that reports to the GUI process at intervals."""
+
+        last_sent = 0.0
+
+        def report(self):
+            self.last_sent = time.monotonic()
+            outbox.send(("progress", self.index, self.steps, self.rows, self.violation))
+
+        def start_statement(self, index):
+            super().start_statement(index)
+            self.report()
+
+        def handler(self):
+            stop = super().handler()
+            if time.monotonic() - self.last_sent > global_vars.STATUS_INTERVAL_MS / 1000:
+                self.report()
+            return stop
+
+    class StreamedResults:
+        """Sends each result to the GUI process as execute_statements() appends it."""
+
+        def append(self, result):
+            rows, result.rows = result.rows, []
+            outbox.send(("result", result))
+            batch = global_vars.RESULT_BATCH_ROWS
+            for start in range(0, len(rows), batch):
+                outbox.send(("rows", rows[start:start + batch]))
+
+    jobs = []
+    ready = threading.Condition()
+    state = {"conn": None, "progress": None}
+
+    def read_messages():
+        # Cancellation must be seen while the main thread runs a query
+        while True:
+            try:
+                message = inbox.recv()
+            except (EOFError, OSError):
+                message = ("exit",)
+            if message[0] == "cancel":
+                if state["progress"] is not None:
+                    state["progress"].cancel()
+                if state["conn"] is not None:
+                    state["conn"].interrupt()
+                continue
+            with ready:
+                jobs.append(message)
+                ready.notify()
+            if message[0] == "exit":
+                return
+
+    threading.Thread(target=read_messages, daemon=True).start()
+
+    while True:
+        with ready:
+            while not jobs:
+                ready.wait()
+            message = jobs.pop(0)
+        kind = message[0]
+
+        if kind == "exit":
+            break
+
+        if kind == "open":
+            database, memory_bytes = message[1:]
+            try:
+                conn = connect(database)
+                configure_connection(conn)
+                state["conn"] = conn
+                if memory_bytes:
+                    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+                outbox.send(("ready",))
+            except Exception as e:
+                outbox.send(("error", str(e)))
+
+        elif kind == "run":
+            statements, options = message[1:]
+            attached = options.pop("attached", [])
+            student_mode = global_vars.student_mode
+            for name, value in options.items():
+                setattr(global_vars, name, value)
+            if global_vars.student_mode != student_mode:
+                apply_student_limits(state["conn"])
+            try:
+                sync_attached(state["conn"], attached)
+            except Exception as e:
+                outbox.send(("text", f"Could not attach the same databases: {e}"))
+
+            # CPU budget for this run (RLIMIT_CPU counts the process lifetime)
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            used = int(usage.ru_utime + usage.ru_stime)
+            hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+            resource.setrlimit(resource.RLIMIT_CPU,
+                               (used + global_vars.WORKER_CPU_SECONDS + 1, hard))
+
+            limits = global_vars.STUDENT_LIMITS if global_vars.student_mode else None
+            progress = state["progress"] = RemoteProgress(len(statements), limits)
+            execute_statements(state["conn"], statements,
+                               lambda text: outbox.send(("text", text)),
+                               progress=progress, results=StreamedResults())
+            state["progress"] = None
+            # The spill files now belong to the GUI process (deleted at its exit)
+            global_vars.spilled_results.clear()
+            outbox.send(("done",))
+
+    if state["conn"] is not None:
+        state["conn"].close()
+    return None
+
+
+if __name__ == "__main__":
+    serve()
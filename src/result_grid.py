@@ -0,0 +1,190 @@
+# result_grid.py
+#
+# Virtualized result grid for SQL Desk.
+#
+# A ttk.Treeview only ever holds the rows that are visible on screen:
+# scrolling does not move through thousands of Treeview items, it changes
+# the first row shown and refills the few visible items from a page store
+# (results.ListPageStore / results.CsvPageStore). Wide results are handled
+# the same way horizontally, by showing a window of columns.
+
+import tkinter as tk
+from tkinter import ttk
+import global_vars
+
+
+MAX_COLUMN_WIDTH = 300      # pixels
+SAMPLE_ROWS = 200           # rows used to guess the column widths
+
+
+class ResultGrid:
+    """
+    Window showing a query result in a virtualized grid.
+
+    Args:
+        parent : tkinter widget
+        headers : list[str]
+            Column names.
+        store : page store
+            Object with 'row_count' and get_rows(start, count).
+        title : str
+            Window title.
+    """
+
+    def __init__(self, parent, headers, store, title="Result"):
+        self.headers = list(headers)
+        self.store = store
+        self.first_row = 0
+        self.first_col = 0
+        self.visible_rows = 20
+        self.visible_cols = len(self.headers)
+
+        self.top = tk.Toplevel(parent)
+        self.top.title(f"{title} – {store.row_count:,} rows")
+        self.top.geometry("900x500")
+
+        columns = ["#"] + [f"c{i}" for i in range(len(self.headers))]
+        self.tree = ttk.Treeview(self.top, columns=columns, show="headings",
+                                 selectmode="browse")
+        self.tree.heading("#", text="#")
+        self.tree.column("#", width=70, anchor="e", stretch=False)
+        self._set_column_widths()
+
+        self.vbar = tk.Scrollbar(self.top, orient="vertical", command=self.yview)
+        self.hbar = tk.Scrollbar(self.top, orient="horizontal", command=self.xview)
+        self.status = tk.Label(self.top, anchor="w", bg=global_vars.bg_frame,
+                               fg=global_vars.text_colour)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        self.hbar.grid(row=1, column=0, sticky="ew")
+        self.status.grid(row=2, column=0, columnspan=2, sticky="ew")
+        self.top.grid_rowconfigure(0, weight=1)
+        self.top.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.tree.bind("<Shift-MouseWheel>", self._on_shift_wheel)
+        for key, rows in (("<Up>", -1), ("<Down>", 1),
+                          ("<Prior>", "page-up"), ("<Next>", "page-down")):
+            self.tree.bind(key, lambda e, r=rows: (self._on_key(r), "break")[1])
+        self.tree.bind("<Home>", lambda e: (self.show(0, self.first_col), "break")[1])
+        self.tree.bind("<End>", lambda e: (self.show(self.store.row_count, self.first_col), "break")[1])
+
+        self.show(0, 0)
+
+    # --- Layout -----------------------------------------------------------
+
+    def _set_column_widths(self):
+        """Guess column widths from the headers and a sample of rows."""
+        char = 8
+        widths = [len(h) for h in self.headers]
+        for row in self.store.get_rows(0, SAMPLE_ROWS):
+            for i, value in enumerate(row):
+                widths[i] = max(widths[i], len("" if value is None else str(value)))
+
+        self.col_widths = [min(w * char + 16, MAX_COLUMN_WIDTH) for w in widths]
+        for i, header in enumerate(self.headers):
+            self.tree.heading(f"c{i}", text=header)
+            self.tree.column(f"c{i}", width=self.col_widths[i], stretch=False)
+
+    def _on_resize(self, event):
+        style = ttk.Style()
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        header = 25
+        self.visible_rows = max((event.height - header) // row_height, 1)
+
+        # As many columns as fit in the width, starting at first_col
+        room = event.width - 70
+        count = 0
+        for width in self.col_widths[self.first_col:]:
+            room -= width
+            if room < 0 and count:
+                break
+            count += 1
+        self.visible_cols = max(count, 1)
+        self.show(self.first_row, self.first_col)
+
+    # --- Scrolling --------------------------------------------------------
+
+    def show(self, first_row, first_col):
+        """Display the rows and columns starting at (first_row, first_col)."""
+        total = self.store.row_count
+        self.first_row = max(0, min(first_row, total - self.visible_rows))
+        self.first_col = max(0, min(first_col, len(self.headers) - 1))
+
+        last_col = min(self.first_col + self.visible_cols, len(self.headers))
+        self.tree["displaycolumns"] = ["#"] + [f"c{i}" for i in range(self.first_col, last_col)]
+
+        self.tree.delete(*self.tree.get_children())
+        rows = self.store.get_rows(self.first_row, self.visible_rows)
+        for offset, row in enumerate(rows):
+            values = [self.first_row + offset + 1]
+            values.extend("NULL" if v is None else v for v in row)
+            self.tree.insert("", "end", values=values)
+
+        if total:
+            self.vbar.set(self.first_row / total,
+                          min(self.first_row + self.visible_rows, total) / total)
+        else:
+            self.vbar.set(0, 1)
+        ncols = max(len(self.headers), 1)
+        self.hbar.set(self.first_col / ncols, last_col / ncols)
+
+        shown = f"{self.first_row + 1:,}–{self.first_row + len(rows):,}" if rows else "0"
+        self.status.config(text=f"Rows {shown} of {total:,} – "
+                                f"columns {self.first_col + 1}–{last_col} of {len(self.headers)}")
+        return None
+
+    def scroll_rows(self, delta):
+        self.show(self.first_row + delta, self.first_col)
+
+    def yview(self, *args):
+        """Scrollbar command for the rows."""
+        if args[0] == "moveto":
+            self.show(int(float(args[1]) * self.store.row_count), self.first_col)
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.scroll_rows(int(args[1]) * step)
+
+    def xview(self, *args):
+        """Scrollbar command for the columns."""
+        if args[0] == "moveto":
+            self.show(self.first_row, int(float(args[1]) * len(self.headers)))
+        elif args[0] == "scroll":
+            step = self.visible_cols if args[2] == "pages" else 1
+            self.show(self.first_row, self.first_col + int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_shift_wheel(self, event):
+        self.xview("scroll", -1 if event.delta > 0 else 1, "units")
+        return "break"
+
+    def _on_key(self, rows):
+        if rows == "page-up":
+            rows = -self.visible_rows
+        elif rows == "page-down":
+            rows = self.visible_rows
+        self.scroll_rows(rows)
+
+
+def open_result_grid(parent, result):
+    """
+    Open a grid window for a results.QueryResult.
+
+    Args:
+        parent : tkinter widget
+        result : results.QueryResult
+
+    Returns:
+        ResultGrid
+    """
+    sql = " ".join(result.statement.split())
+    if len(sql) > 60:
+        sql = sql[:57] + "..."
+    return ResultGrid(parent, result.headers, result.page_store(), title=sql)
@@ -0,0 +1,538 @@
+# results.py
+#
+# Memory-bounded handling of query results for SQL Desk.
+#
+# - SELECTs without a LIMIT only keep the first rows (interactive row cap).
+# - Whatever the query, the rows kept in Python stay under a memory ceiling.
+# - Rows beyond the cap are streamed to a temporary CSV file (the "spill"),
+#   which also gives the exact row count; the file can be paged or exported.
+#
+# Everything here runs on the worker thread of a tab: no Tk widget is used.
+
+import atexit
+import csv
+import itertools
+import os
+import re
+import tempfile
+from array import array
+from collections import OrderedDict
+import global_vars
+from utils import split_sql_segments
+
+
+FETCH_BATCH = 500
+PAGE_ROWS = 200          # rows per page of the page stores
+
+
+class SpilledResult:
+    """
+    A full query result saved to a temporary CSV file.
+
+    'page_offsets' holds the file position of every PAGE_ROWS-th row,
+    so any page can be read back without scanning the file.
+    """
+
+    def __init__(self, path, headers, row_count, statement, page_offsets=None):
+        self.path = path
+        self.headers = headers
+        self.row_count = row_count
+        self.statement = statement
+        self.page_offsets = page_offsets or []
+
+    def label(self):
+        """Short description for menus."""
+        sql = " ".join(self.statement.split())
+        if len(sql) > 40:
+            sql = sql[:37] + "..."
+        return f"{self.row_count:,} rows – {sql}"
+
+
+def has_limit_clause(statement):
+    """
+    Return True if the statement itself ends with a LIMIT clause.
+
+    Comments, string literals and anything inside parentheses
+    (subqueries, CTEs) are ignored.
+    """
+    code = "".join(chunk for kind, chunk in split_sql_segments(statement) if kind == "code")
+    code = re.sub(r"'(?:[^']|'')*'", "''", code)
+
+    top_level = []
+    depth = 0
+    for ch in code:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            top_level.append(ch)
+    return re.search(r"\bLIMIT\b", "".join(top_level), re.IGNORECASE) is not None
+
+
+class _Column:
+    """
+    One column of a ColumnarResult.
+
+    kind is decided by the first non-NULL value:
+        "int"    : array('q')
+        "float"  : array('d')
+        "text"   : (start, end) offsets into the shared string arena
+        "blob"   : same, raw bytes
+        "object" : plain list (fallback for mixed types or huge integers)
+    NULLs are flagged in 'nulls' (one byte per row).
+    """
+
+    def __init__(self):
+        self.kind = None
+        self.data = None
+        self.starts = self.ends = None
+        self.nulls = bytearray()
+        self.null_count = 0
+        self.min = self.max = None
+        self.max_width = 0
+
+    def _start(self, kind, n):
+        """Create the storage for 'kind', padding the n NULLs seen so far."""
+        self.kind = kind
+        if kind == "int":
+            self.data = array("q", bytes(8 * n))
+        elif kind == "float":
+            self.data = array("d", bytes(8 * n))
+        elif kind in ("text", "blob"):
+            self.starts = array("q", bytes(8 * n))
+            self.ends = array("q", bytes(8 * n))
+        else:
+            self.data = [None] * n
+
+    def _to_objects(self, arena):
+        """Switch to the 'object' fallback, keeping the values stored so far."""
+        values = [self.get(i, arena) for i in range(len(self.nulls))]
+        self.kind = "object"
+        self.data = values
+        self.starts = self.ends = None
+
+    def append(self, value, arena):
+        """Store one value; return the number of bytes it uses."""
+        if value is None:
+            self.nulls.append(1)
+            self.null_count += 1
+            if self.kind is None:
+                return 1
+        else:
+            value_kind = _kind_of(value)
+            if self.kind is None:
+                self._start(value_kind, len(self.nulls))
+            elif self.kind != "object" and value_kind != self.kind:
+                self._to_objects(arena)
+            self.nulls.append(0)
+
+            text = str(value)
+            self.max_width = max(self.max_width, len(text))
+            try:
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+            except TypeError:
+                pass                    # mixed types: min/max stay on the first type
+
+        if self.kind in ("int", "float"):
+            self.data.append(0 if value is None else value)
+            return 9
+        if self.kind in ("text", "blob"):
+            start = len(arena)
+            if value is not None:
+                arena += value.encode("utf-8") if self.kind == "text" else value
+            self.starts.append(start)
+            self.ends.append(len(arena))
+            return 17 + len(arena) - start
+        self.data.append(value)
+        return 9 + (0 if value is None else 24 + len(text))
+
+    def get(self, i, arena):
+        """Return the value of row i."""
+        if self.nulls[i]:
+            return None
+        if self.kind in ("text", "blob"):
+            raw = bytes(arena[self.starts[i]:self.ends[i]])
+            return raw.decode("utf-8") if self.kind == "text" else raw
+        return self.data[i]
+
+
+def _kind_of(value):
+    """Storage kind for a single Python value returned by sqlite3."""
+    if isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "text"
+    if isinstance(value, bytes):
+        return "blob"
+    return "object"
+
+
+class ColumnarResult:
+    """
+    Compact container for a fetched result set.
+
+    Each column is stored in a typed array (integers, floats) or as
+    offsets into one shared UTF-8 arena (text, blobs), with a per-column
+    fallback to a plain list for mixed types. Rows are rebuilt on demand,
+    so the container behaves like a read-only list of tuples.
+
+    Per-column statistics (NULL count, min/max, display width) are kept
+    up to date while rows are appended, so renderers need no extra pass.
+    """
+
+    def __init__(self, headers):
+        self.headers = list(headers)
+        self.columns = [_Column() for _ in self.headers]
+        self.arena = bytearray()
+        self.nbytes = 0
+        self._length = 0
+
+    def append(self, row):
+        """Add one row (a sequence with one value per column)."""
+        for column, value in zip(self.columns, row):
+            self.nbytes += column.append(value, self.arena)
+        self._length += 1
+
+    def extend(self, rows):
+        """Add several rows."""
+        for row in rows:
+            self.append(row)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("row index out of range")
+        return self._row(index)
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield self._row(i)
+
+    def _row(self, i):
+        arena = self.arena
+        return tuple(column.get(i, arena) for column in self.columns)
+
+    def column_stats(self, index):
+        """
+        Statistics of one column.
+
+        Returns:
+            dict : kind, null_count, min, max, max_width
+            (max_width is the length of the longest str(value)).
+        """
+        column = self.columns[index]
+        return {
+            "kind": column.kind or "null",
+            "null_count": column.null_count,
+            "min": column.min,
+            "max": column.max,
+            "max_width": column.max_width,
+        }
+
+    def column_widths(self):
+        """Display width of every column's longest value (headers excluded)."""
+        return [column.max_width for column in self.columns]
+
+
+def fetch_rows(cur, statement, progress=None):
+    """
+    Fetch the rows to display for a SELECT.
+
+    Stops at the row cap (SELECTs without LIMIT only) or when the rows
+    kept reach half of RESULT_MEMORY_BYTES (the rendered table needs the
+    other half).
+
+    Args:
+        cur : sqlite3.Cursor
+            Cursor on which the SELECT was executed.
+        statement : str
+            The SQL statement (to look for a LIMIT clause).
+        progress : GUI_functions.QueryProgress, optional
+            Receives the number of rows fetched; provides the student
+            mode 'max_rows' budget.
+
+    Returns:
+        tuple(ColumnarResult, list, bool) : (rows kept, rows fetched but
+        not kept, True if the cursor is exhausted)
+    """
+    cap = None if has_limit_clause(statement) else global_vars.result_row_cap
+    budget = global_vars.RESULT_MEMORY_BYTES // 2
+    rows = ColumnarResult(d[0] for d in cur.description)
+
+    while True:
+        batch = cur.fetchmany(FETCH_BATCH)
+        if not batch:
+            return rows, [], True
+        count_rows(progress, len(rows) + len(batch))
+
+        for i, row in enumerate(batch):
+            if (cap is not None and len(rows) >= cap) or rows.nbytes > budget:
+                return rows, batch[i:], False
+            rows.append(row)
+
+
+def spill_rows(cur, headers, rows, leftover, statement, progress=None):
+    """
+    Write a whole result (rows already fetched + the rest of the cursor)
+    to a temporary CSV file, a batch at a time.
+
+    Args:
+        cur : sqlite3.Cursor
+        headers : list[str]
+        rows, leftover : list
+            Rows already fetched by fetch_rows().
+        statement : str
+        progress : GUI_functions.QueryProgress, optional
+
+    Returns:
+        SpilledResult
+    """
+    f = tempfile.NamedTemporaryFile(
+        "w", newline="", encoding="utf-8", suffix=".csv",
+        prefix="sql_desk_result_", delete=False
+    )
+    writer = csv.writer(f)
+    offsets = []
+    total = 0
+
+    def write(batch):
+        # Write rows page by page, remembering where each page starts
+        nonlocal total
+        i = 0
+        while i < len(batch):
+            if total % PAGE_ROWS == 0:
+                offsets.append(f.tell())
+            n = min(PAGE_ROWS - total % PAGE_ROWS, len(batch) - i)
+            writer.writerows(batch[i:i + n])
+            i += n
+            total += n
+
+    try:
+        writer.writerow(headers)
+        write(rows)
+        write(leftover)
+
+        while True:
+            batch = cur.fetchmany(FETCH_BATCH * 10)
+            if not batch:
+                break
+            write(batch)
+            count_rows(progress, total)
+        f.close()
+    except BaseException:
+        f.close()
+        os.remove(f.name)
+        raise
+
+    result = SpilledResult(f.name, headers, total, statement, offsets)
+    remember(result)
+    return result
+
+
+class QueryResult:
+    """
+    The last result of a SELECT, kept for the result grid.
+
+    'rows' are the rows kept in memory; when the result was spilled,
+    'spilled' describes the full result on disk.
+    """
+
+    def __init__(self, headers, rows, statement, spilled=None):
+        self.headers = headers
+        self.rows = rows
+        self.statement = statement
+        self.spilled = spilled
+
+    def page_store(self):
+        """Return a page store giving access to every row of the result."""
+        if self.spilled is not None and os.path.exists(self.spilled.path):
+            return CsvPageStore(self.spilled)
+        return ListPageStore(self.rows)
+
+
+class ListPageStore:
+    """Page store over rows already in memory."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.row_count = len(rows)
+
+    def get_rows(self, start, count):
+        """Return rows [start, start + count)."""
+        return self.rows[start:start + count]
+
+
+class CsvPageStore:
+    """
+    Page store over a spilled CSV result: pages are read from disk on
+    demand and the most recent ones are cached.
+    """
+
+    MAX_CACHED_PAGES = 16
+
+    def __init__(self, spilled):
+        self.spilled = spilled
+        self.row_count = spilled.row_count
+        self.cache = OrderedDict()
+
+    def _page(self, number):
+        if number in self.cache:
+            self.cache.move_to_end(number)
+            return self.cache[number]
+
+        with open(self.spilled.path, "r", newline="", encoding="utf-8") as f:
+            f.seek(self.spilled.page_offsets[number])
+            page = list(itertools.islice(csv.reader(f), PAGE_ROWS))
+
+        self.cache[number] = page
+        if len(self.cache) > self.MAX_CACHED_PAGES:
+            self.cache.popitem(last=False)
+        return page
+
+    def get_rows(self, start, count):
+        """Return rows [start, start + count)."""
+        end = min(start + count, self.row_count)
+        rows = []
+        for number in range(start // PAGE_ROWS, (end - 1) // PAGE_ROWS + 1):
+            page = self._page(number)
+            first = number * PAGE_ROWS
+            rows.extend(page[max(start - first, 0):end - first])
+        return rows
+
+
+# =========================
+# CACHED RESULTS (TEMP TABLES)
+# =========================
+
+CACHED_PREFIX = "cached_result_"
+
+# Statements whose result can be stored with CREATE TABLE ... AS
+_CACHEABLE = re.compile(
+    r"^(?:\s+|--[^\n]*\n|/\*.*?\*/)*(SELECT|WITH|VALUES)\b",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def quote_identifier(name):
+    """Quote an SQL identifier ("name")."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def is_cacheable(statement):
+    """Return True if the statement is a query that can be cached."""
+    return _CACHEABLE.match(statement) is not None
+
+
+def list_cached_results(conn):
+    """Names of the cached results of a connection, oldest first."""
+    rows = conn.execute(
+        "SELECT name FROM temp.sqlite_master WHERE type = 'table' AND name LIKE ?",
+        (CACHED_PREFIX + "%",)
+    ).fetchall()
+    names = [name for (name,) in rows if name[len(CACHED_PREFIX):].isdigit()]
+    return sorted(names, key=lambda name: int(name[len(CACHED_PREFIX):]))
+
+
+def _original_names(names):
+    """Undo the 'name:N' renaming of duplicate columns by CREATE TABLE ... AS."""
+    seen, original = set(), []
+    for name in names:
+        base, colon, number = name.rpartition(":")
+        if colon and number.isdigit() and base in seen:
+            name = base
+        seen.add(name)
+        original.append(name)
+    return original
+
+
+def cache_select(cur, statement, progress=None):
+    """
+    Run a query as CREATE TEMP TABLE ... AS, then select from that table.
+
+    The query therefore runs only once; afterwards its result can be
+    sorted, filtered or grouped from the TEMP table (which lives only as
+    long as the connection). Only the last CACHED_RESULTS tables are kept.
+    If the statement cannot be wrapped (e.g. WITH ... DELETE), it is
+    executed normally; a query failing while it runs is not run again.
+    The result keeps the column names of the query, duplicates included.
+
+    Args:
+        cur : sqlite3.Cursor
+        statement : str
+        progress : GUI_functions.QueryProgress, optional
+
+    Returns:
+        str or None : Name of the TEMP table, or None if not cached.
+    """
+    conn = cur.connection
+    existing = list_cached_results(conn)
+    number = int(existing[-1][len(CACHED_PREFIX):]) + 1 if existing else 1
+    name = f"{CACHED_PREFIX}{number}"
+    query = statement.rstrip().rstrip(";")
+
+    try:
+        # EXPLAIN prepares the wrapped statement without running the query
+        cur.execute(f"EXPLAIN CREATE TEMP TABLE {name} AS {query}").fetchone()
+    except Exception:
+        if progress is not None and (progress.cancel_requested or progress.violation):
+            raise
+        cur.execute(statement)          # not a plain query: run it as it is
+        return None
+
+    cur.execute(f"CREATE TEMP TABLE {name} AS {query}")
+    for old in (existing + [name])[:-global_vars.CACHED_RESULTS]:
+        cur.execute(f"DROP TABLE IF EXISTS temp.{old}")
+
+    columns = [row[1] for row in cur.execute(f"PRAGMA temp.table_info({name})")]
+    select = ", ".join(f"{quote_identifier(column)} AS {quote_identifier(original)}"
+                       for column, original in zip(columns, _original_names(columns)))
+    cur.execute(f"SELECT {select} FROM temp.{name}")
+    return name
+
+
+def count_rows(progress, total):
+    """Publish the number of rows fetched and enforce the student mode budget."""
+    if progress is None:
+        return None
+    progress.rows = total
+    max_rows = progress.limit("max_rows")
+    if max_rows and total > max_rows:
+        progress.violation = f"the result has more than {max_rows:,} rows"
+        raise RuntimeError(progress.violation)
+    return None
+
+
+def remember(result):
+    """Keep the last MAX_SPILLED_RESULTS spills; delete older files."""
+    global_vars.spilled_results.append(result)
+    while len(global_vars.spilled_results) > global_vars.MAX_SPILLED_RESULTS:
+        old = global_vars.spilled_results.pop(0)
+        try:
+            os.remove(old.path)
+        except OSError:
+            pass
+    return None
+
+
+@atexit.register
+def remove_spill_files():
+    """Delete every temporary result file (called at exit)."""
+    for result in global_vars.spilled_results:
+        try:
+            os.remove(result.path)
+        except OSError:
+            pass
+    global_vars.spilled_results.clear()
+    return None
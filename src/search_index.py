@@ -0,0 +1,216 @@
+# search_index.py
+#
+# One-click full-text search indexes (SQLite FTS5) for SQL Desk.
+#
+# "Create Search Index" on a table column builds an external-content FTS5
+# table named <table>_<column>_fts: it stores only the index, the text
+# stays in the original table. Three triggers keep it in sync on INSERT,
+# UPDATE and DELETE.
+#
+# When a SELECT filters that column with LIKE '%word%' (a full scan),
+# SQL Desk suggests the equivalent MATCH query, which probes the index:
+#
+#     WHERE title LIKE '%dragon%'
+#  -> WHERE rowid IN (SELECT rowid FROM book_title_fts
+#                     WHERE book_title_fts MATCH '"dragon"')
+#
+# MATCH finds whole words (and prefixes with "word"*), not any substring.
+
+import re
+from results import quote_identifier
+
+
+FTS_SUFFIX = "_fts"
+SHADOW_SUFFIXES = ("_data", "_idx", "_content", "_docsize", "_config")
+
+# [qualifier.]column LIKE '%text%'  (text without wildcards or quotes)
+LIKE_SUBSTRING = re.compile(
+    r"(?:(?P<qualifier>\w+)\.)?(?P<column>\w+)\s+LIKE\s+'%(?P<text>[^%_']+)%'",
+    re.IGNORECASE
+)
+
+
+def index_name(table, column):
+    """Name of the FTS5 table indexing table.column."""
+    return f"{table}_{column}{FTS_SUFFIX}"
+
+
+def fts5_available(conn):
+    """True if the SQLite library was compiled with FTS5."""
+    try:
+        return bool(conn.execute(
+            "SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+    except Exception:
+        return False
+
+
+def list_search_indexes(conn):
+    """
+    Search indexes of a database.
+
+    Returns:
+        list[tuple[str, str, str]] : (fts table, table, column)
+    """
+    indexes = []
+    rows = conn.execute(
+        "SELECT name, sql FROM main.sqlite_master "
+        "WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%USING fts5%'"
+    ).fetchall()
+    for name, sql in rows:
+        content = re.search(r"content\s*=\s*'((?:[^']|'')+)'", sql, re.IGNORECASE)
+        if content is None:
+            continue
+        table = content.group(1).replace("''", "'")
+        columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({quote_identifier(name)})")]
+        if len(columns) == 1:
+            indexes.append((name, table, columns[0]))
+    return indexes
+
+
+def is_index_table(name, indexes):
+    """True for an FTS table of 'indexes' or one of its shadow tables."""
+    for fts, _table, _column in indexes:
+        if name == fts or (name.startswith(fts) and name[len(fts):] in SHADOW_SUFFIXES):
+            return True
+    return False
+
+
+def run_in_transaction(conn, script):
+    """
+    Run statements as one transaction: all of them or none.
+
+    'with conn' is not enough: in the sqlite3 module's default mode, DDL
+    does not open a transaction, so each CREATE / DROP would commit alone.
+    A transaction the user left open is committed first.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN")
+    try:
+        for sql in script:
+            conn.execute(sql)
+        conn.commit()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    return None
+
+
+def create_search_index(conn, table, column, emit):
+    """
+    Build the search index of table.column and its sync triggers.
+
+    Runs in one transaction, on the tab's worker (see run_in_tab).
+
+    Args:
+        conn : sqlite3.Connection
+        table, column : str
+        emit : callable
+            Receives the messages to display.
+
+    Returns: None
+    """
+    if not fts5_available(conn):
+        emit("This SQLite library was built without FTS5: search indexes are not available.")
+        return None
+
+    without_rowid = conn.execute(
+        "SELECT sql LIKE '%WITHOUT ROWID%' FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+        (table,)
+    ).fetchone()
+    if without_rowid is None:
+        emit(f"No table named {table}.")
+        return None
+    if without_rowid[0]:
+        emit(f"{table} is a WITHOUT ROWID table: it cannot have a search index.")
+        return None
+
+    fts = index_name(table, column)
+    q_fts, q_table, q_column = (quote_identifier(n) for n in (fts, table, column))
+    literal_table = table.replace("'", "''")
+
+    def trigger(event):
+        return quote_identifier(f"{fts}_{event}")
+
+    script = [
+        f"CREATE VIRTUAL TABLE {q_fts} USING fts5({q_column}, "
+        f"content='{literal_table}', content_rowid='rowid')",
+        f"CREATE TRIGGER {trigger('ai')} AFTER INSERT ON {q_table} BEGIN "
+        f"INSERT INTO {q_fts}(rowid, {q_column}) VALUES (new.rowid, new.{q_column}); END",
+        f"CREATE TRIGGER {trigger('ad')} AFTER DELETE ON {q_table} BEGIN "
+        f"INSERT INTO {q_fts}({q_fts}, rowid, {q_column}) VALUES ('delete', old.rowid, old.{q_column}); END",
+        f"CREATE TRIGGER {trigger('au')} AFTER UPDATE ON {q_table} BEGIN "
+        f"INSERT INTO {q_fts}({q_fts}, rowid, {q_column}) VALUES ('delete', old.rowid, old.{q_column}); "
+        f"INSERT INTO {q_fts}(rowid, {q_column}) VALUES (new.rowid, new.{q_column}); END",
+        f"INSERT INTO {q_fts}({q_fts}) VALUES ('rebuild')",
+    ]
+    try:
+        run_in_transaction(conn, script)
+    except Exception as e:
+        emit(f"Could not create the search index: {e}")
+        return None
+
+    rows = conn.execute(f"SELECT count(*) FROM {q_table}").fetchone()[0]
+    emit(f"Search index {fts} created ({rows:,} rows indexed).\n"
+         "Search it with:\n"
+         f"SELECT * FROM {q_table}\n"
+         f"WHERE rowid IN (SELECT rowid FROM {q_fts} WHERE {q_fts} MATCH 'word');")
+    return None
+
+
+def drop_search_index(conn, table, column, emit):
+    """Remove the search index of table.column and its triggers."""
+    fts = index_name(table, column)
+    script = [f"DROP TRIGGER IF EXISTS {quote_identifier(f'{fts}_{event}')}"
+              for event in ("ai", "ad", "au")]
+    script.append(f"DROP TABLE IF EXISTS {quote_identifier(fts)}")
+    try:
+        run_in_transaction(conn, script)
+    except Exception as e:
+        emit(f"Could not remove the search index: {e}")
+        return None
+    emit(f"Search index {fts} removed.")
+    return None
+
+
+def suggest_match(conn, statement):
+    """
+    Suggest a MATCH version of a SELECT whose LIKE '%word%' filters can
+    use a search index.
+
+    Args:
+        conn : sqlite3.Connection
+        statement : str
+
+    Returns:
+        str or None : suggestion text to display.
+    """
+    if not LIKE_SUBSTRING.search(statement):
+        return None
+    try:
+        indexes = list_search_indexes(conn)
+    except Exception:
+        return None
+    if not indexes:
+        return None
+
+    words = set(re.findall(r"\w+", statement.lower()))
+    by_column = {column.lower(): (fts, table) for fts, table, column in indexes
+                 if table.lower() in words}
+
+    def rewrite(match):
+        found = by_column.get(match.group("column").lower())
+        if found is None:
+            return match.group(0)
+        fts, _table = found
+        rowid = f"{match.group('qualifier')}.rowid" if match.group("qualifier") else "rowid"
+        phrase = '"' + match.group("text").strip().replace('"', '""') + '"'
+        q_fts = quote_identifier(fts)
+        return f"{rowid} IN (SELECT rowid FROM {q_fts} WHERE {q_fts} MATCH '{phrase}')"
+
+    rewritten = LIKE_SUBSTRING.sub(rewrite, statement)
+    if rewritten == statement:
+        return None
+    return ("Tip: a search index can answer this query without reading the whole table "
+            "(MATCH finds whole words):\n" + rewritten)
@@ -16,13 +16,26 @@
 # - This file focuses on interface layout and widget wiring only.
 #   It should not implement application logic beyond simple callbacks.
 # - GUI_functions.py        : actions triggered by buttons/menus
-# - database_management.py  : opening / creating / switching databases
+# - workspace.py            : workspace tabs (one connection + worker each)
+# - results.py              : memory-bounded result fetching, spill to disk
+# - result_grid.py          : virtualized result grid (ttk.Treeview)
+# - diagnostics.py          : formatting profile and other diagnostics logs
+# - sql_functions.py        : median, percentile, stddev, mode, REGEXP for SQL
+# - statement_index.py      : statement boundaries of the editor (Ctrl+Enter)
+# - query_process.py        : optional query execution in a limited child process
+# - search_index.py         : one-click FTS5 search indexes, MATCH suggestions
+# - sql_formatter.py        : command-line Pretty Print for files and folders
+# - workload.py             : workload recording (Tools menu) and replay tool
+# - db_diff.py              : compare a database with a reference (schema, rows)
+# - db_info.py              : Database Info view (pages, sizes, row counts)
+# - maintenance.py          : ANALYZE, optimize, VACUUM, quick_check (Database menu)
+# - database_management.py  : opening / creating / switching / attaching databases
 # - utils.py                : formatting, output helpers, housekeeping
 # - global_vars.py          : shared colours, fonts, state, etc.
 
 
 from tkinter import *
-from tkinter import font, simpledialog, filedialog, messagebox
+from tkinter import font, simpledialog, filedialog, messagebox, ttk
 from tkinter.scrolledtext import ScrolledText
 import os, global_vars
 
@@ -30,16 +43,27 @@ import os, global_vars
 from GUI_functions import (
     run_sql, get_tables, save_sql_code,
     open_sql_code, change_font_size, refresh_sql_file_menu,
-    pretty_print_sql, refresh_db_file_menu, open_and_refresh, create_and_refresh
+    pretty_print_sql, refresh_db_file_menu, open_and_refresh, create_and_refresh,
+    prompt_take_snapshot, refresh_snapshot_menu, refresh_tab_title, preview_sql_file,
+    run_sql_file, cancel_query, refresh_results_menu, set_result_row_cap,
+    run_current_statement, prompt_search_index, prompt_compare_database, database_info,
+    run_maintenance_action, prompt_attach_database, refresh_detach_menu
 )
 
 from utils import (load_recent_files, clear_output,
                     clean_recent_db_files, clean_recent_sql_files, on_closing)
 
 from database_management import (
-    create_new_database, choose_database, menu_open_database, close_active_connection
+    create_new_database, choose_database, menu_open_database, close_active_connection,
+    save_sandbox, discard_sandbox, reset_to_snapshot, update_window_title,
+    set_student_mode
 )
 
+from diagnostics import set_watchdog
+from statement_index import StatementIndex
+from query_process import set_isolated_execution
+from workspace import QueryTab, add_tab, switch_to_tab, close_tab, close_all_tabs
+
 from tkinter import Button
 
 
@@ -79,7 +103,7 @@ if euro_logo:
 # --- Quit button ---
 # Uses the same shutdown path as clicking the [X] of the window:
 # - saves recent files
-# - closes any active DB connection
+# - closes the DB connection of every tab
 # - destroys the window cleanly
 button_quit = Button(
     frame_buttons,
@@ -87,7 +111,7 @@ button_quit = Button(
     width=10,
     bg=global_vars.bg_button,
     fg=global_vars.text_colour,
-    command=lambda: on_closing(window, pre_close=lambda: close_active_connection(True))
+    command=lambda: on_closing(window, pre_close=lambda: close_all_tabs(close_active_connection))
 )
 button_quit.grid(row=0, column=2, padx=5, pady=10, sticky="n")
 
@@ -97,6 +121,8 @@ button_quit.grid(row=0, column=2, padx=5, pady=10, sticky="n")
 sql_file_button = Menubutton(frame_buttons, text="SQL File", bg=global_vars.bg_button, fg=global_vars.text_colour, relief=RAISED)
 sql_file_menu = Menu(sql_file_button, tearoff=0)
 sql_file_menu.add_command(label="Open SQL...", command=lambda: open_sql_code(sql_textbox, menu=sql_file_menu))
+sql_file_menu.add_command(label="Preview SQL File...", command=lambda: preview_sql_file(window))
+sql_file_menu.add_command(label="Run SQL File...", command=lambda: run_sql_file(output_textbox))
 sql_file_menu.add_command(
     label="Save",
     accelerator="Ctrl+S",
@@ -119,50 +145,329 @@ sql_file_button.config(menu=sql_file_menu)
 sql_file_button.grid(row=0, column=3, padx=5, pady=10, sticky="n")
 
 
-# --- Main layout: a vertical PanedWindow containing a horizontal PanedWindow ---
-# Top row (row=0) is buttons/logo.
-# Row=1 is a resizable split pane: left = SQL editor, right = output console.
-main_paned = PanedWindow(window, orient=VERTICAL)
-main_paned.grid(row=1, column=0, columnspan=2, sticky="nsew")
-
-horizontal_paned = PanedWindow(main_paned, orient=HORIZONTAL)
+# --- Fonts shared by every workspace tab ---
+sql_font = font.Font(family="Courier", size=global_vars.font_size_sql)
+output_font = font.Font(family="Courier", size=global_vars.font_size_output)
 
-frame_query = Frame(bg=global_vars.bg_frame)
-frame_output = Frame(bg=global_vars.bg_frame)
+sql_font_size_var = StringVar()
+sql_font_size_var.set(str(global_vars.font_size_sql))
+output_font_size_var = StringVar()
+output_font_size_var.set(str(global_vars.font_size_output))
+row_cap_var = StringVar()
+row_cap_var.set(f"{global_vars.result_row_cap:,}")
+grid_view_var = BooleanVar(value=global_vars.grid_view)
+cache_results_var = BooleanVar(value=global_vars.cache_results)
+
+
+# --- Tools menu (diagnostics) ---
+tools_button = Menubutton(frame_buttons, text="Tools", bg=global_vars.bg_button, fg=global_vars.text_colour, relief=RAISED)
+tools_menu = Menu(tools_button, tearoff=0)
+profile_formatting_var = BooleanVar(value=global_vars.profile_formatting)
+tools_menu.add_checkbutton(
+    label="Profile Formatting (log to format_profile.jsonl)",
+    variable=profile_formatting_var,
+    command=lambda: setattr(global_vars, "profile_formatting", profile_formatting_var.get())
+)
+watchdog_var = BooleanVar(value=False)
+tools_menu.add_checkbutton(
+    label="UI Watchdog (log stalls to ui_stalls.jsonl)",
+    variable=watchdog_var,
+    command=lambda: set_watchdog(watchdog_var.get(), window)
+)
+record_workload_var = BooleanVar(value=global_vars.record_workload)
+tools_menu.add_checkbutton(
+    label="Record Workload (log statements to workload.jsonl)",
+    variable=record_workload_var,
+    command=lambda: setattr(global_vars, "record_workload", record_workload_var.get())
+)
+tools_menu.add_separator()
+exact_widths_var = BooleanVar(value=global_vars.exact_table_widths)
+tools_menu.add_checkbutton(
+    label="Exact Table Column Widths (slower on big results)",
+    variable=exact_widths_var,
+    command=lambda: setattr(global_vars, "exact_table_widths", exact_widths_var.get())
+)
+tools_button.config(menu=tools_menu)
+tools_button.grid(row=0, column=6, padx=5, pady=10, sticky="n")
 
-horizontal_paned.add(frame_query)
-horizontal_paned.add(frame_output)
-main_paned.add(horizontal_paned)
 
-main_paned.paneconfigure(horizontal_paned, stretch="always")
-horizontal_paned.paneconfigure(frame_query, stretch="always")
-horizontal_paned.paneconfigure(frame_output, stretch="always")
+# --- Main layout: a notebook of workspace tabs ---
+# Top row (row=0) is buttons/logo.
+# Row=1 is a notebook; each tab is a resizable split pane:
+# left = SQL editor, right = output console.
+# Each tab has its own database connection and runs its SQL on its own
+# worker thread (see workspace.py), so several queries can run at once.
+notebook = ttk.Notebook(window)
+notebook.grid(row=1, column=0, columnspan=2, sticky="nsew")
 
 window.grid_rowconfigure(1, weight=1)
 window.grid_columnconfigure(0, weight=1)
 window.grid_columnconfigure(1, weight=1)
 
 
-# --- SQL Query frame ---
-# Left-hand pane: an SQL "shell" text area + action buttons.
-Label(frame_query, text='SQL Shell :', bg=global_vars.bg_frame, fg=global_vars.text_colour).grid(row=0, column=0, sticky="nw")
-sql_font = font.Font(family="Courier", size=global_vars.font_size_sql)
+def build_query_tab():
+    """Create the widgets of one workspace tab and return its QueryTab."""
+    horizontal_paned = PanedWindow(notebook, orient=HORIZONTAL)
+
+    frame_query = Frame(horizontal_paned, bg=global_vars.bg_frame)
+    frame_output = Frame(horizontal_paned, bg=global_vars.bg_frame)
+
+    horizontal_paned.add(frame_query)
+    horizontal_paned.add(frame_output)
+
+    horizontal_paned.paneconfigure(frame_query, stretch="always")
+    horizontal_paned.paneconfigure(frame_output, stretch="always")
+
+    # --- SQL Query frame ---
+    # Left-hand pane: an SQL "shell" text area + action buttons.
+    Label(frame_query, text='SQL Shell :', bg=global_vars.bg_frame, fg=global_vars.text_colour).grid(row=0, column=0, sticky="nw")
+
+    tab_sql_textbox = ScrolledText(frame_query, width=60, height=10, background=global_vars.bg_textbox, font=sql_font)
+    tab_sql_textbox.grid(row=1, column=0, sticky="nsew")
+
+    # The text widget has undo buffering enabled so pupils can safely experiment.
+    tab_sql_textbox.config(undo=True, maxundo=2000, autoseparators=True)
+    # Ctrl+Enter runs the statement under the cursor. Bound on the editor itself:
+    # its "break" must stop the Text class binding from inserting a newline.
+    tab_sql_textbox.bind("<Control-Return>",
+                         lambda e: (run_current_statement(sql_textbox, output_textbox), "break")[1])
+
+    # --- Buttons below the SQL editor (Run / Stop / List Tables / Database Info / Pretty Print / Font size) ---
+    # They act on the active tab through the module-level sql_textbox / output_textbox.
+    button_frame = Frame(frame_query, bg=global_vars.bg_frame)
+    button_frame.grid(row=2, column=0, sticky="nw", pady=2)
+
+    Button(
+        button_frame,
+        text="Run SQL",
+        width=10,
+        bg=global_vars.bg_button,
+        fg=global_vars.text_colour,
+        command=lambda: run_sql(sql_textbox, output_textbox)
+    ).pack(side=LEFT)
+
+    Button(
+        button_frame,
+        text="Run Statement",
+        width=13,
+        bg=global_vars.bg_button,
+        fg=global_vars.text_colour,
+        command=lambda: run_current_statement(sql_textbox, output_textbox)
+    ).pack(side=LEFT, padx=(5, 0))
+
+    Button(
+        button_frame,
+        text="Stop",
+        width=6,
+        bg=global_vars.bg_button,
+        fg=global_vars.text_colour,
+        command=lambda: cancel_query(output_textbox)
+    ).pack(side=LEFT, padx=(5, 0))
+
+    Button(
+        button_frame,
+        text="List Tables",
+        width=12,
+        bg=global_vars.bg_button,
+        fg=global_vars.text_colour,
+        command=lambda: get_tables(output_textbox)
+    ).pack(side=LEFT, padx=(10, 0))
+
+    Button(
+        button_frame,
+        text="Database Info",
+        width=12,
+        bg=global_vars.bg_button,
+        fg=global_vars.text_colour,
+        command=lambda: database_info(output_textbox)
+    ).pack(side=LEFT, padx=(5, 10))
+
+    Button(
+        button_frame,
+        text="Pretty Print",
+        width=12,
+        bg=global_vars.bg_button,
+        fg=global_vars.text_colour,
+        command=lambda: pretty_print_sql(sql_textbox)
+    ).pack(side=LEFT)
+
+    OptionMenu(
+        button_frame,
+        sql_font_size_var,
+        *[str(size) for size in range(8, 25, 2)],
+        command=lambda sel: change_font_size(sel, sql_font, "sql")
+    ).pack(side=LEFT, padx=10)
+
+    frame_query.grid_rowconfigure(1, weight=1)
+    frame_query.grid_columnconfigure(0, weight=1)
+
+    # --- Output frame ---
+    # Right-hand pane: read-only console style output.
+    # Used to show query results, table listings, status messages, etc.
+    Label(frame_output, text='Output :', bg=global_vars.bg_frame, fg=global_vars.text_colour).grid(row=0, column=0, sticky="nw")
+
+    tab_output_textbox = ScrolledText(frame_output, width=75, height=20, background=global_vars.bg_textbox, font=output_font)
+    tab_output_textbox.grid(row=1, column=0, sticky="nsew")
+    tab_output_textbox.config(state='disabled')
+
+    # Styling tags for structured output:
+    # - "pk"     : primary keys in red
+    # - "tbl"    : table names in bold
+    # - "comma"  : commas in light grey for readability
+    tab_output_textbox.tag_config("pk", foreground="#A00000",
+                                  font=("Courier", global_vars.font_size_output, "bold"))
+    tab_output_textbox.tag_config("tbl", font=("Courier", global_vars.font_size_output, "bold"))
+    tab_output_textbox.tag_config("comma", foreground="#888888")
+
+    # --- Output frame controls (Clear output, Output font size, Row cap, Results) ---
+    button_frame_out = Frame(frame_output, bg=global_vars.bg_frame)
+    button_frame_out.grid(row=2, column=0, sticky="nw", pady=2)
+
+    Button(
+        button_frame_out,
+        text="Clear result box",
+        bg=global_vars.bg_button,
+        fg=global_vars.text_colour,
+        command=lambda: clear_output(output_textbox)
+    ).pack(side=LEFT)
+
+    OptionMenu(
+        button_frame_out,
+        output_font_size_var,
+        *[str(size) for size in range(8, 25, 2)],
+        command=lambda sel: change_font_size(sel, output_font, "output")
+    ).pack(side=LEFT, padx=10)
+
+    # Row cap for SELECTs without LIMIT, and full results saved to disk
+    OptionMenu(
+        button_frame_out,
+        row_cap_var,
+        *[f"{cap:,}" for cap in global_vars.RESULT_ROW_CAP_CHOICES],
+        command=set_result_row_cap
+    ).pack(side=LEFT)
+
+    results_button = Menubutton(button_frame_out, text="Results", bg=global_vars.bg_button,
+                                fg=global_vars.text_colour, relief=RAISED)
+    results_menu = Menu(results_button, tearoff=0)
+    results_menu.config(postcommand=lambda: refresh_results_menu(results_menu, window, grid_view_var, cache_results_var))
+    results_button.config(menu=results_menu)
+    results_button.pack(side=LEFT, padx=10)
+
+    # Status line: live progress of the query running in this tab
+    status_label = Label(button_frame_out, text="", anchor="w",
+                         bg=global_vars.bg_frame, fg=global_vars.text_colour)
+    status_label.pack(side=LEFT, padx=10)
+
+    frame_output.grid_rowconfigure(1, weight=1)
+    frame_output.grid_columnconfigure(0, weight=1)
+
+    tab = QueryTab(horizontal_paned, tab_sql_textbox, tab_output_textbox)
+    tab.status_label = status_label
+    tab.statement_index = StatementIndex(tab_sql_textbox)
+    notebook.add(horizontal_paned, text=tab.title())
+    add_tab(tab)
+    return tab
+
+
+def activate_tab(tab):
+    """Make 'tab' the active one and point the global widgets at it."""
+    global sql_textbox, output_textbox
+
+    switch_to_tab(tab)
+    sql_textbox = tab.sql_textbox
+    output_textbox = tab.output_textbox
+
+    # Menus capture the widgets when they are built: rebuild them
+    refresh_sql_file_menu(sql_file_menu, sql_textbox)
+    if "db_menu" in globals():
+        refresh_db_file_menu(db_menu, output_textbox, window, select_database=choose_database)
+
+    if global_vars.current_database:
+        update_window_title(window)
+    else:
+        window.title('SQL Desk')
+    sql_textbox.focus_set()
+    return None
+
+
+def on_tab_changed(event=None):
+    """Notebook callback: activate the tab that was just selected."""
+    selected = notebook.select()
+    for tab in global_vars.tabs:
+        if str(tab.frame) == selected:
+            activate_tab(tab)
+            break
+    return None
+
+
+def new_tab():
+    """Open a new tab, connected to the same database as the current one."""
+    database = global_vars.current_database if global_vars.current_connection else ''
+    sandbox = global_vars.sandbox_active
+
+    tab = build_query_tab()
+    notebook.select(tab.frame)
+    activate_tab(tab)
+
+    if database:
+        choose_database(database, output_textbox=output_textbox, window=window, sandbox=sandbox)
+        refresh_tab_title(tab)
+    return None
+
+
+def close_current_tab():
+    """Close the active tab (the last remaining tab is kept open)."""
+    if len(global_vars.tabs) <= 1:
+        return None
+    tab = global_vars.current_tab
+    close_tab(tab, close_active_connection)
+    notebook.forget(tab.frame)
+    tab.frame.destroy()
+    on_tab_changed()
+    return None
+
+
+# Create the first tab; sql_textbox / output_textbox always refer to the
+# widgets of the active tab.
+sql_textbox = output_textbox = None
+activate_tab(build_query_tab())
+notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
+
+
+# --- Tab buttons (New Tab / Close Tab) ---
+Button(
+    frame_buttons,
+    text="New Tab",
+    width=10,
+    bg=global_vars.bg_button,
+    fg=global_vars.text_colour,
+    command=new_tab
+).grid(row=0, column=4, padx=5, pady=10, sticky="n")
 
-sql_textbox = ScrolledText(frame_query, width=60, height=10, background=global_vars.bg_textbox, font=sql_font)
-sql_textbox.grid(row=1, column=0, sticky="nsew")
+Button(
+    frame_buttons,
+    text="Close Tab",
+    width=10,
+    bg=global_vars.bg_button,
+    fg=global_vars.text_colour,
+    command=close_current_tab
+).grid(row=0, column=5, padx=5, pady=10, sticky="n")
 
 
 # --- Keyboard shortcuts (Ctrl+...) on the SQL editor ---
 # - Ctrl+Z / Ctrl+Y (and Ctrl+Shift+Z): undo / redo
 # - Ctrl+S: save SQL to file
-# The text widget has undo buffering enabled so pupils can safely experiment.
-sql_textbox.config(undo=True, maxundo=2000, autoseparators=True)
+# - Ctrl+T / Ctrl+W: new tab / close tab
+# - Escape: stop the running query
+# - Ctrl+Enter: run the statement under the cursor (bound on each editor, see build_query_tab)
 window.bind("<Control-z>", lambda e: (sql_textbox.event_generate("<<Undo>>"), "break")[1])
 window.bind("<Control-y>", lambda e: (sql_textbox.event_generate("<<Redo>>"), "break")[1])
 window.bind("<Control-Shift-Z>", lambda e: (sql_textbox.event_generate("<<Redo>>"), "break")[1])
 window.bind("<Control-s>", lambda e: (save_sql_code(sql_textbox, sql_file_menu, force_save_as=False), "break")[1])
 window.bind("<Control-Shift-S>", lambda e: (save_sql_code(sql_textbox, sql_file_menu, force_save_as=True), "break")[1])
-
+window.bind("<Control-t>", lambda e: (new_tab(), "break")[1])
+window.bind("<Control-w>", lambda e: (close_current_tab(), "break")[1])
+window.bind("<Escape>", lambda e: cancel_query())
 
 
 # Refresh the “recent SQL files” menu now that the widget exists.
@@ -170,75 +475,14 @@ clean_recent_sql_files()
 refresh_sql_file_menu(sql_file_menu, sql_textbox)
 
 
-# --- Buttons below the SQL editor (Run / List Tables / Pretty Print / Font size) ---
-button_frame = Frame(frame_query, bg=global_vars.bg_frame)
-button_frame.grid(row=2, column=0, sticky="nw", pady=2)
-
-Button(
-    button_frame,
-    text="Run SQL",
-    width=10,
-    bg=global_vars.bg_button,
-    fg=global_vars.text_colour,
-    command=lambda: run_sql(sql_textbox, output_textbox)
-).pack(side=LEFT)
-
-Button(
-    button_frame,
-    text="List Tables",
-    width=12,
-    bg=global_vars.bg_button,
-    fg=global_vars.text_colour,
-    command=lambda: get_tables(output_textbox)
-).pack(side=LEFT, padx=10)
-
-Button(
-    button_frame,
-    text="Pretty Print",
-    width=12,
-    bg=global_vars.bg_button,
-    fg=global_vars.text_colour,
-    command=lambda: pretty_print_sql(sql_textbox)
-).pack(side=LEFT)
-
-sql_font_size_var = StringVar()
-sql_font_size_var.set(str(global_vars.font_size_sql))
-OptionMenu(
-    button_frame,
-    sql_font_size_var,
-    *[str(size) for size in range(8, 25, 2)],
-    command=lambda sel: change_font_size(sel, sql_font, "sql")
-).pack(side=LEFT, padx=10)
-
-frame_query.grid_rowconfigure(1, weight=1)
-frame_query.grid_columnconfigure(0, weight=1)
-
-
-# --- Output frame ---
-# Right-hand pane: read-only console style output.
-# Used to show query results, table listings, status messages, etc.
-Label(frame_output, text='Output :', bg=global_vars.bg_frame, fg=global_vars.text_colour).grid(row=0, column=0, sticky="nw")
-output_font = font.Font(family="Courier", size=global_vars.font_size_output)
-
-output_textbox = ScrolledText(frame_output, width=75, height=20, background=global_vars.bg_textbox, font=output_font)
-output_textbox.grid(row=1, column=0, sticky="nsew")
-output_textbox.config(state='disabled')
-
-# Styling tags for structured output:
-# - "pk"     : primary keys in red
-# - "tbl"    : table names in bold
-# - "comma"  : commas in light grey for readability
-output_textbox.tag_config("pk", foreground="#A00000",
-                          font=("Courier", global_vars.font_size_output, "bold"))
-output_textbox.tag_config("tbl", font=("Courier", global_vars.font_size_output, "bold"))
-output_textbox.tag_config("comma", foreground="#888888")
-
-
 # --- Database menu button ---
 # This replaces the old-style menubar.
 # It groups:
 #   - "Connect to a Database..."  (open existing .db)
 #   - "Create New Database..."    (new .db via Save-As)
+#   - sandbox mode toggle, save back and discard
+#   - student mode (resource limits) toggle
+#   - named snapshots and "Reset to Snapshot"
 #   - recently opened databases
 # The menu is refreshed live so the list stays current.
 db_button = Menubutton(
@@ -265,6 +509,104 @@ db_menu.add_command(
     command=lambda: create_and_refresh(db_menu, output_textbox, window, choose_database, create_new_database)
 )
 
+# Sandbox mode: databases opened while this is ticked are copied into memory,
+# so pupils can DROP / DELETE freely without touching the shared file.
+sandbox_var = BooleanVar(value=global_vars.sandbox_enabled)
+db_menu.add_separator()
+db_menu.add_checkbutton(
+    label="Open in Sandbox (in memory)",
+    variable=sandbox_var,
+    command=lambda: setattr(global_vars, "sandbox_enabled", sandbox_var.get())
+)
+db_menu.add_command(
+    label="Save Sandbox to File",
+    command=lambda: save_sandbox(output_textbox)
+)
+db_menu.add_command(
+    label="Discard Sandbox Changes",
+    command=lambda: discard_sandbox(output_textbox)
+)
+
+# Student mode: per-statement limits on time, VM steps, rows and memory,
+# so one accidental cartesian product cannot hang a lab machine.
+student_mode_var = BooleanVar(value=global_vars.student_mode)
+db_menu.add_checkbutton(
+    label="Student Mode (resource limits)",
+    variable=student_mode_var,
+    command=lambda: set_student_mode(student_mode_var.get(), output_textbox)
+)
+isolated_var = BooleanVar(value=global_vars.isolated_execution)
+db_menu.add_checkbutton(
+    label="Run Queries in a Separate Process",
+    variable=isolated_var,
+    command=lambda: (set_isolated_execution(isolated_var.get(), output_textbox),
+                     isolated_var.set(global_vars.isolated_execution))
+)
+
+# Full-text search index (FTS5) on a text column
+db_menu.add_separator()
+db_menu.add_command(
+    label="Create Search Index...",
+    command=lambda: prompt_search_index(window, output_textbox)
+)
+
+# Snapshots: save the current state once, then reset to it before each exercise
+db_menu.add_separator()
+db_menu.add_command(
+    label="Take Snapshot...",
+    command=lambda: prompt_take_snapshot(output_textbox)
+)
+db_menu.add_command(
+    label="Reset to Last Snapshot",
+    command=lambda: reset_to_snapshot(None, output_textbox)
+)
+snapshot_menu = Menu(db_menu, tearoff=0)
+snapshot_menu.config(postcommand=lambda: refresh_snapshot_menu(snapshot_menu, output_textbox))
+db_menu.add_cascade(label="Reset to Snapshot", menu=snapshot_menu)
+
+# Attached databases: other files queried as alias.table on the same connection
+db_menu.add_separator()
+db_menu.add_command(
+    label="Attach Database...",
+    command=lambda: prompt_attach_database(output_textbox)
+)
+detach_menu = Menu(db_menu, tearoff=0)
+detach_menu.config(postcommand=lambda: refresh_detach_menu(detach_menu, output_textbox))
+db_menu.add_cascade(label="Detach Database", menu=detach_menu)
+
+# Check an exercise: compare the database with the teacher's reference
+db_menu.add_separator()
+db_menu.add_command(
+    label="Compare with Reference Database...",
+    command=lambda: prompt_compare_database(output_textbox)
+)
+
+# Maintenance: planner statistics, free space, corruption check
+maintenance_menu = Menu(db_menu, tearoff=0)
+for label, action in (("Analyze (ANALYZE)", "ANALYZE"),
+                      ("Optimize (PRAGMA optimize)", "PRAGMA optimize"),
+                      ("Quick Check", "quick_check"),
+                      (None, None),
+                      ("Vacuum", "VACUUM"),
+                      ("Vacuum into a Compacted Copy...", "VACUUM INTO"),
+                      ("Incremental Vacuum (release free pages)", "incremental_vacuum"),
+                      ("Enable Incremental Vacuum", "Enable incremental vacuum")):
+    if label is None:
+        maintenance_menu.add_separator()
+    else:
+        maintenance_menu.add_command(
+            label=label,
+            command=lambda a=action: run_maintenance_action(a, output_textbox)
+        )
+maintenance_menu.add_separator()
+optimize_on_close_var = BooleanVar(value=global_vars.optimize_on_close)
+maintenance_menu.add_checkbutton(
+    label="Optimize When Closing a Database",
+    variable=optimize_on_close_var,
+    command=lambda: setattr(global_vars, "optimize_on_close", optimize_on_close_var.get())
+)
+db_menu.add_cascade(label="Maintenance", menu=maintenance_menu)
+
 # Separator between actions and recent files
 db_menu.add_separator()
 
@@ -276,37 +618,15 @@ clean_recent_db_files()
 db_button.grid(row=0, column=0, padx=10, pady=10, sticky="n")
 
 
-# --- Output frame controls (Clear output, Output font size) ---
-button_frame_out = Frame(frame_output, bg=global_vars.bg_frame)
-button_frame_out.grid(row=2, column=0, sticky="nw", pady=2)
-
-Button(
-    button_frame_out,
-    text="Clear result box",
-    bg=global_vars.bg_button,
-    fg=global_vars.text_colour,
-    command=lambda: clear_output(output_textbox)
-).pack(side=LEFT)
-
-output_font_size_var = StringVar()
-output_font_size_var.set(str(global_vars.font_size_output))
-OptionMenu(
-    button_frame_out,
-    output_font_size_var,
-    *[str(size) for size in range(8, 25, 2)],
-    command=lambda sel: change_font_size(sel, output_font, "output")
-).pack(side=LEFT, padx=10)
-
-frame_output.grid_rowconfigure(1, weight=1)
-frame_output.grid_columnconfigure(0, weight=1)
-
-
 # --- Window close behaviour ---
 # Clicking the window's [X] should:
 # - save recent file lists
-# - (optionally) close DB connection
+# - stop the tab workers and close their DB connections
 # - exit cleanly
-window.protocol("WM_DELETE_WINDOW", lambda: on_closing(window))
+window.protocol(
+    "WM_DELETE_WINDOW",
+    lambda: on_closing(window, pre_close=lambda: close_all_tabs(close_active_connection))
+)
 
 
 # --- Main loop ---
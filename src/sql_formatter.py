@@ -0,0 +1,186 @@
+# sql_formatter.py
+#
+# Format SQL files on disk with the same rules as the Pretty Print button
+# (utils.insert_linebreaks_before_keywords, utils.highlight_keywords and a
+# blank line after each statement), without loading them in the editor.
+#
+# Files are streamed statement by statement (utils.iter_sql_statements)
+# and written as they are formatted, so memory use is bounded by the
+# longest statement, even on a 30 MB dump. Directories are formatted by a
+# process pool, one file per task.
+#
+# Usage:
+#   python sql_formatter.py dump.sql -o dump_formatted.sql
+#   python sql_formatter.py dump.sql                   (to standard output)
+#   python sql_formatter.py submissions/ -o formatted/ -j 8
+#   python sql_formatter.py submissions/ --in-place
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from utils import insert_linebreaks_before_keywords, highlight_keywords, iter_sql_statements
+
+
+def format_statement(statement):
+    """Pretty Print rules applied to one complete statement."""
+    return highlight_keywords(insert_linebreaks_before_keywords(statement)).lstrip("\n")
+
+
+def format_stream(source, target, encoding="utf-8"):
+    """
+    Format SQL read from a binary stream into a text stream.
+
+    Decoding is strict: a byte that is not valid in 'encoding' raises
+    UnicodeDecodeError instead of being rewritten as U+FFFD.
+
+    Args:
+        source : binary file object
+        target : text file object
+        encoding : str
+            Encoding of the source.
+
+    Returns:
+        int : number of statements written.
+    """
+    count = 0
+    for statement, _position in iter_sql_statements(source, encoding, errors="strict"):
+        if count:
+            target.write("\n\n")
+        target.write(format_statement(statement))
+        count += 1
+    if count:
+        target.write("\n")
+    return count
+
+
+def format_sql_file(source_path, target_path=None, encoding="utf-8"):
+    """
+    Format one SQL file.
+
+    The output is written to a temporary file next to the target and
+    renamed at the end, so target_path may be source_path (in place) and
+    an interrupted run never leaves a half-written file.
+
+    Args:
+        source_path : str
+        target_path : str, optional
+            Defaults to source_path (format in place).
+        encoding : str
+
+    Returns:
+        tuple[str, int] : (source_path, number of statements)
+    """
+    target_path = target_path or source_path
+    directory = os.path.dirname(os.path.abspath(target_path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(suffix=".sql", dir=directory)
+    try:
+        with open(source_path, "rb") as source, \
+                os.fdopen(fd, "w", encoding=encoding, newline="\n") as target:
+            count = format_stream(source, target, encoding)
+        # mkstemp creates the file with mode 0600: keep the target's
+        # permissions, or give a new file those of its source
+        shutil.copymode(target_path if os.path.exists(target_path) else source_path,
+                        temp_path)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return source_path, count
+
+
+def _format_task(paths):
+    # Process pool task: never raise, report the error instead
+    source_path, target_path, encoding = paths
+    try:
+        return format_sql_file(source_path, target_path, encoding) + (None,)
+    except Exception as e:
+        return source_path, 0, str(e)
+
+
+def format_directory(source_dir, target_dir=None, workers=None, encoding="utf-8",
+                     report=print):
+    """
+    Format every .sql file of a directory tree with a process pool.
+
+    Args:
+        source_dir : str
+        target_dir : str, optional
+            Mirror of source_dir receiving the formatted files;
+            None formats the files in place.
+        workers : int, optional
+            Number of processes (default: number of CPUs).
+        encoding : str
+        report : callable
+            Receives one line of text per file.
+
+    Returns:
+        tuple[int, int] : (files formatted, files that failed)
+    """
+    tasks = []
+    for root, _dirs, files in os.walk(source_dir):
+        for name in sorted(files):
+            if not name.lower().endswith(".sql"):
+                continue
+            source_path = os.path.join(root, name)
+            target_path = None
+            if target_dir:
+                target_path = os.path.join(target_dir, os.path.relpath(source_path, source_dir))
+            tasks.append((source_path, target_path, encoding))
+
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, count, error in pool.map(_format_task, tasks, chunksize=4):
+            if error:
+                failed += 1
+                report(f"FAILED {path}: {error}")
+            else:
+                done += 1
+                report(f"{path}: {count:,} statement(s)")
+    return done, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Format SQL files with SQL Desk's Pretty Print rules."
+    )
+    parser.add_argument("source", help="SQL file or directory of .sql files")
+    parser.add_argument("-o", "--output", help="output file or directory")
+    parser.add_argument("--in-place", action="store_true", help="overwrite the source file(s)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="processes for a directory (default: number of CPUs)")
+    parser.add_argument("--encoding", default="utf-8")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.source):
+        if not args.output and not args.in_place:
+            parser.error("a directory needs -o OUTPUT_DIR or --in-place")
+        done, failed = format_directory(args.source, args.output, args.jobs, args.encoding)
+        print(f"{done} file(s) formatted, {failed} failed.", file=sys.stderr)
+        return 1 if failed else 0
+
+    try:
+        if args.output or args.in_place:
+            _path, count = format_sql_file(args.source, args.output, args.encoding)
+            print(f"{count:,} statement(s) formatted.", file=sys.stderr)
+        else:
+            with open(args.source, "rb") as source:
+                format_stream(source, sys.stdout, args.encoding)
+    except UnicodeDecodeError as e:
+        print(f"FAILED {args.source}: {e} (try --encoding)", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Output closed early (e.g. piped to 'head')
+        sys.stdout = None
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+# sql_functions.py
+#
+# Statistical and text functions added to every SQLite connection of
+# SQL Desk, so pupils can write
+#
+#     SELECT median(price), percentile(price, 90), stddev(price) FROM book;
+#     SELECT * FROM member WHERE email REGEXP '^[a-z]+@school\.eu$';
+#
+# instead of exporting the data or imitating them with slow self-joins.
+#
+# Aggregates use streaming algorithms (Welford for variance / stddev) or
+# keep the values compactly and sort once (median, percentile): O(n log n).
+#
+# Run this file to benchmark each function against the pure-SQL
+# workaround it replaces:   python sql_functions.py [rows]
+
+import math
+import re
+import sqlite3
+import sys
+import time
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+
+def _number(value):
+    """Numeric value of a cell, or None (NULL, text, blob are ignored)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return None
+
+
+# =========================
+# AGGREGATES
+# =========================
+
+class Variance:
+    """var_samp(x): sample variance (Welford's online algorithm)."""
+
+    sample = True
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def step(self, value):
+        x = _number(value)
+        if x is None:
+            return
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def finalize(self):
+        ddof = 1 if self.sample else 0
+        if self.n - ddof <= 0:
+            return None
+        return self.m2 / (self.n - ddof)
+
+
+class PopulationVariance(Variance):
+    """var_pop(x): population variance."""
+    sample = False
+
+
+class StdDev(Variance):
+    """stddev(x) / stddev_samp(x): sample standard deviation."""
+
+    def finalize(self):
+        variance = super().finalize()
+        return None if variance is None else math.sqrt(variance)
+
+
+class PopulationStdDev(StdDev):
+    """stddev_pop(x): population standard deviation."""
+    sample = False
+
+
+class Percentile:
+    """
+    percentile(x, p): value below which p % of the values fall
+    (0 <= p <= 100, linear interpolation between the closest ranks,
+    like percentile_cont).
+    """
+
+    def __init__(self):
+        self.values = array("d")
+        self.fraction = None
+
+    def step(self, value, p):
+        if self.fraction is None:
+            if _number(p) is None or not 0 <= p <= 100:
+                raise ValueError("percentile must be between 0 and 100")
+            self.fraction = p / 100
+        x = _number(value)
+        if x is not None:
+            self.values.append(x)
+
+    def finalize(self):
+        if not self.values:
+            return None
+        values = sorted(self.values)
+        rank = self.fraction * (len(values) - 1)
+        low = math.floor(rank)
+        high = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+class Median(Percentile):
+    """median(x): middle value (average of the two middle ones if even)."""
+
+    def step(self, value):
+        super().step(value, 50)
+
+
+class Mode:
+    """mode(x): most frequent non-NULL value (the first one seen on a tie)."""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def step(self, value):
+        if value is not None:
+            self.counts[value] += 1
+
+    def finalize(self):
+        if not self.counts:
+            return None
+        return self.counts.most_common(1)[0][0]
+
+
+# =========================
+# SCALAR FUNCTIONS
+# =========================
+
+@lru_cache(maxsize=64)
+def _compile(pattern):
+    return re.compile(pattern)
+
+
+def regexp(pattern, value):
+    """
+    'value REGEXP pattern' (SQLite calls regexp(pattern, value)):
+    1 if the Python regular expression matches anywhere in value.
+    """
+    if pattern is None or value is None:
+        return None
+    return 1 if _compile(pattern).search(str(value)) else 0
+
+
+# name: (class, number of arguments)
+AGGREGATES = {
+    "median": (Median, 1),
+    "percentile": (Percentile, 2),
+    "variance": (Variance, 1),
+    "var_samp": (Variance, 1),
+    "var_pop": (PopulationVariance, 1),
+    "stddev": (StdDev, 1),
+    "stddev_samp": (StdDev, 1),
+    "stddev_pop": (PopulationStdDev, 1),
+    "mode": (Mode, 1),
+}
+
+# name: (function, number of arguments)
+FUNCTIONS = {
+    "regexp": (regexp, 2),
+}
+
+
+def register_functions(conn):
+    """
+    Add the SQL Desk function pack to a connection.
+
+    Args:
+        conn : sqlite3.Connection
+
+    Returns: None
+    """
+    for name, (cls, nargs) in AGGREGATES.items():
+        conn.create_aggregate(name, nargs, cls)
+    for name, (func, nargs) in FUNCTIONS.items():
+        conn.create_function(name, nargs, func, deterministic=True)
+    return None
+
+
+# =========================
+# BENCHMARK
+# =========================
+
+# name: (query using the function pack, pure-SQL workaround)
+BENCHMARKS = {
+    "median": (
+        "SELECT median(x) FROM t",
+        "SELECT avg(x) FROM (SELECT x FROM t ORDER BY x "
+        "LIMIT 2 - (SELECT count(*) FROM t) % 2 "
+        "OFFSET ((SELECT count(*) FROM t) - 1) / 2)",
+    ),
+    "median (self-join)": (
+        "SELECT median(x) FROM s",
+        "SELECT avg(x) FROM (SELECT a.x FROM s a, s b GROUP BY a.id "
+        "HAVING sum(b.x < a.x) <= count(*) / 2 AND sum(b.x > a.x) <= count(*) / 2)",
+    ),
+    "percentile 90": (
+        "SELECT percentile(x, 90) FROM t",
+        "SELECT lo.x + (hi.x - lo.x) * (r.rank - r.low) FROM "
+        "(SELECT 0.9 * (count(*) - 1) AS rank, CAST(0.9 * (count(*) - 1) AS INTEGER) AS low FROM t) r, "
+        "(SELECT x FROM t ORDER BY x LIMIT 1 OFFSET (SELECT CAST(0.9 * (count(*) - 1) AS INTEGER) FROM t)) lo, "
+        "(SELECT x FROM t ORDER BY x LIMIT 1 OFFSET (SELECT CAST(0.9 * (count(*) - 1) AS INTEGER) + 1 FROM t)) hi",
+    ),
+    "variance": (
+        "SELECT variance(x) FROM t",
+        "SELECT sum((x - m) * (x - m)) / (count(*) - 1) FROM t, (SELECT avg(x) AS m FROM t)",
+    ),
+    "stddev_pop": (
+        "SELECT stddev_pop(x) FROM t",
+        # No sqrt() in SQLite builds without the math functions
+        "SELECT avg(x * x) - avg(x) * avg(x) FROM t",
+    ),
+    "mode": (
+        "SELECT mode(k) FROM t",
+        "SELECT k FROM t GROUP BY k ORDER BY count(*) DESC LIMIT 1",
+    ),
+    "regexp": (
+        "SELECT count(*) FROM t WHERE name REGEXP '^[A-M]'",
+        "SELECT count(*) FROM t WHERE substr(name, 1, 1) BETWEEN 'A' AND 'M'",
+    ),
+}
+
+
+def benchmark(rows=200_000, self_join_rows=2_000, repeat=3):
+    """
+    Time each function of the pack against its pure-SQL workaround.
+
+    Args:
+        rows : int
+            Rows of the test table.
+        self_join_rows : int
+            Rows of the (quadratic) self-join test table.
+        repeat : int
+            Best of 'repeat' runs is kept.
+
+    Returns:
+        list[tuple] : (name, function ms, workaround ms, speed-up, same result)
+    """
+    import random
+
+    conn = sqlite3.connect(":memory:")
+    register_functions(conn)
+    rng = random.Random(42)
+    conn.execute("CREATE TABLE t (x REAL, k INTEGER, name TEXT)")
+    conn.executemany(
+        "INSERT INTO t VALUES (?, ?, ?)",
+        ((rng.gauss(50, 15), rng.randint(1, 50),
+          "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(6)))
+         for _ in range(rows))
+    )
+    conn.execute("CREATE TABLE s (id INTEGER PRIMARY KEY, x REAL)")
+    conn.executemany("INSERT INTO s (x) VALUES (?)",
+                     ((rng.random(),) for _ in range(self_join_rows)))
+
+    def best(sql):
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            value = conn.execute(sql).fetchone()[0]
+            times.append(time.perf_counter() - started)
+        return min(times) * 1000, value
+
+    report = []
+    for name, (with_function, workaround) in BENCHMARKS.items():
+        ms_function, value = best(with_function)
+        ms_workaround, expected = best(workaround)
+        if name == "stddev_pop":
+            expected = math.sqrt(expected)
+        same = (value == expected if not isinstance(value, float)
+                else math.isclose(value, expected, rel_tol=1e-6))
+        report.append((name, round(ms_function, 1), round(ms_workaround, 1),
+                       round(ms_workaround / ms_function, 1) if ms_function else None, same))
+    conn.close()
+    return report
+
+
+if __name__ == "__main__":
+    from utils import make_pretty_table
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"{rows:,} rows (self-join: 2,000 rows), best of 3")
+    print(make_pretty_table(
+        ["function", "function ms", "pure SQL ms", "speed-up", "same result"],
+        benchmark(rows)
+    ))
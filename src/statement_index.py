@@ -0,0 +1,368 @@
+# statement_index.py
+#
+# Index of the statement boundaries of an SQL editor.
+#
+# For each line of a Text widget the index keeps the columns of the ';'
+# that end a statement and the scanner state at the end of the line. The
+# state is the lexical state (inside a string or a block comment, or plain
+# code) plus the state of SQLite's own sqlite3_complete() automaton, so a
+# ';' inside a CREATE TRIGGER ... BEGIN ... END body never ends a
+# statement. Edits are caught by proxying the widget's Tcl command, and
+# only the edited lines are re-scanned — plus the following lines while
+# their state changes (e.g. after opening a quote or a trigger body).
+#
+# Finding the statement around the cursor then only looks at the lines of
+# that statement, whatever the size of the file.
+
+import re
+
+
+CODE = None                 # lexical states at the end of a line
+STRING = "'"
+IDENTIFIER = '"'
+BRACKET = "["
+BACKTICK = "`"
+BLOCK_COMMENT = "/*"
+
+_CLOSING = {STRING: "'", IDENTIFIER: '"', BRACKET: "]", BACKTICK: "`"}
+
+# Tokens and transitions of sqlite3_complete() (SQLite's complete.c).
+# A ';' ends a statement when it leads to state 1 (START); in states 5-7
+# the scanner is inside a trigger body, which only "END ;" closes.
+SEMI, WS, OTHER, EXPLAIN, CREATE, TEMP, TRIGGER, END = range(8)
+_KEYWORDS = {"explain": EXPLAIN, "create": CREATE, "temp": TEMP, "temporary": TEMP,
+             "trigger": TRIGGER, "end": END}
+_TRANSITIONS = (
+    # SEMI WS OTHER EXPLAIN CREATE TEMP TRIGGER END
+    (1, 0, 2, 3, 4, 2, 2, 2),     # 0 INVALID (start of the buffer)
+    (1, 1, 2, 3, 4, 2, 2, 2),     # 1 START
+    (1, 2, 2, 2, 2, 2, 2, 2),     # 2 NORMAL
+    (1, 3, 3, 2, 4, 2, 2, 2),     # 3 EXPLAIN
+    (1, 4, 2, 2, 2, 4, 5, 2),     # 4 CREATE
+    (6, 5, 5, 5, 5, 5, 5, 5),     # 5 TRIGGER
+    (6, 6, 5, 5, 5, 5, 5, 7),     # 6 SEMI (inside a trigger body)
+    (1, 7, 5, 5, 5, 5, 5, 5),     # 7 END
+)
+_WORD = re.compile(r"[\w$\x80-\U0010FFFF]+")
+
+START = (CODE, 0)           # scanner state at the start of the buffer
+
+
+def scan_line(line, state):
+    """
+    Scan one line of SQL.
+
+    Args:
+        line : str
+            Line content, without the newline.
+        state : tuple
+            (lexical state, sqlite3_complete state) at the start of the line.
+
+    Returns:
+        (state, terminators) : state at the end of the line and the
+        columns of the statement-ending semicolons.
+    """
+    lexical, phase = state
+    terminators = []
+    i = 0
+    n = len(line)
+    while i < n:
+        if lexical == BLOCK_COMMENT:
+            end = line.find("*/", i)
+            if end < 0:
+                return (lexical, phase), terminators
+            i = end + 2
+            lexical = CODE
+        elif lexical is not CODE:
+            end = line.find(_CLOSING[lexical], i)
+            if end < 0:
+                return (lexical, phase), terminators
+            i = end + 1
+            lexical = CODE
+        else:
+            ch = line[i]
+            if ch == ";":
+                phase = _TRANSITIONS[phase][SEMI]
+                if phase == 1:
+                    terminators.append(i)
+            elif ch.isspace():
+                pass
+            elif ch in _CLOSING:
+                phase = _TRANSITIONS[phase][OTHER]
+                lexical = ch
+            elif ch == "-" and line.startswith("--", i):
+                return (CODE, phase), terminators
+            elif ch == "/" and line.startswith("/*", i):
+                lexical = BLOCK_COMMENT
+                i += 1
+            else:
+                word = _WORD.match(line, i)
+                if word is not None:
+                    token = _KEYWORDS.get(word.group().lower(), OTHER)
+                    i = word.end() - 1
+                else:
+                    token = OTHER
+                phase = _TRANSITIONS[phase][token]
+            i += 1
+    return (lexical, phase), terminators
+
+
+class StatementIndex:
+    """
+    Statement boundaries of a Text widget, kept up to date as it is edited.
+
+    Args:
+        text_widget : tkinter.Text
+
+    Attributes:
+        states : list[tuple]
+            Scanner state at the end of each line (see scan_line).
+        terminators : list[list[int]]
+            Columns of the statement-ending ';' of each line.
+    """
+
+    def __init__(self, text_widget):
+        self.widget = text_widget
+        self.states = []
+        self.terminators = []
+        self._install_proxy()
+        self.rebuild()
+
+    # --- Maintenance ------------------------------------------------------
+
+    def rebuild(self):
+        """Scan the whole buffer."""
+        self.states = []
+        self.terminators = []
+        self._rescan(0, 0, self._line_count() - 1)
+        return None
+
+    def _line_count(self):
+        return int(self._call("index", "end-1c").split(".")[0])
+
+    def _rescan(self, first, old_stop, new_last):
+        """
+        Old lines first..old_stop-1 (0-based) were replaced by the lines
+        first..new_last of the buffer: scan them, then keep re-scanning the
+        following lines as long as they start in a different state than
+        when they were last scanned.
+        """
+        old_state = self.states[old_stop - 1] if old_stop > first else (
+            self.states[first - 1] if first > 0 else START)
+        state = self.states[first - 1] if first > 0 else START
+
+        lines = self._call("get", f"{first + 1}.0", f"{new_last + 1}.0 lineend").split("\n")
+        states, terminators = [], []
+        for line in lines:
+            state, ends = scan_line(line, state)
+            states.append(state)
+            terminators.append(ends)
+        self.states[first:old_stop] = states
+        self.terminators[first:old_stop] = terminators
+
+        # Propagate a state change (e.g. an opened string) downwards
+        line_no = new_last + 1
+        while line_no < len(self.states) and state != old_state:
+            line = self._call("get", f"{line_no + 1}.0", f"{line_no + 1}.0 lineend")
+            old_state = self.states[line_no]
+            state, ends = scan_line(line, state)
+            self.states[line_no] = state
+            self.terminators[line_no] = ends
+            line_no += 1
+        return None
+
+    def _install_proxy(self):
+        """
+        Route the widget's Tcl command through Python, so every insert,
+        delete or replace (keyboard, undo, program) updates the index.
+        """
+        widget = self.widget
+        self._original = widget._w + "_statement_index"
+        widget.tk.call("rename", widget._w, self._original)
+        widget.tk.createcommand(widget._w, self._dispatch)
+        # Deleted by tkinter when the widget is destroyed
+        widget._tclCommands = (widget._tclCommands or []) + [widget._w]
+        return None
+
+    def _call(self, *args):
+        return self.widget.tk.call(self._original, *args)
+
+    def _line_of(self, index):
+        return int(self._call("index", index).split(".")[0]) - 1
+
+    def _dispatch(self, command, *args):
+        if command not in ("insert", "delete", "replace"):
+            return self._call(command, *args)
+
+        old_count = len(self.states)
+        # "end" is the line after the last one: Tk edits before the final newline
+        first = min(self._line_of(args[0]), max(old_count - 1, 0))
+        if command == "insert":
+            old_last = first
+        elif len(args) > 1:
+            old_last = self._line_of(args[1])
+        elif self._call("get", args[0]) == "\n":
+            # Single-character delete of a newline (Backspace joining two lines)
+            old_last = first + 1
+        else:
+            old_last = first
+        old_last = min(old_last, old_count - 1)
+
+        result = self._call(command, *args)
+
+        new_last = max(old_last + self._line_count() - old_count, first)
+        self._rescan(first, old_last + 1, new_last)
+        return result
+
+    # --- Queries ----------------------------------------------------------
+
+    def _previous_end(self, line, col):
+        """Last terminator strictly before (line, col), or None."""
+        ends = [c for c in self.terminators[line] if c < col]
+        if ends:
+            return line, ends[-1]
+        for prev in range(line - 1, -1, -1):
+            if self.terminators[prev]:
+                return prev, self.terminators[prev][-1]
+        return None
+
+    def _next_end(self, line, col):
+        """First terminator at or after (line, col), or None."""
+        ends = [c for c in self.terminators[line] if c >= col]
+        if ends:
+            return line, ends[0]
+        for nxt in range(line + 1, len(self.terminators)):
+            if self.terminators[nxt]:
+                return nxt, self.terminators[nxt][0]
+        return None
+
+    def statement_at(self, index="insert"):
+        """
+        Locate the statement around a position of the editor.
+
+        When the position is after the ';' of a statement with only blanks
+        in between, that statement is chosen. A ';' inside a trigger body
+        is not a terminator (see scan_line), so a cursor inside the body
+        selects the whole CREATE TRIGGER statement.
+
+        Args:
+            index : str
+                Text widget index (default: the insert cursor).
+
+        Returns:
+            (start, end) Text indices, or None if there is only whitespace.
+        """
+        if len(self.states) != self._line_count():
+            self.rebuild()      # safety net: the index missed an edit
+
+        line, col = (int(x) for x in self._call("index", index).split("."))
+        line -= 1
+        if not self.states:
+            return None
+
+        previous = self._previous_end(line, col)
+        if previous is not None:
+            between = self._call("get", f"{previous[0] + 1}.{previous[1] + 1}", index)
+            if not between.strip():
+                # Cursor just after a statement: that is the current one
+                end = previous
+                previous = self._previous_end(*previous)
+            else:
+                end = self._next_end(line, col)
+        else:
+            end = self._next_end(line, col)
+
+        start = f"{previous[0] + 1}.{previous[1] + 1}" if previous else "1.0"
+        stop = f"{end[0] + 1}.{end[1] + 1}" if end else "end-1c"
+        if not self._call("get", start, stop).strip():
+            return None
+        return start, stop
+
+
+if __name__ == "__main__":
+    # Self-check (no display needed):   python statement_index.py
+    import sqlite3
+
+    sample = ("SELECT 1;\n"
+              "CREATE TRIGGER t AFTER INSERT ON a BEGIN\n"
+              "  DELETE FROM a;\n"
+              "  UPDATE b SET x = 'END;' WHERE y = 1;\n"
+              "END;\n"
+              "SELECT 2; -- end;\n")
+    state, ends, offset = START, [], 0
+    for text_line in sample.split("\n"):
+        state, columns = scan_line(text_line, state)
+        ends.extend(offset + c for c in columns)
+        offset += len(text_line) + 1
+
+    # Every terminator ends a complete statement, none is inside the body
+    statements, begin = [], 0
+    for end in ends:
+        statements.append(sample[begin:end + 1].strip())
+        assert sqlite3.complete_statement(sample[begin:end + 1]), statements[-1]
+        begin = end + 1
+
+    # A cursor inside the trigger body belongs to the whole trigger
+    cursor = sample.index("DELETE FROM a")
+    around = next(s for s, e in zip([0] + [e + 1 for e in ends], ends) if s <= cursor <= e)
+    assert sample[around:].lstrip().startswith("CREATE TRIGGER"), sample[around:]
+    assert statements == ["SELECT 1;", sample[10:sample.index("\nEND;") + 5], "SELECT 2;"], statements
+
+    class _Text:
+        """Just enough of a Text widget (index, get, insert, delete) for the index."""
+
+        def __init__(self):
+            self.text, self._w, self._tclCommands = "", ".editor", None
+            self.tk = self
+            self.commands = {self._w: self._command}
+
+        def call(self, name, *args):
+            if name == "rename":
+                self.commands[args[1]] = self.commands.pop(args[0])
+                return None
+            return self.commands[name](*args)
+
+        def createcommand(self, name, func):
+            self.commands[name] = func
+
+        def _offset(self, index):
+            base, _, modifier = index.partition(" ")
+            if base in ("end", "end-1c"):
+                offset = len(self.text)
+            else:
+                line, col = (int(x) for x in base.split("."))
+                lines = self.text.split("\n")
+                if line > len(lines):
+                    return len(self.text)
+                offset = sum(len(x) + 1 for x in lines[:line - 1]) + min(col, len(lines[line - 1]))
+            if modifier == "lineend":
+                newline = self.text.find("\n", offset)
+                offset = len(self.text) if newline < 0 else newline
+            return offset
+
+        def _command(self, command, *args):
+            if command == "index":
+                if args[0] == "end":
+                    return f"{self.text.count(chr(10)) + 2}.0"
+                before = self.text[:self._offset(args[0])]
+                return f"{before.count(chr(10)) + 1}.{len(before) - before.rfind(chr(10)) - 1}"
+            start = self._offset(args[0])
+            if command == "insert":
+                self.text = self.text[:start] + args[1] + self.text[start:]
+                return ""
+            stop = self._offset(args[1]) if len(args) > 1 else start + 1
+            if command == "get":
+                return self.text[start:stop]
+            self.text = self.text[:start] + self.text[stop:]
+            return ""
+
+    # Loading a file in chunks inserts at "end", into the last line
+    editor = _Text()
+    index = StatementIndex(editor)
+    for chunk in ("SELECT 1 FROM t WHERE a = 'x", "y';\nSELECT 2", " FROM u; SELECT 3;\nSELECT 4;"):
+        editor.call(editor._w, "insert", "end", chunk)
+    full = (index.states, index.terminators)
+    index.rebuild()
+    assert full == (index.states, index.terminators), (full, index.terminators)
+    assert index.terminators == [[30], [15, 25], [8]], index.terminators
+    print("statement_index: ok")
@@ -2,8 +2,10 @@
 # Utility functions for SQL Desk: formatting, recent files, and SQL syntax highlighting.
 # Author : Théo Giani — 2025
 
+import difflib
 import os
 import re
+import sqlite3
 import global_vars
 from tkinter import Tk, END
 
@@ -32,15 +34,28 @@ LINEBREAK_KEYWORDS = {
 SQL_KEYWORDS = SQL_KEYWORDS.union(LINEBREAK_KEYWORDS)
 
 
-def make_pretty_table(info, body):
+def make_pretty_table(info, body, exact=None):
     """
     Build a Markdown-style table from a query result.
 
+    Every cell is converted to text once. Values longer than
+    global_vars.TABLE_MAX_COLUMN_WIDTH are cut and end with '…'.
+
+    Column widths:
+        - ColumnarResult : exact, already known from the fetch.
+        - exact mode     : every row is scanned (cells converted once and
+                           kept for the output pass).
+        - otherwise      : estimated from TABLE_WIDTH_SAMPLE rows spread
+                           over the result; a rare longer value widens its
+                           own row rather than being cut.
+
     Args:
         info : list or cursor.description
             Column headers (list of strings or cursor description tuples).
-        body : list of tuples
+        body : list of tuples or results.ColumnarResult
             Data rows to include in the table.
+        exact : bool, optional
+            Defaults to global_vars.exact_table_widths.
 
     Returns:
         str : Formatted table as a string.
@@ -55,24 +70,55 @@ def make_pretty_table(info, body):
     else:
         headings = [col[0] for col in info]
 
-    num_cols = len(headings)
-    column_widths = [len(h) for h in headings]
+    if exact is None:
+        exact = global_vars.exact_table_widths
+    cap = global_vars.TABLE_MAX_COLUMN_WIDTH
+
+    def cell(value):
+        if value is None:
+            return ""
+        text = value if type(value) is str else str(value)
+        return text if len(text) <= cap else text[:cap - 1] + "…"
+
+    # Long names (e.g. expression columns) are cut like the cells
+    headings = [cell(h) for h in headings]
+
+    if not hasattr(body, "__len__"):
+        body = list(body)
+
+    if hasattr(body, "column_widths"):
+        widths = body.column_widths()
+        rows = body
+    elif exact or len(body) <= global_vars.TABLE_WIDTH_SAMPLE:
+        rows = [tuple(map(cell, row)) for row in body]
+        widths = _column_widths(rows, len(headings))
+        cell = str              # already converted
+    else:
+        step = len(body) / global_vars.TABLE_WIDTH_SAMPLE
+        sample = [tuple(map(cell, body[int(i * step)]))
+                  for i in range(global_vars.TABLE_WIDTH_SAMPLE)]
+        widths = _column_widths(sample, len(headings))
+        rows = body
 
-    for row in body:
-        for i in range(num_cols):
-            val = "" if row[i] is None else str(row[i])
-            column_widths[i] = max(column_widths[i], len(val))
+    widths = [min(max(len(h), w), cap) for h, w in zip(headings, widths)]
+    line = "| " + " | ".join(f"{{:<{w}}}" for w in widths) + " |\n"
 
-    result = '\n'
-    result += '| ' + ' | '.join(f'{headings[i]:<{column_widths[i]}}' for i in range(num_cols)) + ' |\n'
-    result += '|-' + '-|-'.join('-' * column_widths[i] for i in range(num_cols)) + '-|\n'
+    def lines():
+        yield "\n"
+        yield line.format(*headings)
+        yield "|-" + "-|-".join("-" * w for w in widths) + "-|\n"
+        for row in rows:
+            yield line.format(*map(cell, row))
 
-    for row in body:
-        result += '| ' + ' | '.join(
-            f'{("" if row[i] is None else str(row[i])):<{column_widths[i]}}' for i in range(num_cols)
-        ) + ' |\n'
+    return "".join(lines())
 
-    return result
+
+def _column_widths(rows, num_cols):
+    """Longest text of each column of already converted rows."""
+    widths = [0] * num_cols
+    for row in rows:
+        widths = [max(w, len(v)) for w, v in zip(widths, row)]
+    return widths
 
 
 def save_recent_files(file_path, source_list):
@@ -329,6 +375,72 @@ def colorize_keywords(text_widget):
 ##    return formatted.rstrip()
 
 
+def apply_text_diff(text_widget, old_text, new_text):
+    """
+    Turn the content of a Text widget from old_text into new_text by
+    editing only the lines that differ (line-level difflib diff).
+
+    Unchanged lines keep their tags and marks, Tk only re-lays out the
+    edited lines, and the undo stack records the edits instead of two
+    copies of the whole buffer. Automatic undo separators are off during
+    the edits, so the caller's edit_separator() calls make them one undo step.
+
+    Args:
+        text_widget : tkinter.Text
+            Widget whose content (up to 'end-1c') is old_text.
+        old_text, new_text : str
+
+    Returns:
+        int : number of lines deleted or inserted.
+    """
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+
+    def line_start(i):
+        # Index of the start of old line i ('end-1c' past the last line)
+        return f"{i + 1}.0" if i < len(old_lines) else "end-1c"
+
+    changed = 0
+    # Tk adds a separator at every switch between delete and insert
+    autoseparators = text_widget.cget("autoseparators")
+    text_widget.configure(autoseparators=False)
+    try:
+        # From the bottom up, so the line numbers of the pending edits stay valid
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == "equal":
+                continue
+            if i2 > i1:
+                text_widget.delete(line_start(i1), line_start(i2))
+            if j2 > j1:
+                text_widget.insert(line_start(i1), "".join(new_lines[j1:j2]))
+            changed += (i2 - i1) + (j2 - j1)
+    finally:
+        text_widget.configure(autoseparators=autoseparators)
+    return changed
+
+
+_TRAILING_BLANKS = re.compile(r"[ \t]+\n")
+_MANY_NEWLINES = re.compile(r"\n{4,}")
+_LINEBREAK_PATTERNS = []
+
+
+def _linebreak_patterns():
+    """Compiled (pattern, replacement) pairs, longest keywords first."""
+    if not _LINEBREAK_PATTERNS:
+        for keyword in sorted(LINEBREAK_KEYWORDS, key=len, reverse=True):
+            if keyword.upper() == "JOIN":
+                # Do not break "LEFT JOIN", "INNER JOIN", etc.
+                pattern = (r"(?<!\n)\b(?<!LEFT\s)(?<!RIGHT\s)(?<!INNER\s)"
+                           r"(?<!OUTER\s)(?<!CROSS\s)(?<!NATURAL\s)JOIN\b")
+                replacement = r"\nJOIN"
+            else:
+                pattern = rf"(?<!\n)\b{re.escape(keyword)}\b"
+                replacement = rf"\n{keyword}"
+            _LINEBREAK_PATTERNS.append((re.compile(pattern, re.IGNORECASE), replacement))
+    return _LINEBREAK_PATTERNS
+
+
 def insert_linebreaks_before_keywords(sql_code: str) -> str:
     """
     Insert newlines before key SQL keywords (from LINEBREAK_KEYWORDS)
@@ -348,26 +460,11 @@ def insert_linebreaks_before_keywords(sql_code: str) -> str:
 
         formatted = chunk
 
-        for keyword in sorted(LINEBREAK_KEYWORDS, key=len, reverse=True):
-            if keyword.upper() == "JOIN":
-                # Do not break "LEFT JOIN", "INNER JOIN", etc.
-                formatted = re.sub(
-                    r"(?<!\n)\b(?<!LEFT\s)(?<!RIGHT\s)(?<!INNER\s)"
-                    r"(?<!OUTER\s)(?<!CROSS\s)(?<!NATURAL\s)JOIN\b",
-                    r"\nJOIN",
-                    formatted,
-                    flags=re.IGNORECASE
-                )
-            else:
-                formatted = re.sub(
-                    rf"(?<!\n)\b{re.escape(keyword)}\b",
-                    rf"\n{keyword}",
-                    formatted,
-                    flags=re.IGNORECASE
-                )
+        for pattern, replacement in _linebreak_patterns():
+            formatted = pattern.sub(replacement, formatted)
 
-        formatted = re.sub(r"[ \t]+\n", "\n", formatted)
-        formatted = re.sub(r"\n{4,}", "\n\n\n", formatted)
+        formatted = _TRAILING_BLANKS.sub("\n", formatted)
+        formatted = _MANY_NEWLINES.sub("\n\n\n", formatted)
 
         out += formatted
 
@@ -585,3 +682,54 @@ def split_sql_segments(text):
 
     return segments
 
+
+
+def iter_sql_statements(stream, encoding="utf-8", errors="replace"):
+    """
+    Yield complete SQL statements from a binary file object,
+    reading it line by line (memory use is bounded by the longest statement).
+
+    Statement boundaries are the semicolons for which
+    sqlite3.complete_statement() is true, so semicolons inside strings,
+    comments and CREATE TRIGGER bodies are handled correctly.
+
+    Args:
+        stream : binary file object
+            Opened with open(path, "rb").
+        encoding : str
+            Text encoding of the file.
+        errors : str
+            Decoding error handler ("strict" raises UnicodeDecodeError
+            on bytes that are not valid in 'encoding').
+
+    Yields:
+        tuple[str, int] : (statement, number of bytes read so far)
+    """
+    buffer = ""
+    position = 0
+
+    for raw in stream:
+        position += len(raw)
+        line = raw.decode(encoding, errors=errors)
+
+        start = 0
+        while True:
+            semicolon = line.find(";", start)
+            if semicolon == -1:
+                break
+            candidate = buffer + line[start:semicolon + 1]
+            if sqlite3.complete_statement(candidate):
+                statement = candidate.strip()
+                if statement:
+                    yield statement, position
+                buffer = ""
+            else:
+                buffer = candidate
+            start = semicolon + 1
+
+        buffer += line[start:]
+
+    # Trailing content without a final semicolon
+    tail = buffer.strip()
+    if tail:
+        yield tail, position
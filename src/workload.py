@@ -0,0 +1,317 @@
+# workload.py
+#
+# Workload recording and replay for SQL Desk.
+#
+# With Tools > Record Workload on, every statement run from the editor is
+# appended to global_vars.WORKLOAD_LOG (JSON lines) with the fingerprint of
+# the database it ran on, its duration, its row count and its error, if
+# any. The replay tool re-runs such a file against a copy of a database,
+# with several connections in parallel, and reports latency percentiles
+# per statement. It makes classroom performance problems reproducible and
+# lets us compare SQLite versions, settings or SQL Desk versions on real
+# traffic.
+#
+# Usage:
+#   python workload.py workload.jsonl Library.db
+#   python workload.py workload.jsonl Library.db --concurrency 8 --repeat 5
+#   python workload.py workload.jsonl copy.db --database Library.db
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import global_vars
+from diagnostics import append_jsonl
+
+
+def database_fingerprint(conn):
+    """
+    Identify the database a statement runs on: file name, schema hash,
+    size in pages and SQLite version.
+
+    Args:
+        conn : sqlite3.Connection
+
+    Returns:
+        dict
+    """
+    schema = "\n".join(sql for (sql,) in conn.execute(
+        "SELECT sql FROM main.sqlite_master WHERE sql IS NOT NULL ORDER BY type, name"))
+    database = conn.execute("PRAGMA main.database_list").fetchone()[2]
+    return {
+        "database": os.path.basename(database) if database else ":memory:",
+        "schema": hashlib.sha1(schema.encode("utf-8")).hexdigest()[:16],
+        "pages": conn.execute("PRAGMA main.page_count").fetchone()[0],
+        "sqlite": sqlite3.sqlite_version,
+    }
+
+
+class WorkloadRecorder:
+    """
+    Record the statements of one execute_statements() call.
+
+    Args:
+        conn : sqlite3.Connection
+            Connection the statements run on (fingerprinted once).
+    """
+
+    def __init__(self, conn):
+        try:
+            self.fingerprint = database_fingerprint(conn)
+        except Exception:
+            self.fingerprint = None
+        self.started = None
+        self.ms = None
+
+    def start(self):
+        """Call just before the statement is executed."""
+        self.started = time.perf_counter()
+        self.ms = None
+
+    def stop(self):
+        """
+        Call once the statement is executed and its rows fetched (or it
+        failed): formatting the output is not timed, as replay() does not
+        do it. Later calls keep the first time.
+        """
+        if self.ms is None:
+            self.ms = round((time.perf_counter() - self.started) * 1000, 3)
+
+    def record(self, statement, rows=None, error=None):
+        """
+        Append the statement that just finished to the workload file.
+        Its "ms" is None when stop() was not called (e.g. a result cached
+        in a TEMP table, whose time is not comparable with a replay).
+        """
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "fingerprint": self.fingerprint,
+            "statement": statement,
+            "ms": self.ms,
+            "rows": rows,
+            "error": error,
+        }
+        append_jsonl(global_vars.WORKLOAD_LOG, record, global_vars.WORKLOAD_LOG_MAX_BYTES)
+        return None
+
+
+# =========================
+# REPLAY
+# =========================
+
+def load_workload(path):
+    """Read a workload file: list of records (dicts)."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def select_records(records, database=None, schema=None):
+    """
+    Keep the records made on one database: those whose fingerprint has
+    the file name 'database' or the schema hash 'schema'.
+
+    Args:
+        records : list[dict]
+        database : str, optional
+            File name (see database_fingerprint).
+        schema : str, optional
+            Schema hash.
+
+    Returns:
+        list[dict]
+    """
+    selected = []
+    for record in records:
+        fingerprint = record.get("fingerprint") or {}
+        if ((database is not None and fingerprint.get("database") == database)
+                or (schema is not None and fingerprint.get("schema") == schema)):
+            selected.append(record)
+    return selected
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))    # ceil
+    return sorted_values[int(rank) - 1]
+
+
+def copy_database(database):
+    """Copy a database (consistently, with the backup API) to a temp file."""
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="sql_desk_replay_")
+    os.close(fd)
+    source = sqlite3.connect(Path(database).resolve().as_uri() + "?mode=ro", uri=True)
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    return path
+
+
+def replay(records, database, concurrency=1, repeat=1, on_copy=True):
+    """
+    Re-run recorded statements and measure them.
+
+    Statements are taken from a shared queue in recorded order by
+    'concurrency' threads, each with its own connection (SQLite releases
+    the GIL while it works). Rows are fetched and discarded.
+
+    Args:
+        records : list[dict]
+            Workload records (see WorkloadRecorder).
+        database : str
+            Database to replay on.
+        concurrency : int
+        repeat : int
+            Times the whole workload is queued.
+        on_copy : bool
+            Work on a temporary copy so the database is not modified.
+
+    Returns:
+        dict : statement -> {"ms": [...], "errors": int, "recorded_ms": [...]}
+    """
+    path = copy_database(database) if on_copy else database
+    if concurrency > 1:
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+
+    jobs = queue.Queue()
+    for _ in range(repeat):
+        for record in records:
+            jobs.put(record)
+
+    stats = {}
+    lock = threading.Lock()
+
+    def worker():
+        from sql_functions import register_functions
+        conn = sqlite3.connect(path, timeout=30)
+        register_functions(conn)
+        while True:
+            try:
+                record = jobs.get_nowait()
+            except queue.Empty:
+                break
+            statement = record["statement"]
+            error = None
+            started = time.perf_counter()
+            try:
+                cur = conn.execute(statement)
+                for _ in cur:
+                    pass
+                if conn.in_transaction:
+                    conn.commit()
+            except Exception as e:
+                error = e
+                if conn.in_transaction:
+                    conn.rollback()
+            ms = (time.perf_counter() - started) * 1000
+
+            key = " ".join(statement.split())
+            with lock:
+                entry = stats.setdefault(key, {"ms": [], "errors": 0, "recorded_ms": []})
+                entry["ms"].append(ms)
+                entry["errors"] += error is not None
+                entry["recorded_ms"].append(record.get("ms"))
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(max(concurrency, 1))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if on_copy:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(path + suffix)
+            except OSError:
+                pass
+    return stats
+
+
+def report_rows(stats):
+    """Turn replay() statistics into table rows, slowest (p90) first."""
+    rows = []
+    for statement, entry in stats.items():
+        ms = sorted(entry["ms"])
+        recorded = sorted(m for m in entry["recorded_ms"] if m is not None)
+        text = statement if len(statement) <= 60 else statement[:59] + "…"
+        rows.append((
+            text, len(ms), entry["errors"],
+            round(percentile(ms, 50), 2), round(percentile(ms, 90), 2),
+            round(percentile(ms, 99), 2), round(ms[-1], 2),
+            round(percentile(recorded, 50), 2) if recorded else None,
+        ))
+    rows.sort(key=lambda row: row[4], reverse=True)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay an SQL Desk workload file.")
+    parser.add_argument("workload", help="workload file (JSON lines)")
+    parser.add_argument("database", help="database to replay on (a copy is used)")
+    parser.add_argument("-c", "--concurrency", type=int, default=1)
+    parser.add_argument("-r", "--repeat", type=int, default=1)
+    parser.add_argument("--in-place", action="store_true",
+                        help="run on the database itself instead of a copy")
+    parser.add_argument("--database", dest="recorded_on", metavar="NAME",
+                        help="replay the statements recorded on this database file name "
+                             "(default: those recorded on a database with the same "
+                             "file name or schema)")
+    args = parser.parse_args(argv)
+
+    from utils import make_pretty_table
+
+    records = load_workload(args.workload)
+    if not records:
+        print("Empty workload.")
+        return 1
+
+    with sqlite3.connect(Path(args.database).resolve().as_uri() + "?mode=ro", uri=True) as conn:
+        current = database_fingerprint(conn)
+    # A session may have touched several databases: replay only this one's
+    if args.recorded_on:
+        selected = select_records(records, database=args.recorded_on)
+    else:
+        selected = select_records(records, current["database"], current["schema"])
+    if not selected:
+        print("No statement of the workload was recorded on this database "
+              "(see --database).")
+        return 1
+    if len(selected) < len(records):
+        print(f"Replaying {len(selected):,} of {len(records):,} recorded statements "
+              "(the others ran on other databases).", file=sys.stderr)
+    if current["schema"] not in {r["fingerprint"]["schema"] for r in selected}:
+        print("Warning: the workload was recorded on a database with a different schema.",
+              file=sys.stderr)
+    records = selected
+
+    started = time.perf_counter()
+    stats = replay(records, args.database, args.concurrency, args.repeat,
+                   on_copy=not args.in_place)
+    elapsed = time.perf_counter() - started
+    total = sum(len(entry["ms"]) for entry in stats.values())
+
+    print(f"{total:,} statements in {elapsed:.2f} s "
+          f"({total / elapsed:,.0f}/s, concurrency {args.concurrency}, SQLite {sqlite3.sqlite_version})")
+    print(make_pretty_table(
+        ["statement", "runs", "errors", "p50 ms", "p90 ms", "p99 ms", "max ms", "recorded p50 ms"],
+        report_rows(stats)
+    ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
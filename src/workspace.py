@@ -0,0 +1,156 @@
+# workspace.py
+#
+# Tabbed workspace for SQL Desk.
+#
+# Each tab owns an SQL editor, an output pane, its own SQLite connection
+# and a single-thread background executor, so a long query can run in one
+# tab while the user keeps working in another.
+#
+# The rest of the program still works with the "current" state kept in
+# global_vars (current_connection, current_database, current_sql_file…):
+# switching tabs simply swaps that state in and out of the tab objects.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import global_vars
+
+
+# global_vars attributes that belong to a tab rather than to the application
+TAB_STATE = ("current_connection", "current_database", "current_sql_file", "sandbox_active")
+
+
+class QueryTab:
+    """
+    State of one workspace tab.
+
+    Attributes:
+        frame : tkinter.Widget
+            The page added to the notebook.
+        sql_textbox, output_textbox : tkinter.Text
+            Editor and output widgets of the tab.
+        executor : ThreadPoolExecutor
+            Single worker thread running this tab's SQL.
+        busy : bool
+            True while a query is running in the worker.
+        progress : GUI_functions.QueryProgress or None
+            State of the last query started in this tab.
+        status_label : tkinter.Label or None
+            Status line showing the query progress.
+        results : list[results.QueryResult]
+            SELECT results of the last run (for the result grid).
+        statement_index : statement_index.StatementIndex or None
+            Statement boundaries of the editor (Run current statement).
+        query_process : query_process.QueryProcess or None
+            Child process running this tab's SQL when isolated execution is on.
+        database_info : tuple or None
+            (change key, text) of the last Database Info scan (see db_info.py).
+    """
+
+    _counter = 0
+
+    def __init__(self, frame, sql_textbox, output_textbox):
+        QueryTab._counter += 1
+        self.number = QueryTab._counter
+        self.frame = frame
+        self.sql_textbox = sql_textbox
+        self.output_textbox = output_textbox
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"sql-desk-tab{self.number}"
+        )
+        self.busy = False
+        self.progress = None
+        self.status_label = None
+        self.results = []
+        self.statement_index = None
+        self.query_process = None
+        self.database_info = None
+
+        # Per-tab copy of the TAB_STATE globals
+        self.current_connection = None
+        self.current_database = ''
+        self.current_sql_file = None
+        self.sandbox_active = False
+
+    def title(self):
+        """Label shown on the notebook tab."""
+        if global_vars.current_tab is self:
+            database = global_vars.current_database
+        else:
+            database = self.current_database
+
+        if database:
+            name = os.path.basename(database)
+        else:
+            name = f"Query {self.number}"
+        return f"{name} ⏳" if self.busy else name
+
+
+def add_tab(tab):
+    """Register a new tab (it is not activated)."""
+    global_vars.tabs.append(tab)
+    return None
+
+
+def switch_to_tab(tab):
+    """
+    Make 'tab' the active one: save the global state of the previously
+    active tab and load the state of the new one into global_vars.
+
+    Args:
+        tab : QueryTab
+
+    Returns: None
+    """
+    previous = global_vars.current_tab
+    if previous is tab:
+        return None
+
+    if previous is not None:
+        for name in TAB_STATE:
+            setattr(previous, name, getattr(global_vars, name))
+
+    for name in TAB_STATE:
+        setattr(global_vars, name, getattr(tab, name))
+
+    global_vars.current_tab = tab
+    global_vars.output_textbox = tab.output_textbox
+    return None
+
+
+def close_tab(tab, close_connection):
+    """
+    Close a tab: stop its worker and close its connection.
+
+    Args:
+        tab : QueryTab
+        close_connection : callable
+            Function closing the *active* connection
+            (database_management.close_active_connection).
+
+    Returns: None
+    """
+    switch_to_tab(tab)
+    if tab.busy:
+        # Abort the running statement so the worker can finish
+        if tab.progress is not None:
+            tab.progress.cancel()
+        if global_vars.current_connection is not None:
+            global_vars.current_connection.interrupt()
+    tab.executor.shutdown(wait=True, cancel_futures=True)
+    if tab.query_process is not None:
+        tab.query_process.stop()
+        tab.query_process = None
+    close_connection(True)
+
+    global_vars.current_tab = None
+    global_vars.tabs.remove(tab)
+    for name in TAB_STATE:
+        setattr(tab, name, None)
+    return None
+
+
+def close_all_tabs(close_connection):
+    """Close every tab (used when the application quits)."""
+    for tab in list(global_vars.tabs):
+        close_tab(tab, close_connection)
+    return None